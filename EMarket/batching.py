@@ -0,0 +1,38 @@
+import threading
+from functools import partial
+
+from django.db import connection, transaction
+
+
+class CommitBatch:
+    """
+    Ids gathered during a transaction and handed to `flush` in one call
+    once it commits; outside a transaction `flush` runs straight away.
+    Only the first id of a transaction registers an on_commit callback,
+    and the callback carries its own set, so the ids of a transaction that
+    rolls back are dropped with it instead of riding along with the next
+    commit.
+    """
+
+    def __init__(self, flush, robust=False):
+        self.flush=flush
+        self.robust=robust
+        self._local=threading.local()
+
+    def _queued(self):
+        # a rollback discards the callback without running it
+        callback=getattr(self._local,'callback',None)
+        return callback is not None and any(func is callback for _,func,_ in connection.run_on_commit)
+
+    def _run(self, ids):
+        if self._local.ids is ids:
+            self._local.callback=None
+        self.flush(ids)
+
+    def add(self, ids):
+        if self._queued():
+            self._local.ids.update(ids)
+            return
+        self._local.ids=set(ids)
+        self._local.callback=partial(self._run,self._local.ids)
+        transaction.on_commit(self._local.callback,robust=self.robust)
@@ -0,0 +1,75 @@
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import transaction
+
+# rebuild at least this often even if an invalidation was missed
+TTL=getattr(settings,'PROCESS_CACHE_TTL_SECONDS',300)
+
+_stamps={}
+_stale=True
+
+
+def _mark_stale(**kwargs):
+    global _stale
+    _stale=True
+
+
+request_started.connect(_mark_stale)
+
+
+def _current_stamps():
+    # one read of every stamp per request, shared by all the caches
+    global _stamps,_stale
+    if _stale:
+        from core.models import CacheStamp
+        _stamps=dict(CacheStamp.objects.values_list('name','version'))
+        _stale=False
+    return _stamps
+
+
+class ProcessCache:
+    """
+    A value built once per process and kept in memory until someone calls
+    `invalidate()`. Invalidation writes a fresh version stamp to the
+    database (core.CacheStamp), which every worker reads once per request,
+    so they all rebuild on their next request after the change commits.
+    Outside requests, and should an invalidation ever be missed, the value
+    is rebuilt after TTL seconds.
+    """
+
+    def __init__(self, name, loader, ttl=TTL):
+        self.name=name
+        self.loader=loader
+        self.ttl=ttl
+        self._lock=threading.Lock()
+        self._value=None
+        self._version=None
+        self._loaded_at=None
+
+    def get(self):
+        version=_current_stamps().get(self.name)
+        if self._loaded_at is not None and version==self._version and time.monotonic()-self._loaded_at<self.ttl:
+            return self._value
+        with self._lock:
+            value=self.loader()
+            self._value,self._version,self._loaded_at=value,version,time.monotonic()
+        return value
+
+    def _bump(self):
+        from core.models import CacheStamp
+        version=uuid.uuid4().hex
+        CacheStamp.objects.bulk_create(
+            [CacheStamp(name=self.name,version=version)],
+            update_conflicts=True,unique_fields=['name'],update_fields=['version']
+        )
+        _stamps[self.name]=version
+
+    def invalidate(self):
+        # stop serving the old value here straight away, and bump the shared
+        # stamp on commit so nobody keeps a copy rebuilt from pre-commit data
+        self._loaded_at=None
+        transaction.on_commit(self._bump)
@@ -0,0 +1,158 @@
+import json
+from base64 import b64decode, b64encode
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def _encode_value(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Keyset pagination over whatever ordering the view ended up with
+    (OrderingFilter, queryset.order_by() or Meta.ordering). The primary key
+    is always appended as a tie breaker so rows sharing a sort value never
+    repeat or go missing between pages, and every page is a
+    `WHERE (a, pk) > (x, y) ... LIMIT n` lookup instead of an OFFSET, so deep
+    pages cost the same as the first one. NULLs always sort last.
+    """
+    page_size=20
+    page_size_query_param='page_size'
+    max_page_size=100
+    default_ordering=('-pk',)
+
+    def get_ordering(self, request, queryset, view):
+        ordering=[]
+        for field in (queryset.query.order_by or queryset.model._meta.ordering or self.default_ordering):
+            if not isinstance(field,str) or field=='?':
+                continue
+            name=field.lstrip('-')
+            descending=field.startswith('-')
+            if name in ('pk',queryset.model._meta.pk.name):
+                ordering.append(('pk',descending))
+                return ordering
+            ordering.append((name,descending))
+        ordering.append(('pk',ordering[-1][1] if ordering else True))
+        return ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request=request
+        self.page_size=self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url=request.build_absolute_uri()
+        self.ordering=self.get_ordering(request,queryset,view)
+        self.cursor=self.decode_cursor(request)
+        if self.cursor is None:
+            reverse,position=False,None
+        else:
+            reverse,position=self.cursor
+
+        queryset=queryset.order_by(*self._order_by(reverse))
+        if position is not None:
+            queryset=queryset.filter(self._after(position,reverse))
+
+        results=list(queryset[:self.page_size+1])
+        self.page=results[:self.page_size]
+        has_more=len(results)>self.page_size
+        if reverse:
+            self.page.reverse()
+            self.has_next=position is not None
+            self.has_previous=has_more
+        else:
+            self.has_next=has_more
+            self.has_previous=position is not None
+
+        if self.has_next or self.has_previous:
+            self.display_page_controls=True
+        return self.page
+
+    def _order_by(self, reverse):
+        nulls={'nulls_first':True} if reverse else {'nulls_last':True}
+        order_by=[]
+        for name,descending in self.ordering:
+            if descending!=reverse:
+                order_by.append(F(name).desc(**nulls))
+            else:
+                order_by.append(F(name).asc(**nulls))
+        return order_by
+
+    def _after(self, position, reverse):
+        # Lexicographic "row comes after position" built as
+        # (a>x) OR (a=x AND b>y) OR ... in the direction being walked.
+        condition=Q(pk__in=[])
+        equal=Q()
+        for (name,descending),value in zip(self.ordering,position):
+            nulls_last=not reverse
+            if value is None:
+                after=None if nulls_last else Q(**{f'{name}__isnull':False})
+                same=Q(**{f'{name}__isnull':True})
+            else:
+                lookup='lt' if descending!=reverse else 'gt'
+                after=Q(**{f'{name}__{lookup}':value})
+                if nulls_last:
+                    after|=Q(**{f'{name}__isnull':True})
+                same=Q(**{name:value})
+            if after is not None:
+                condition|=equal&after
+            equal&=same
+        return condition
+
+    def _get_position_from_instance(self, instance, ordering):
+        position=[]
+        for name,_ in ordering:
+            value=instance
+            for attr in name.split('__'):
+                value=getattr(value,attr,None) if value is not None else None
+            position.append(_encode_value(value))
+        return position
+
+    def _ordering_key(self):
+        return ','.join(('-' if descending else '')+name for name,descending in self.ordering)
+
+    def decode_cursor(self, request):
+        encoded=request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            payload=json.loads(b64decode(encoded.encode('ascii')).decode('ascii'))
+            if payload['o']!=self._ordering_key() or len(payload['p'])!=len(self.ordering):
+                raise ValueError
+            return bool(payload['r']),payload['p']
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position, reverse):
+        payload={'o':self._ordering_key(),'p':position,'r':int(reverse)}
+        encoded=b64encode(json.dumps(payload,separators=(',',':')).encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url,self.cursor_query_param,encoded)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if not self.page:
+            # walked backwards past the start, the old position is still valid
+            return remove_query_param(self.base_url,self.cursor_query_param)
+        return self.encode_cursor(self._get_position_from_instance(self.page[-1],self.ordering),False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self._get_position_from_instance(self.page[0],self.ordering),True)
+
+    def get_html_context(self):
+        return {
+            'previous_url':self.get_previous_link(),
+            'next_url':self.get_next_link(),
+        }
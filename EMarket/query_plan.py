@@ -0,0 +1,59 @@
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+
+def _walk(serializer, model, prefix, many, select, prefetch):
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*':
+            continue
+        if isinstance(field, serializers.PrimaryKeyRelatedField):
+            # rendered straight from the *_id column, no join needed
+            continue
+
+        current_model = model
+        path = prefix
+        path_many = many
+        for attr in field.source_attrs:
+            try:
+                model_field = current_model._meta.get_field(attr)
+            except FieldDoesNotExist:
+                break
+            if not model_field.is_relation or model_field.related_model is None:
+                break
+            path = f'{path}__{attr}' if path else attr
+            path_many = path_many or model_field.many_to_many or model_field.one_to_many
+            (prefetch if path_many else select).add(path)
+            current_model = model_field.related_model
+        else:
+            if path != prefix and isinstance(field, serializers.BaseSerializer):
+                _walk(field, current_model, path, path_many, select, prefetch)
+
+
+@lru_cache(maxsize=None)
+def plan_for(serializer_class, model):
+    """
+    Work out the select_related/prefetch_related lookups needed to render
+    `serializer_class` for `model` without touching the database per row.
+    Forward FK chains are joined, anything under a reverse/M2M relation is
+    prefetched. The plan only depends on the declared fields so it is cached.
+    """
+    select, prefetch = set(), set()
+    _walk(serializer_class(), model, '', False, select, prefetch)
+    # drop lookups already covered by a longer one
+    select = [s for s in select if not any(o.startswith(s + '__') for o in select)]
+    prefetch = [p for p in prefetch if not any(o.startswith(p + '__') for o in prefetch)]
+    return tuple(sorted(select)), tuple(sorted(prefetch))
+
+
+def plan_queryset(queryset, serializer_class):
+    select, prefetch = plan_for(serializer_class, queryset.model)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
@@ -34,10 +34,13 @@ INSTALLED_APPS = [
     'rest_framework',
     'rest_framework.authtoken',
     'corsheaders',
+    'core',
     'Users',
     'Products',
     'Orders',
     'shipping',
+    'taxes',
+    'analytics',
     'Reviews',
     'Payments',
     'drf_yasg',
@@ -153,6 +156,8 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ],
+    'DEFAULT_PAGINATION_CLASS': 'EMarket.pagination.KeysetCursorPagination',
+    'PAGE_SIZE': 20,
 }
 import os
 
@@ -22,8 +22,10 @@ from rest_framework_simplejwt.views import TokenObtainPairView ,TokenRefreshView
 from rest_framework.routers import DefaultRouter
 from Users.views import UserViewSet,PasswordResetTokenViewSet,ResetPasswordViewset,UserRegistrationViewset,EmailVerifyViewSet
 from Products.views import ProductViewSet,CategoryViewSet
-from Orders.views import OrderViewSet,CouponViewSet
-from shipping.views import GlobalShippingSerializerViewset,ShippingZoneViewset
+from Orders.views import OrderViewSet,CouponViewSet,SellerOrderViewSet,CartViewSet
+from shipping.views import GlobalShippingSerializerViewset,ShippingZoneViewset,ShippingRateTierViewset
+from taxes.views import TaxRateViewset
+from analytics.views import DashboardViewSet
 from Reviews.views import ReviewViewset
 from Payments.views import PaymentViewSet
 from drf_yasg.views import get_schema_view
@@ -41,8 +43,12 @@ router.register('user',UserViewSet,basename='user')
 router.register('category',CategoryViewSet,basename='category')
 router.register('product',ProductViewSet,basename='product')
 router.register('order',OrderViewSet,basename='order')
+router.register('seller-order',SellerOrderViewSet,basename='seller-order')
+router.register('cart',CartViewSet,basename='cart')
 router.register('shippingzone',ShippingZoneViewset,basename='shippingzone')
 router.register('globalshippingrate',GlobalShippingSerializerViewset,basename='globalshippingrate')
+router.register('shippingratetier',ShippingRateTierViewset,basename='shippingratetier')
+router.register('taxrate',TaxRateViewset,basename='taxrate')
 router.register('review',ReviewViewset,basename='review')
 router.register('payment',PaymentViewSet,basename='payment')
 router.register('reset-password',PasswordResetTokenViewSet,basename='reset-password')
@@ -51,6 +57,7 @@ router.register('chats',ConversationViewset,basename='chats')
 router.register('register',UserRegistrationViewset,basename='register')
 router.register('account',EmailVerifyViewSet,basename='account')
 router.register('coupon',CouponViewSet,basename='coupon')
+router.register('dashboard',DashboardViewSet,basename='dashboard')
 
 
 
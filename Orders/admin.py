@@ -1,7 +1,11 @@
 from django.contrib import admin
-from Orders.models import Order,OrderItem,Coupon
+from Orders.models import Order,OrderItem,Coupon,CouponRedemption,SellerOrder,Cart,CartItem
 
 # Register your models here.
 admin.site.register(Order)
 admin.site.register(OrderItem)
-admin.site.register(Coupon)
\ No newline at end of file
+admin.site.register(Coupon)
+admin.site.register(CouponRedemption)
+admin.site.register(SellerOrder)
+admin.site.register(Cart)
+admin.site.register(CartItem)
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class OrdersConfig(AppConfig):
     name = 'Orders'
+
+    def ready(self):
+        from Orders import signals  # noqa: F401
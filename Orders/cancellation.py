@@ -0,0 +1,55 @@
+from collections import Counter
+
+from django.db.models import Case, F, Sum, When
+from Orders.coupons import coupon_cache
+from Orders.events import orders_changed
+from Orders.models import Coupon, CouponRedemption, Order, OrderItem, SellerOrder
+from Orders.stock import release_stock
+from Payments.models import Payment
+
+
+def release_order_stock(order_ids):
+    """Give back the stock held by `order_ids` in one aggregated UPDATE."""
+    lines=(
+        OrderItem.objects.filter(order_id__in=order_ids)
+        .values('sku_id').annotate(quantity=Sum('quantity_at_purchase'))
+        .values_list('sku_id','quantity')
+    )
+    release_stock(lines)
+
+
+def release_coupons(order_ids):
+    """Undo the coupon redemptions made by `order_ids`."""
+    counts=Counter(
+        CouponRedemption.objects.filter(order_id__in=order_ids).values_list('coupon_id',flat=True)
+    )
+    if not counts:
+        return
+    CouponRedemption.objects.filter(order_id__in=order_ids).delete()
+    Coupon.objects.filter(id__in=list(counts)).update(
+        used_count=F('used_count')-Case(*[When(id=coupon_id,then=n) for coupon_id,n in counts.items()])
+    )
+    coupon_cache.invalidate()
+
+
+def undo_checkout(order_ids):
+    """Hand back stock and coupon uses, fail pending payments and cancel seller orders."""
+    release_order_stock(order_ids)
+    release_coupons(order_ids)
+    Payment.objects.filter(order_id__in=order_ids).exclude(status='completed').update(status='failed')
+    SellerOrder.objects.filter(order_id__in=order_ids).update(status='canceled')
+
+
+def cancel_orders(order_ids):
+    """
+    Cancel `order_ids` with set-based statements: status, stock, pending
+    payments and coupon usage. Call inside a transaction with the rows
+    already claimed so they are not cancelled twice.
+    """
+    order_ids=list(order_ids)
+    if not order_ids:
+        return 0
+    undo_checkout(order_ids)
+    canceled=Order.objects.filter(id__in=order_ids).update(status='canceled',reserved_until=None)
+    orders_changed.send(sender=Order,order_ids=order_ids)
+    return canceled
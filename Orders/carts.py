@@ -0,0 +1,165 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F
+from Orders.checkout import category_of, place_order
+from Orders.models import Cart, CartItem
+from Orders.pricing import ZERO, price_order
+from shipping.rates import VOLUMETRIC_DIVISOR
+
+
+class CartError(Exception):
+    pass
+
+
+def get_cart(user):
+    cart,_=Cart.objects.select_related('coupon').get_or_create(customer=user)
+    return cart
+
+
+def requote(cart):
+    """Bring tax, shipping and discount up to date with the current rate tables, in memory."""
+    _refresh(cart)
+    return cart
+
+
+def _lock(user):
+    Cart.objects.get_or_create(customer=user)
+    return Cart.objects.select_related('coupon').select_for_update(of=('self',)).get(customer=user)
+
+
+def _volume(sku):
+    return sku.length*sku.width*sku.height
+
+
+def _add_taxable(cart, category_id, amount):
+    key='' if category_id is None else str(category_id)
+    total=Decimal(cart.taxable.get(key,'0'))+amount
+    if total:
+        cart.taxable[key]=str(total)
+    else:
+        cart.taxable.pop(key,None)
+
+
+def _taxable(cart):
+    return [(int(key) if key else None,Decimal(amount)) for key,amount in cart.taxable.items()]
+
+
+def _refresh(cart):
+    # derived totals only read the running sums, never the items
+    weight=max(cart.weight,cart.volume/VOLUMETRIC_DIVISOR)
+    totals=price_order(cart.subtotal,cart.coupon,cart.country,weight,_taxable(cart))
+    totals.pop('coupon')
+    for field,value in totals.items():
+        setattr(cart,field,value)
+
+
+def _reset(cart, items):
+    cart.subtotal=sum((item.unit_price*item.quantity for item in items),ZERO)
+    cart.weight=sum((item.sku.weight*item.quantity for item in items),Decimal(0))
+    cart.volume=sum((_volume(item.sku)*item.quantity for item in items),Decimal(0))
+    cart.taxable={}
+    for item in items:
+        _add_taxable(cart,category_of(item.sku),item.unit_price*item.quantity)
+    _refresh(cart)
+
+
+def set_quantity(user, sku, quantity):
+    """
+    Set how many of `sku` are in the cart (0 removes the line) and move the
+    running sums by the difference, so a change costs the same whatever the
+    size of the cart.
+    """
+    with transaction.atomic():
+        cart=_lock(user)
+        item=CartItem.objects.filter(cart=cart,sku=sku).first()
+        previous=item.quantity if item else 0
+        unit_price=item.unit_price if item else sku.price
+        if quantity and item:
+            item.quantity=quantity
+            item.save(update_fields=['quantity'])
+        elif quantity:
+            CartItem.objects.create(cart=cart,sku=sku,quantity=quantity,unit_price=unit_price)
+        elif item:
+            item.delete()
+        change=quantity-previous
+        cart.subtotal+=unit_price*change
+        cart.weight+=sku.weight*change
+        cart.volume+=_volume(sku)*change
+        _add_taxable(cart,category_of(sku),unit_price*change)
+        _refresh(cart)
+        cart.save()
+    return cart
+
+
+def set_coupon(user, coupon):
+    with transaction.atomic():
+        cart=_lock(user)
+        cart.coupon=coupon
+        _refresh(cart)
+        cart.save()
+    return cart
+
+
+def set_country(user, country):
+    with transaction.atomic():
+        cart=_lock(user)
+        cart.country=country
+        _refresh(cart)
+        cart.save()
+    return cart
+
+
+def rebuild_carts(cart_ids):
+    """Recompute carts from their lines, for when lines went away behind their back."""
+    for cart in Cart.objects.filter(id__in=cart_ids).select_related('coupon'):
+        _reset(cart,list(cart.items.select_related('sku__product')))
+        cart.save()
+
+
+def checkout_cart(user, **fields):
+    """
+    Turn the cart into an order in one transaction and empty it. The
+    running sums are used as they are unless a SKU changed price since it
+    was added, in which case the lines are repriced first; tax, shipping and
+    discount are requoted from them against the current rate tables.
+    """
+    with transaction.atomic():
+        cart=_lock(user)
+        items=list(
+            CartItem.objects.filter(cart=cart).select_related('sku')
+            .annotate(seller_id=F('sku__product__created_by'),category_id=F('sku__product__category'))
+        )
+        if not items:
+            raise CartError('cart is empty')
+        repriced=False
+        for item in items:
+            item.sku.seller_id=item.seller_id
+            item.sku.category_id=item.category_id
+            if item.unit_price!=item.sku.price:
+                item.unit_price=item.sku.price
+                repriced=True
+        if repriced:
+            _reset(cart,items)
+        else:
+            _refresh(cart)
+        if cart.coupon and not cart.coupon.is_valid(cart.subtotal,user=user):
+            raise CartError('coupon can no longer be used, remove it to continue')
+
+        totals={
+            'coupon':cart.coupon if cart.discount_amount else None,
+            'discount_amount':cart.discount_amount,
+            'tax':cart.tax,
+            'shipping_cost':cart.shipping_cost,
+            'total_amount':cart.total_amount,
+        }
+        order=place_order(
+            [(item.sku,item.quantity) for item in items],totals,
+            customer=user,country=cart.country,**fields
+        )
+
+        CartItem.objects.filter(cart=cart).delete()
+        cart.coupon=None
+        _reset(cart,[])
+        cart.save()
+    return order
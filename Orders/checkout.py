@@ -0,0 +1,52 @@
+from django.db import transaction
+from Orders.coupons import redeem_coupon
+from Orders.fulfilment import split_by_seller
+from Orders.holds import hold_expiry
+from Orders.models import Order, OrderItem
+from Orders.stock import reserve_stock
+
+
+def seller_of(sku):
+    if hasattr(sku,'seller_id'):
+        return sku.seller_id
+    return sku.product.created_by_id
+
+
+def category_of(sku):
+    if hasattr(sku,'category_id'):
+        return sku.category_id
+    return sku.product.category_id
+
+
+def taxable_lines(lines):
+    return [(category_of(sku),sku.price*quantity) for sku,quantity in lines]
+
+
+def place_order(lines, totals, **fields):
+    """
+    Write an order for (sku, quantity) `lines` whose totals (see
+    Orders.pricing.price_order) are already known. It is a fixed number of
+    statements however many lines there are: one stock UPDATE, one order
+    INSERT, one bulk INSERT each for the seller orders and the items and the
+    coupon claim, which goes last so the coupon row stays locked only until
+    commit. Raises InsufficientStock or CouponUnavailable with nothing
+    written.
+    """
+    with transaction.atomic():
+        reserve_stock((sku.pk,quantity) for sku,quantity in lines)
+        order=Order.objects.create(reserved_until=hold_expiry(),**totals,**fields)
+        items=[
+            OrderItem(
+                order=order,
+                sku=sku,
+                seller_id=seller_of(sku),
+                price_at_purchase=sku.price,
+                quantity_at_purchase=quantity
+            )
+            for sku,quantity in lines
+        ]
+        split_by_seller(order,items)
+        OrderItem.objects.bulk_create(items)
+        if totals.get('coupon'):
+            redeem_coupon(totals['coupon'],order.customer,order)
+    return order
@@ -0,0 +1,68 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from EMarket.cache import ProcessCache
+from Orders.models import Coupon, CouponRedemption
+
+
+class CouponUnavailable(Exception):
+    pass
+
+
+def _load_coupons():
+    return {coupon.code:coupon for coupon in Coupon.objects.all()}
+
+
+# code -> Coupon. used_count on these copies goes stale between admin
+# edits, so checks against it are only a pre-filter; redeem_coupon() is
+# the authority on whether a use is still left.
+coupon_cache=ProcessCache('coupons',_load_coupons)
+
+
+def get_coupon(code):
+    if not code:
+        return None
+    return coupon_cache.get().get(code)
+
+
+def coupon_problem(coupon, subtotal, user=None):
+    """Why `coupon` can't be used on `subtotal` by `user`, or None."""
+    if user is not None and coupon.redemptions.filter(user_id=user.id).exists():
+        return "coupon is already used"
+    if coupon.is_valid(subtotal):
+        return None
+    now=timezone.now()
+    if not coupon.active:
+        return "Coupon is not active."
+    if not (coupon.valid_from<=now<=coupon.valid_to):
+        return "Coupon has expired."
+    if coupon.used_count>=coupon.usage_limit:
+        return "Coupon usage limit reached."
+    if subtotal<coupon.min_purchase_ammount:
+        return f"Minimum purchase of {coupon.min_purchase_ammount} required."
+    return "Coupon criteria not met."
+
+
+def redeem_coupon(coupon, user, order=None):
+    """
+    Record one use of `coupon` by `user`. The per-user row is guarded by a
+    unique constraint and the counter is claimed with
+
+        UPDATE coupon SET used_count = used_count + 1
+        WHERE id = %s AND active AND used_count < usage_limit
+
+    so a flash sale can never go past usage_limit however many checkouts
+    race for the last uses. Call it last in the checkout transaction to keep
+    the coupon row locked for as short as possible; raising rolls the rest of
+    the checkout back.
+    """
+    try:
+        with transaction.atomic():
+            CouponRedemption.objects.create(coupon=coupon,user=user,order=order)
+    except IntegrityError:
+        raise CouponUnavailable('coupon is already used')
+    claimed=Coupon.objects.filter(
+        pk=coupon.pk,active=True,used_count__lt=F('usage_limit')
+    ).update(used_count=F('used_count')+1)
+    if not claimed:
+        raise CouponUnavailable('coupon has already been used maximum time')
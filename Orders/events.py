@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Sent with `order_ids` after a queryset UPDATE changed orders or their
+# seller orders, which the model save signals never see.
+orders_changed=Signal()
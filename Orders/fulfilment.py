@@ -0,0 +1,44 @@
+from collections import defaultdict
+
+from django.db.models import Case, Min, When
+from Orders.events import orders_changed
+from Orders.models import Order, SellerOrder
+
+# what a seller may do with their part of an order, one step at a time
+FORWARD_FLOW=['pending','processing','shipped']
+# how far along an order is; it sits at its least advanced seller order
+PROGRESS=FORWARD_FLOW+['delivered']
+
+
+def split_by_seller(order, items):
+    """
+    Create one SellerOrder per seller among the unsaved `items` of `order`
+    with a single INSERT and point each item at its seller order.
+    """
+    seller_orders={}
+    for item in items:
+        if item.seller_id not in seller_orders:
+            seller_orders[item.seller_id]=SellerOrder(order=order,seller_id=item.seller_id)
+    SellerOrder.objects.bulk_create(seller_orders.values())
+    for item in items:
+        item.seller_order=seller_orders[item.seller_id]
+    return list(seller_orders.values())
+
+
+def rollup_status(order_ids):
+    """
+    Move each order in `order_ids` to the least advanced status among its
+    live seller orders: one aggregate, then one UPDATE per resulting status
+    that only touches orders whose status actually changes.
+    """
+    rank=Case(*[When(status=s,then=i) for i,s in enumerate(PROGRESS)])
+    targets=defaultdict(list)
+    for row in (
+        SellerOrder.objects.filter(order_id__in=order_ids).exclude(status='canceled')
+        .values('order_id').annotate(rank=Min(rank)).order_by()
+    ):
+        targets[PROGRESS[row['rank']]].append(row['order_id'])
+    for new_status,ids in targets.items():
+        Order.objects.filter(id__in=ids).exclude(status__in=[new_status,'canceled']).update(status=new_status)
+    orders_changed.send(sender=Order,order_ids=list(order_ids))
+
@@ -0,0 +1,45 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from Orders.cancellation import cancel_orders
+from Orders.models import Order
+from Payments.models import Payment
+
+HOLD_MINUTES=getattr(settings,'ORDER_HOLD_MINUTES',30)
+# how long an unanswered online payment keeps its order past the hold
+PAYMENT_WAIT=timedelta(hours=getattr(settings,'ORDER_PAYMENT_WAIT_HOURS',24))
+
+
+def hold_expiry(now=None):
+    return (now or timezone.now())+timedelta(minutes=HOLD_MINUTES)
+
+
+def expire_holds(now=None, batch_size=500):
+    """
+    Cancel pending orders whose stock hold ran out and hand their stock
+    back. Works through `(status, reserved_until)` in batches, each batch
+    claimed with SKIP LOCKED so several sweepers can run side by side, so
+    the cost follows the number of expired orders, not the order table.
+    Orders with an online payment the reconciler is still checking wait for
+    its answer, up to PAYMENT_WAIT; the customer may already have paid.
+    """
+    now=now or timezone.now()
+    confirming=Payment.objects.filter(
+        order=OuterRef('pk'),status='pending',check_after__isnull=False,created_at__gt=now-PAYMENT_WAIT
+    )
+    expired=0
+    while True:
+        with transaction.atomic():
+            ids=list(
+                Order.objects.filter(~Exists(confirming),status='pending',reserved_until__lt=now)
+                .order_by('reserved_until')
+                .select_for_update(skip_locked=True)
+                .values_list('id',flat=True)[:batch_size]
+            )
+            cancel_orders(ids)
+        expired+=len(ids)
+        if len(ids)<batch_size:
+            return expired
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+from Orders.holds import expire_holds
+
+
+class Command(BaseCommand):
+    help='Cancel unpaid orders whose stock hold expired and release their stock'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop',action='store_true',help='keep sweeping until interrupted')
+        parser.add_argument('--interval',type=float,default=30,help='seconds between sweeps with --loop')
+        parser.add_argument('--batch-size',type=int,default=500)
+
+    def handle(self, *args, **options):
+        while True:
+            expired=expire_holds(batch_size=options['batch_size'])
+            if expired or not options['loop']:
+                self.stdout.write(f'expired {expired} orders')
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
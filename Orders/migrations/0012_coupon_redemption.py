@@ -0,0 +1,49 @@
+# Generated by Django 6.0.1 on 2026-10-18 03:25
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def copy_redemptions(apps, schema_editor):
+    Coupon = apps.get_model('Orders', 'Coupon')
+    Order = apps.get_model('Orders', 'Order')
+    CouponRedemption = apps.get_model('Orders', 'CouponRedemption')
+    rows = []
+    for coupon_id, user_id in Coupon.users_used.through.objects.values_list('coupon_id', 'user_id'):
+        order = (
+            Order.objects.filter(coupon_id=coupon_id, customer_id=user_id)
+            .order_by('-created_at').values_list('id', flat=True).first()
+        )
+        rows.append(CouponRedemption(coupon_id=coupon_id, user_id=user_id, order_id=order))
+    CouponRedemption.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Orders', '0011_order_reserved_until'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CouponRedemption',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('coupon', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='redemptions', to='Orders.coupon')),
+                ('order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='coupon_redemptions', to='Orders.order')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='coupon_redemptions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('coupon', 'user')},
+            },
+        ),
+        migrations.RunPython(copy_redemptions, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='coupon',
+            name='users_used',
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 6.0.1 on 2026-10-18 03:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_sellers(apps, schema_editor):
+    OrderItem = apps.get_model('Orders', 'OrderItem')
+    ProductSKU = apps.get_model('Products', 'ProductSKU')
+    OrderItem.objects.update(seller=Subquery(
+        ProductSKU.objects.filter(pk=OuterRef('sku_id')).values('product__created_by')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Orders', '0012_coupon_redemption'),
+        ('Products', '0018_sku_shipping_dimensions'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='seller',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sold_items', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='orderitem',
+            index=models.Index(fields=['seller', 'order'], name='Orders_orde_seller__76c601_idx'),
+        ),
+        migrations.RunPython(fill_sellers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 6.0.1 on 2026-10-18 03:32
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def split_existing_orders(apps, schema_editor):
+    Order = apps.get_model('Orders', 'Order')
+    OrderItem = apps.get_model('Orders', 'OrderItem')
+    SellerOrder = apps.get_model('Orders', 'SellerOrder')
+    orders = {o['id']: o for o in Order.objects.values('id', 'status', 'created_at')}
+    pairs = OrderItem.objects.values_list('order_id', 'seller_id').distinct()
+    SellerOrder.objects.bulk_create([
+        SellerOrder(
+            order_id=order_id, seller_id=seller_id,
+            status=orders[order_id]['status'], created_at=orders[order_id]['created_at'],
+        )
+        for order_id, seller_id in pairs
+    ], batch_size=1000)
+    same_order = SellerOrder.objects.filter(order=OuterRef('order'))
+    OrderItem.objects.filter(seller__isnull=False).update(seller_order=Subquery(
+        same_order.filter(seller=OuterRef('seller')).values('pk')[:1]
+    ))
+    OrderItem.objects.filter(seller__isnull=True).update(seller_order=Subquery(
+        same_order.filter(seller__isnull=True).values('pk')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Orders', '0013_order_item_seller'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SellerOrder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('delivered', 'Delivered'), ('processing', 'Processing'), ('shipped', 'Shipped'), ('canceled', 'Canceled')], default='pending', max_length=50)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='seller_orders', to='Orders.order')),
+                ('seller', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='seller_orders', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='seller_order',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='items', to='Orders.sellerorder'),
+        ),
+        migrations.AddIndex(
+            model_name='sellerorder',
+            index=models.Index(fields=['seller', 'created_at'], name='Orders_sell_seller__5430f9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sellerorder',
+            index=models.Index(fields=['seller', 'status'], name='Orders_sell_seller__466ab6_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='sellerorder',
+            unique_together={('order', 'seller')},
+        ),
+        migrations.RunPython(split_existing_orders, migrations.RunPython.noop),
+    ]
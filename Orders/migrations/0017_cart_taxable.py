@@ -0,0 +1,35 @@
+# Generated by Django 6.0.1 on 2026-10-18 03:41
+
+from collections import defaultdict
+from decimal import Decimal
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+def fill_taxable(apps, schema_editor):
+    Cart = apps.get_model('Orders', 'Cart')
+    CartItem = apps.get_model('Orders', 'CartItem')
+    sums = defaultdict(lambda: defaultdict(Decimal))
+    items = CartItem.objects.values_list('cart_id', 'sku__product__category_id', 'unit_price', 'quantity')
+    for cart_id, category_id, unit_price, quantity in items.iterator():
+        sums[cart_id]['' if category_id is None else str(category_id)] += unit_price * quantity
+    for cart in Cart.objects.filter(pk__in=list(sums)):
+        cart.taxable = {key: str(amount) for key, amount in sums[cart.pk].items() if amount}
+        cart.save(update_fields=['taxable'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Orders', '0016_carts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='taxable',
+            field=models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder),
+        ),
+        migrations.RunPython(fill_taxable, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-18 09:20
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # IdempotencyKey moved to the core app; the table is renamed and kept
+    # with its rows, core.0002_idempotency_keys takes the model over
+
+    dependencies = [
+        ('Orders', '0017_cart_taxable'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.AlterModelTable(name='IdempotencyKey', table='core_idempotencykey'),
+            ],
+            state_operations=[
+                migrations.DeleteModel(name='IdempotencyKey'),
+            ],
+        ),
+    ]
@@ -2,6 +2,7 @@ from django.db import models
 from django.conf import settings
 from Products.models import ProductSKU 
 from django.utils import timezone
+from django.core.serializers.json import DjangoJSONEncoder
 
 # Create your models here.
 
@@ -11,7 +12,6 @@ class Coupon(models.Model):
        ('fixed','Fixed'),
        ('percentage','Percentage')
     ]
-   users_used=models.ManyToManyField(settings.AUTH_USER_MODEL,blank=True,related_name='used_coupons')
    code=models.CharField(max_length=50,unique=True)
    discount_type=models.CharField(max_length=50,choices=DISCOUNT_CHOICES,default='fixed')
    discount_value=models.DecimalField(max_digits=10,decimal_places=2)
@@ -29,7 +29,7 @@ class Coupon(models.Model):
        now = timezone.now()
 
       
-       if user and self.users_used.filter(id=user.id).exists():
+       if user and self.redemptions.filter(user_id=user.id).exists():
            return False
 
        return (
@@ -68,17 +68,60 @@ class Order(models.Model):
      transaction_id=models.CharField( max_length=50,blank=True,null=True)
      created_at=models.DateTimeField( default=timezone.now)
      updated_at=models.DateTimeField( auto_now=True)
+     # stock is held for unpaid orders until this time, see Orders.holds
+     reserved_until=models.DateTimeField(null=True,blank=True)
      class Meta:
         ordering=['-created_at']
+        indexes=[
+            models.Index(fields=['status','reserved_until']),
+        ]
 
      def __str__(self):
         return f"order #{self.id}-{self.customer.username}"
+class SellerOrder(models.Model):
+     # the part of an order one seller fulfils, see Orders.fulfilment
+     order=models.ForeignKey(Order,on_delete=models.CASCADE,related_name='seller_orders')
+     seller=models.ForeignKey(settings.AUTH_USER_MODEL,on_delete=models.SET_NULL,null=True,blank=True,related_name='seller_orders')
+     status=models.CharField(max_length=50,choices=Order.STATUS_CHOICES,default='pending')
+     created_at=models.DateTimeField(default=timezone.now)
+     updated_at=models.DateTimeField(auto_now=True)
+     class Meta:
+        ordering=['-created_at']
+        unique_together=('order','seller')
+        indexes=[
+            models.Index(fields=['seller','created_at']),
+            models.Index(fields=['seller','status']),
+        ]
+
+     def __str__(self):
+        return f"order #{self.order_id} for {self.seller_id}:{self.status}"
+class CouponRedemption(models.Model):
+    # one row per customer per coupon, see Orders.coupons.redeem_coupon
+    coupon=models.ForeignKey(Coupon,on_delete=models.CASCADE,related_name='redemptions')
+    user=models.ForeignKey(settings.AUTH_USER_MODEL,on_delete=models.CASCADE,related_name='coupon_redemptions')
+    order=models.ForeignKey(Order,on_delete=models.SET_NULL,null=True,blank=True,related_name='coupon_redemptions')
+    created_at=models.DateTimeField(default=timezone.now)
+    class Meta:
+        unique_together=('coupon','user')
+
+    def __str__(self):
+        return f"{self.coupon} used by {self.user_id}"
+
 class OrderItem(models.Model):
     order=models.ForeignKey(Order,  on_delete=models.CASCADE,related_name='order_item')
     sku=models.ForeignKey(ProductSKU,on_delete=models.CASCADE,related_name='order_sku')
+    # copy of sku.product.created_by taken at checkout so seller listings
+    # don't have to join through SKU and product
+    seller=models.ForeignKey(settings.AUTH_USER_MODEL,on_delete=models.SET_NULL,null=True,blank=True,related_name='sold_items',db_index=False)
+    seller_order=models.ForeignKey(SellerOrder,on_delete=models.CASCADE,null=True,blank=True,related_name='items')
     price_at_purchase=models.IntegerField()
     quantity_at_purchase=models.PositiveIntegerField(default=1)
 
+    class Meta:
+        indexes=[
+            models.Index(fields=['seller','order']),
+        ]
+
     def __str__(self):
       return f"Item: {self.sku.sku_code if self.sku else 'Removed Product'} (Qty: {self.quantity_at_purchase})"
     
@@ -98,3 +141,36 @@ class OrderItem(models.Model):
 
           
      
+
+
+class Cart(models.Model):
+    # running totals kept in step with the items, see Orders.carts
+    customer=models.OneToOneField(settings.AUTH_USER_MODEL,on_delete=models.CASCADE,related_name='cart')
+    coupon=models.ForeignKey(Coupon,on_delete=models.SET_NULL,null=True,blank=True,related_name='carts')
+    country=models.CharField(max_length=100,default='Nepal')
+    subtotal=models.DecimalField(max_digits=12,decimal_places=2,default=0)
+    weight=models.DecimalField(max_digits=12,decimal_places=3,default=0)
+    volume=models.DecimalField(max_digits=16,decimal_places=1,default=0)
+    # running line amounts per category id ('' for none), what tax is quoted on
+    taxable=models.JSONField(default=dict,blank=True,encoder=DjangoJSONEncoder)
+    discount_amount=models.DecimalField(max_digits=12,decimal_places=2,default=0)
+    tax=models.DecimalField(max_digits=12,decimal_places=2,default=0)
+    shipping_cost=models.DecimalField(max_digits=10,decimal_places=2,default=0)
+    total_amount=models.DecimalField(max_digits=12,decimal_places=2,default=0)
+    updated_at=models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"cart of {self.customer_id}:{self.total_amount}"
+
+
+class CartItem(models.Model):
+    cart=models.ForeignKey(Cart,on_delete=models.CASCADE,related_name='items')
+    sku=models.ForeignKey(ProductSKU,on_delete=models.CASCADE,related_name='cart_items')
+    quantity=models.PositiveIntegerField(default=1)
+    # price when the line was added, what the running subtotal is built on
+    unit_price=models.DecimalField(max_digits=10,decimal_places=2)
+    class Meta:
+        unique_together=('cart','sku')
+
+    def __str__(self):
+        return f"{self.sku_id} x {self.quantity}"
@@ -0,0 +1,35 @@
+from decimal import Decimal
+
+from shipping.rates import shipping_rate
+from taxes.rates import quote_tax
+
+ZERO=Decimal('0.00')
+CENT=Decimal('0.01')
+
+
+def discount_for(coupon, subtotal):
+    """What `coupon` takes off `subtotal`, zero when it doesn't apply."""
+    if coupon is None or subtotal<coupon.min_purchase_ammount:
+        return ZERO
+    if coupon.discount_type=='fixed':
+        return coupon.discount_value
+    return coupon.discount_value/Decimal(100)*subtotal
+
+
+def price_order(subtotal, coupon, country, weight=0, taxable=None):
+    """
+    Everything an order charges on top of its lines, as Order field values.
+    `taxable` is the (category_id, amount) lines tax is worked out on, the
+    whole subtotal at the general rate when not given. `coupon` comes back
+    as None when the subtotal doesn't reach its minimum.
+    """
+    discount=discount_for(coupon,subtotal).quantize(CENT)
+    tax=quote_tax(country,[(None,subtotal)] if taxable is None else taxable)
+    shipping_cost=shipping_rate(country,weight,subtotal-discount)
+    return {
+        'coupon':coupon if discount else None,
+        'discount_amount':discount,
+        'tax':tax,
+        'shipping_cost':shipping_cost,
+        'total_amount':max(ZERO,subtotal+tax+shipping_cost-discount),
+    }
@@ -1,18 +1,40 @@
 from decimal import Decimal
 from rest_framework.serializers import ModelSerializer
 from rest_framework import serializers
-from Orders.models import Order, OrderItem,Coupon
+from Orders.models import Order, OrderItem,Coupon,SellerOrder,Cart,CartItem
 from Products.models import ProductSKU
-from django.db import transaction
-from django.conf import settings
-from shipping.models import GlobalShippingrate,ShippingZone
+from django.db.models import F,prefetch_related_objects
+from shipping.rates import chargeable_weight
 from Payments.models import Payment
 from django.utils import timezone
+from Orders.stock import InsufficientStock
+from Orders.coupons import CouponUnavailable,get_coupon
+from Orders.checkout import place_order,taxable_lines
+from Orders.pricing import price_order
+
+class PrefetchedSKUField(serializers.PrimaryKeyRelatedField):
+    # OrderSerializer loads every SKU of the payload in one query up front
+    def to_internal_value(self, data):
+        skus=self.context.get('skus')
+        if skus is not None:
+            try:
+                return skus[int(data)]
+            except (KeyError, TypeError, ValueError):
+                pass
+        return super().to_internal_value(data)
+
 
 class OrderItemSerializer(ModelSerializer):
+    sku=PrefetchedSKUField(queryset=ProductSKU.objects.all())
+    # enough of the SKU and product to show the line without fetching them
+    sku_code=serializers.CharField(source='sku.sku_code',read_only=True)
+    sku_image=serializers.ImageField(source='sku.image',read_only=True)
+    product=serializers.IntegerField(source='sku.product.id',read_only=True)
+    product_name=serializers.CharField(source='sku.product.name',read_only=True)
+    product_image=serializers.ImageField(source='sku.product.image',read_only=True)
     class Meta:
         model=OrderItem
-        fields=['id','order','sku', 'price_at_purchase','quantity_at_purchase']
+        fields=['id','order','sku','sku_code','sku_image','product','product_name','product_image','price_at_purchase','quantity_at_purchase']
         read_only_fields=['price_at_purchase', 'order']
 
 
@@ -21,17 +43,46 @@ class SimplePaymentSerializer(ModelSerializer):
         model = Payment
         fields = ['id', 'status', 'amount', 'method', 'transaction_uuid']
 
+class SellerOrderSummarySerializer(ModelSerializer):
+    class Meta:
+        model=SellerOrder
+        fields=['id','seller','status','updated_at']
+
+
+class SellerOrderSerializer(ModelSerializer):
+    items=OrderItemSerializer(many=True,read_only=True)
+    class Meta:
+        model=SellerOrder
+        fields=['id','order','seller','status','items','created_at','updated_at']
+        read_only_fields=['order','seller','created_at','updated_at']
+
+
 class OrderSerializer(ModelSerializer):
     order_item=OrderItemSerializer(many=True ,required=True)
     payment_details = SimplePaymentSerializer(many=True, read_only=True)
+    seller_orders=SellerOrderSummarySerializer(many=True,read_only=True)
     coupon_code=serializers.CharField(write_only=True,required=False,allow_blank=True)
     class Meta:
         model=Order
         fields=['id',  'full_name', 'email', 'contact', 'address', 
             'city', 'postal_code','country', 'total_amount', 'tax', 
-            'shipping_cost', 'status', 'order_item', 'created_at','transaction_id','updated_at', 'payment_details','coupon', 'coupon_code','discount_amount']
+            'shipping_cost', 'status', 'order_item', 'created_at','transaction_id','updated_at', 'payment_details','coupon', 'coupon_code','discount_amount','seller_orders']
         read_only_fields=['transaction_id','created_at','updated_at','shipping_cost','tax','total_amount','coupon','discount_amount']
 
+    def to_internal_value(self, data):
+        items=data.get('order_item') if hasattr(data,'get') else None
+        if isinstance(items,list):
+            ids=set()
+            for item in items:
+                try:
+                    ids.add(int(item.get('sku')))
+                except (AttributeError, TypeError, ValueError):
+                    pass
+            self.context['skus']=ProductSKU.objects.annotate(
+                seller_id=F('product__created_by'),category_id=F('product__category')
+            ).in_bulk(ids)
+        return super().to_internal_value(data)
+
     def validate(self, data):
         coupon_code=data.get('coupon_code')
         item_data=data.get('order_item',[])
@@ -50,7 +101,9 @@ class OrderSerializer(ModelSerializer):
         
         if coupon_code:
             try:
-                coupon=Coupon.objects.get(code=coupon_code)
+                coupon=get_coupon(coupon_code)
+                if coupon is None:
+                    raise Coupon.DoesNotExist
 
                 if not coupon.is_valid(total_sum,user=user):
                      now=timezone.now()
@@ -69,13 +122,13 @@ class OrderSerializer(ModelSerializer):
                          raise serializers.ValidationError('invalid coupon')
                      
                 data['coupon_obj']=coupon
-                data['total_sum']=total_sum
 
 
             except Coupon.DoesNotExist:
                 raise serializers.ValidationError('coupon does not exsit')
     
 
+        data['total_sum']=total_sum
         return data
 
 
@@ -86,8 +139,11 @@ class OrderSerializer(ModelSerializer):
         data = super().to_representation(instance)
         request = self.context.get('request')
 
-        if request and hasattr(request.user, 'role') and request.user.role == 'seller':
-            seller_items = instance.order_item.filter(sku__product__created_by=request.user)
+        # OrderViewSet prefetches only the seller's own items; fall back to a
+        # query when the prefetch was dropped, e.g. after an update
+        if request and hasattr(request.user, 'role') and request.user.role == 'seller' \
+                and 'order_item' not in getattr(instance, '_prefetched_objects_cache', {}):
+            seller_items = instance.order_item.filter(seller=request.user)
             data['order_item'] = OrderItemSerializer(seller_items, many=True).data
         
         return data
@@ -96,94 +152,33 @@ class OrderSerializer(ModelSerializer):
         if not value:
             raise serializers.ValidationError('atleast one item should be present')
         return value
-    def get_shipping_cost(self,country_name):
-        if not country_name:
-          country_name='Nepal'
-        clean_country=country_name.strip()
-        zone=ShippingZone.objects.filter(country_name__iexact=clean_country).first()
-        if zone:
-            return zone.rate
-        
-        global_rate=GlobalShippingrate.objects.first()
-
-        if global_rate:
-            return global_rate.base_rate
-        
-        return Decimal('200.00')
-    
-
-
-
     def create(self, validated_data):
         item_data=validated_data.pop('order_item')
         
         coupon_obj=validated_data.pop('coupon_obj', None)
         coupon_code = validated_data.pop('coupon_code', None)
-        validated_data.pop('total_sum', None)
+        total_sum=validated_data.pop('total_sum', None)
         
       
         if not coupon_obj and coupon_code:
-            try:
-                coupon_obj = Coupon.objects.get(code=coupon_code)
-            except Coupon.DoesNotExist:
-                coupon_obj = None
-
-        total_sum=Decimal('0.00')
-
-        with transaction.atomic():
-            order=Order.objects.create(
-                tax=0,
-                shipping_cost=0,
-                total_amount=0,
-        
-                **validated_data
-                
-            )
-         
-            for item in item_data:
-                sku=item['sku']
-                quantity=item['quantity_at_purchase']
-                if(sku.stock<quantity):
-                    raise serializers.ValidationError(f'insufficent stock for{sku.sku_code}')
-                
-                sku.stock=sku.stock-quantity
-                sku.save()
-                
-                price=sku.price
-                total_sum=total_sum+(price*quantity)
-
-
-                OrderItem.objects.create(
-                    order=order,
-                    sku=sku,
-                    price_at_purchase=price,
-                    quantity_at_purchase=quantity
-                )
-
-            discount=Decimal('0.00')
-            if coupon_obj:
-                if coupon_obj.discount_type=='fixed':
-                    discount=coupon_obj.discount_value
-                else:
-                    discount=(coupon_obj.discount_value)/Decimal(100.00)*total_sum
-               
-                if total_sum >= coupon_obj.min_purchase_ammount:
-                     order.coupon=coupon_obj
-                     order.discount_amount=discount
-                     coupon_obj.used_count+=1
-                     coupon_obj.users_used.add(order.customer)
-                     coupon_obj.save()
-                else:
-                    discount = Decimal('0.00')
-
-            shipping_cost=self.get_shipping_cost(order.country)
-            order.shipping_cost=shipping_cost
-
-            tax_amount=total_sum*Decimal('0.13')
-            order.tax=tax_amount
-            order.total_amount=max(Decimal('0.00'), (total_sum+ tax_amount+ shipping_cost) - discount)
-            order.save()
-            return order        
+            coupon_obj = get_coupon(coupon_code)
+
+        lines=[(item['sku'],item['quantity_at_purchase']) for item in item_data]
+        if total_sum is None:
+            total_sum=sum((sku.price*quantity for sku,quantity in lines),Decimal('0.00'))
+        totals=price_order(
+            total_sum,coupon_obj,validated_data.get('country'),chargeable_weight(lines),taxable_lines(lines)
+        )
+
+        try:
+            order=place_order(lines,totals,**validated_data)
+        except InsufficientStock as e:
+            raise serializers.ValidationError(e.messages())
+        except CouponUnavailable as e:
+            raise serializers.ValidationError(str(e))
+        # the lines render product names, load them in a fixed number of queries
+        prefetch_related_objects([order],'order_item__sku__product')
+        return order
 
 class CouponSerailizer(ModelSerializer):
     class Meta:
@@ -197,6 +192,31 @@ class CouponSerailizer(ModelSerializer):
         return data
 
 
+class CartItemSerializer(ModelSerializer):
+    class Meta:
+        model=CartItem
+        fields=['id','sku','quantity','unit_price']
 
-         
-          
\ No newline at end of file
+
+class CartSerializer(ModelSerializer):
+    items=CartItemSerializer(many=True,read_only=True)
+    coupon_code=serializers.CharField(source='coupon.code',read_only=True,default=None)
+    class Meta:
+        model=Cart
+        fields=['id','items','coupon_code','country','subtotal','discount_amount','tax','shipping_cost','total_amount','updated_at']
+
+
+class CartLineSerializer(serializers.Serializer):
+    sku=serializers.PrimaryKeyRelatedField(queryset=ProductSKU.objects.select_related('product'))
+    quantity=serializers.IntegerField(min_value=0)
+
+    def validate(self,data):
+        if data['quantity']>data['sku'].stock:
+            raise serializers.ValidationError(f"only {data['sku'].stock} left of {data['sku'].sku_code}")
+        return data
+
+
+class CartCheckoutSerializer(ModelSerializer):
+    class Meta:
+        model=Order
+        fields=['full_name','email','contact','address','city','postal_code']
@@ -0,0 +1,20 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from Orders.carts import rebuild_carts
+from Orders.coupons import coupon_cache
+from Orders.models import CartItem, Coupon
+from Products.models import ProductSKU
+
+
+@receiver(post_save,sender=Coupon)
+@receiver(post_delete,sender=Coupon)
+def invalidate_coupons(sender, **kwargs):
+    coupon_cache.invalidate()
+
+
+@receiver(pre_delete,sender=ProductSKU)
+def drop_from_carts(sender, instance, **kwargs):
+    cart_ids=list(CartItem.objects.filter(sku=instance).values_list('cart_id',flat=True))
+    if cart_ids:
+        transaction.on_commit(lambda: rebuild_carts(cart_ids))
@@ -0,0 +1,78 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, F, Q, When
+from Products.models import ProductSKU
+
+
+class InsufficientStock(Exception):
+    def __init__(self, shortages):
+        self.shortages=shortages
+        super().__init__(self.messages())
+
+    def messages(self):
+        return [
+            f"insufficent stock for {s['sku_code']} (requested {s['requested']}, available {s['available']})"
+            for s in self.shortages
+        ] or ['insufficent stock']
+
+
+def _quantities(lines):
+    quantities=Counter()
+    for sku_id,quantity in lines:
+        quantities[sku_id]+=quantity
+    return quantities
+
+
+def _by_sku(quantities):
+    return Case(*[When(pk=sku_id,then=quantity) for sku_id,quantity in quantities.items()])
+
+
+def _take(quantities):
+    condition=Q()
+    for sku_id,quantity in quantities.items():
+        condition|=Q(pk=sku_id,stock__gte=quantity)
+    with transaction.atomic():
+        updated=ProductSKU.objects.filter(condition).update(stock=F('stock')-_by_sku(quantities))
+        if updated!=len(quantities):
+            transaction.set_rollback(True)
+            return False
+    return True
+
+
+def reserve_stock(lines):
+    """
+    Take stock for an order in one conditional UPDATE:
+
+        UPDATE sku SET stock = stock - CASE id WHEN .. END
+        WHERE (id = a AND stock >= qa) OR (id = b AND stock >= qb) ...
+
+    The database re-checks each row's condition under its row lock, so
+    concurrent checkouts can never take a SKU below zero, and no row is
+    read into Python first. `lines` is an iterable of (sku_id, quantity);
+    repeated SKUs are summed. If any SKU is short nothing is taken and
+    InsufficientStock lists every short SKU.
+    """
+    quantities=_quantities(lines)
+    if not quantities or _take(quantities):
+        return
+    current={
+        pk:(sku_code,stock) for pk,sku_code,stock in
+        ProductSKU.objects.filter(pk__in=list(quantities)).values_list('pk','sku_code','stock')
+    }
+    shortages=[
+        {'sku':pk,'sku_code':current.get(pk,(pk,0))[0],'requested':quantity,'available':current.get(pk,(pk,0))[1]}
+        for pk,quantity in quantities.items()
+        if current.get(pk,(pk,0))[1]<quantity
+    ]
+    # someone put stock back between the two statements
+    if not shortages and _take(quantities):
+        return
+    raise InsufficientStock(shortages)
+
+
+def release_stock(lines):
+    """Put stock back for (sku_id, quantity) lines in a single UPDATE."""
+    quantities=_quantities(lines)
+    if quantities:
+        ProductSKU.objects.filter(pk__in=list(quantities)).update(stock=F('stock')+_by_sku(quantities))
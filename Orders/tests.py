@@ -1,3 +1,612 @@
-from django.test import TestCase
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from Orders.models import Cart, Coupon, CouponRedemption, Order, OrderItem, SellerOrder
+from Orders.stock import InsufficientStock, release_stock, reserve_stock
+from Products.models import Category, Product, ProductSKU
+
+User = get_user_model()
+
+
+def make_sku(code, stock, price=100, seller=None):
+    category, _ = Category.objects.get_or_create(name='Misc')
+    product = Product.objects.create(
+        name=code, description='desc', base_price=price, category=category, created_by=seller
+    )
+    return ProductSKU.objects.create(product=product, sku_code=code, price=price, stock=stock)
+
+
+def order_payload(*lines):
+    return {
+        'full_name': 'Test Customer',
+        'email': 'customer@example.com',
+        'address': 'Street 1',
+        'city': 'Kathmandu',
+        'postal_code': '44600',
+        'country': 'Nepal',
+        'order_item': [{'sku': sku.id, 'quantity_at_purchase': quantity} for sku, quantity in lines],
+    }
+
+
+class StockReservationTest(APITestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user(username='customer', password='password123', role='customer')
+        self.client.force_authenticate(user=self.customer)
+
+    def test_checkout_takes_stock(self):
+        sku = make_sku('A', 5)
+        response = self.client.post('/order/', order_payload((sku, 2), (sku, 1)), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        sku.refresh_from_db()
+        self.assertEqual(sku.stock, 2)
+
+    def test_reports_every_short_sku_and_takes_nothing(self):
+        a, b, c = make_sku('A', 1), make_sku('B', 0), make_sku('C', 10)
+        response = self.client.post('/order/', order_payload((a, 2), (b, 1), (c, 3)), format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(response.data), 2)
+        self.assertEqual(
+            list(ProductSKU.objects.order_by('sku_code').values_list('stock', flat=True)), [1, 0, 10]
+        )
+        self.assertFalse(Order.objects.exists())
+
+    def test_release_puts_stock_back(self):
+        a, b = make_sku('A', 4), make_sku('B', 4)
+        reserve_stock([(a.id, 3), (b.id, 1)])
+        with self.assertRaises(InsufficientStock) as raised:
+            reserve_stock([(a.id, 2)])
+        self.assertEqual(raised.exception.shortages[0]['available'], 1)
+        release_stock([(a.id, 3), (b.id, 1)])
+        self.assertEqual(list(ProductSKU.objects.order_by('sku_code').values_list('stock', flat=True)), [4, 4])
+
+
+class CheckoutStatementCountTest(APITestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user(username='customer', password='password123', role='customer')
+        self.client.force_authenticate(user=self.customer)
+        self.skus = [make_sku(f'SKU-{i}', 10) for i in range(50)]
+
+    def checkout(self, lines):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/order/', order_payload(*((sku, 1) for sku in self.skus[:lines])), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return len(queries)
+
+    def test_statement_count_is_constant_in_line_items(self):
+        self.checkout(1)  # warm the per-process rate and coupon tables
+        small = self.checkout(1)
+        large = self.checkout(50)
+        self.assertEqual(small, large, f'checkout statements: 1 line={small}, 50 lines={large}')
+        order = Order.objects.order_by('-id').first()
+        self.assertEqual(order.order_item.count(), 50)
+        self.assertEqual(order.total_amount, Decimal('5850.00'))
+
+
+def make_coupon(code='SALE', usage_limit=100):
+    from datetime import timedelta
+
+    from django.utils import timezone
+    return Coupon.objects.create(
+        code=code, discount_type='fixed', discount_value=10, usage_limit=usage_limit,
+        valid_from=timezone.now() - timedelta(days=1), valid_to=timezone.now() + timedelta(days=1),
+    )
+
+
+class CouponRedemptionTest(APITestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user(username='customer', password='password123', role='customer')
+        self.client.force_authenticate(user=self.customer)
+        self.sku = make_sku('A', 10)
+        self.coupon = make_coupon()
+
+    def checkout(self, code='SALE'):
+        return self.client.post('/order/', dict(order_payload((self.sku, 1)), coupon_code=code), format='json')
+
+    def test_one_use_per_customer_and_release_on_cancel(self):
+        response = self.checkout()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['discount_amount'], '10.00')
+        self.assertEqual(self.checkout().status_code, status.HTTP_400_BAD_REQUEST)
+        self.coupon.refresh_from_db()
+        self.assertEqual(self.coupon.used_count, 1)
+
+        self.client.patch(f"/order/{response.data['id']}/", {'status': 'canceled'}, format='json')
+        self.coupon.refresh_from_db()
+        self.assertEqual(self.coupon.used_count, 0)
+        self.assertFalse(CouponRedemption.objects.exists())
+        self.assertEqual(self.checkout().status_code, status.HTTP_201_CREATED)
+
+    def test_definitions_are_cached_until_edited(self):
+        self.checkout()
+        other = User.objects.create_user(username='other', password='password123', role='customer')
+        self.client.force_authenticate(user=other)
+        with self.assertNumQueries(0):
+            from Orders.coupons import get_coupon
+            self.assertEqual(get_coupon('SALE').pk, self.coupon.pk)
+        Coupon.objects.filter(pk=self.coupon.pk).update(active=False)
+        self.coupon.refresh_from_db()
+        self.coupon.save()
+        self.assertEqual(self.checkout().data['non_field_errors'], ['coupon is not active'])
+
+
+class ParallelCheckoutLoadTest(TransactionTestCase):
+    """Hundreds of customers racing for the last units of one SKU."""
+    checkouts = 200
+    stock = 50
+    workers = 16
+
+    def test_no_oversell_under_parallel_checkout(self):
+        if connection.vendor == 'sqlite':
+            self.skipTest('SQLite serialises writers and locks the shared test database')
+
+        sku = make_sku('HOT', self.stock)
+        customers = [
+            User.objects.create_user(username=f'buyer{i}', password='password123', role='customer')
+            for i in range(self.checkouts)
+        ]
+        results = []
+        lock = threading.Lock()
+
+        def checkout(customer):
+            client = APIClient()
+            client.force_authenticate(user=customer)
+            try:
+                response = client.post('/order/', order_payload((sku, 1)), format='json')
+                with lock:
+                    results.append(response.status_code)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            list(pool.map(checkout, customers))
+
+        sku.refresh_from_db()
+        sold = OrderItem.objects.filter(sku=sku).count()
+        self.assertEqual(results.count(status.HTTP_201_CREATED), self.stock)
+        self.assertEqual(results.count(status.HTTP_400_BAD_REQUEST), self.checkouts - self.stock)
+        self.assertEqual(sold, self.stock)
+        self.assertEqual(sku.stock, 0)
+
+    def test_coupon_never_overshoots_usage_limit(self):
+        if connection.vendor == 'sqlite':
+            self.skipTest('SQLite serialises writers and locks the shared test database')
+
+        sku = make_sku('BULK', self.checkouts)
+        make_coupon('FLASH', usage_limit=self.stock)
+        customers = [
+            User.objects.create_user(username=f'buyer{i}', password='password123', role='customer')
+            for i in range(self.checkouts)
+        ]
+        results = []
+        lock = threading.Lock()
+
+        def checkout(customer):
+            client = APIClient()
+            client.force_authenticate(user=customer)
+            try:
+                payload = dict(order_payload((sku, 1)), coupon_code='FLASH')
+                response = client.post('/order/', payload, format='json')
+                with lock:
+                    results.append(response.status_code)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            list(pool.map(checkout, customers))
+
+        self.assertEqual(results.count(status.HTTP_201_CREATED), self.stock)
+        self.assertEqual(Coupon.objects.get(code='FLASH').used_count, self.stock)
+        self.assertEqual(CouponRedemption.objects.count(), self.stock)
+
+    def test_retry_storm_checks_out_once(self):
+        if connection.vendor == 'sqlite':
+            self.skipTest('SQLite serialises writers and locks the shared test database')
+
+        sku = make_sku('RETRY', self.stock)
+        customer = User.objects.create_user(username='retrier', password='password123', role='customer')
+        results = []
+        lock = threading.Lock()
+
+        def checkout(_):
+            client = APIClient()
+            client.force_authenticate(user=customer)
+            try:
+                response = client.post('/order/', order_payload((sku, 1)), format='json', HTTP_IDEMPOTENCY_KEY='storm')
+                with lock:
+                    results.append((response.status_code, response.data.get('id')))
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            list(pool.map(checkout, range(self.workers * 4)))
+
+        self.assertEqual({code for code, _ in results}, {status.HTTP_201_CREATED})
+        self.assertEqual(len({order_id for _, order_id in results}), 1)
+        sku.refresh_from_db()
+        self.assertEqual(sku.stock, self.stock - 1)
+
+
+class HoldExpiryTest(APITestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user(username='customer', password='password123', role='customer')
+        self.client.force_authenticate(user=self.customer)
+        self.sku = make_sku('A', 10)
+
+    def place(self, quantity):
+        response = self.client.post('/order/', order_payload((self.sku, quantity)), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return Order.objects.get(id=response.data['id'])
+
+    def test_expired_holds_release_stock_and_fail_payments(self):
+        from datetime import timedelta
+
+        from django.utils import timezone
+
+        from Orders.holds import expire_holds
+        from Payments.models import Payment
+
+        stale, fresh, cod = self.place(3), self.place(2), self.place(1)
+        Payment.objects.create(order=stale, user=self.customer, method='esewa', amount=stale.total_amount, status='pending')
+        response = self.client.post('/payment/', {'order': cod.id, 'method': 'cod'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        Order.objects.filter(id=stale.id).update(reserved_until=timezone.now() - timedelta(minutes=1))
+
+        self.assertEqual(expire_holds(), 1)
+        self.assertEqual(expire_holds(), 0)
+        # cash on delivery keeps its stock however long it waits
+        self.assertEqual(expire_holds(now=timezone.now() + timedelta(days=30)), 1)
+
+        self.assertEqual(
+            dict(Order.objects.values_list('id', 'status')),
+            {stale.id: 'canceled', fresh.id: 'canceled', cod.id: 'pending'},
+        )
+        self.sku.refresh_from_db()
+        self.assertEqual(self.sku.stock, 9)
+        self.assertEqual(Payment.objects.get(order=stale).status, 'failed')
+
+    def test_orders_awaiting_a_gateway_answer_are_kept(self):
+        from datetime import timedelta
+
+        from django.utils import timezone
+
+        from Orders.holds import expire_holds
+        from Payments.models import Payment
+
+        order = self.place(3)
+        payment = Payment.objects.create(
+            order=order, user=self.customer, method='esewa', amount=order.total_amount,
+            status='pending', check_after=timezone.now() + timedelta(minutes=15),
+        )
+        Order.objects.filter(id=order.id).update(reserved_until=timezone.now() - timedelta(minutes=1))
+
+        self.assertEqual(expire_holds(), 0)
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'pending')
+        self.sku.refresh_from_db()
+        self.assertEqual(self.sku.stock, 7)
+
+        # a payment the gateway never answers for stops holding it eventually
+        self.assertEqual(expire_holds(now=timezone.now() + timedelta(days=2)), 1)
+        self.assertEqual(Payment.objects.get(id=payment.id).status, 'failed')
+
+
+class BulkCancelTest(APITestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user(username='customer', password='password123', role='customer')
+        self.admin = User.objects.create_user(username='admin', password='password123', role='admin')
+        self.client.force_authenticate(user=self.customer)
+        self.a, self.b = make_sku('A', 20), make_sku('B', 20)
+        self.orders = []
+        for _ in range(4):
+            response = self.client.post('/order/', order_payload((self.a, 2), (self.b, 1)), format='json')
+            self.orders.append(response.data['id'])
+        Order.objects.filter(id=self.orders[0]).update(status='delivered')
+
+    def test_customer_cancel_restores_stock(self):
+        response = self.client.patch(f'/order/{self.orders[1]}/', {'status': 'canceled'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.a.refresh_from_db()
+        self.assertEqual(self.a.stock, 14)
+
+    def test_bulk_cancel(self):
+        response = self.client.post('/order/bulk_cancel/', {'ids': self.orders}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.post('/order/bulk_cancel/', {'ids': self.orders + [999999]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['canceled'], 3)
+        self.assertEqual(response.data['skipped'], [self.orders[0], 999999])
+        self.a.refresh_from_db()
+        self.b.refresh_from_db()
+        self.assertEqual((self.a.stock, self.b.stock), (18, 19))
+        self.assertEqual(Order.objects.filter(status='canceled').count(), 3)
+
+
+class SellerOrderListingTest(APITestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller', password='password123', role='seller')
+        other = User.objects.create_user(username='other', password='password123', role='seller')
+        self.customer = User.objects.create_user(username='customer', password='password123', role='customer')
+        self.mine = [make_sku(f'MINE-{i}', 100, seller=self.seller) for i in range(2)]
+        self.theirs = make_sku('THEIRS', 100, seller=other)
+        self.client.force_authenticate(user=self.customer)
+        self.checkout(3)
+
+    def checkout(self, orders):
+        self.client.force_authenticate(user=self.customer)
+        for _ in range(orders):
+            lines = [(sku, 1) for sku in self.mine] + [(self.theirs, 1)]
+            self.client.post('/order/', order_payload(*lines), format='json')
+        self.client.post('/order/', order_payload((self.theirs, 1)), format='json')
+        self.client.force_authenticate(user=self.seller)
+
+    def test_checkout_records_the_seller(self):
+        self.assertEqual(OrderItem.objects.filter(seller=self.seller).count(), 6)
+        self.assertFalse(OrderItem.objects.filter(seller__isnull=True).exists())
+
+    def test_lists_only_own_orders_and_items(self):
+        response = self.client.get('/order/')
+        self.assertEqual(len(response.data['results']), 3)
+        for order in response.data['results']:
+            self.assertEqual(sorted(item['sku'] for item in order['order_item']), [sku.id for sku in self.mine])
+
+    def test_query_count_does_not_grow_with_orders(self):
+        with CaptureQueriesContext(connection) as few:
+            self.client.get('/order/')
+        self.checkout(10)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get('/order/')
+        self.assertEqual(len(response.data['results']), 13)
+        self.assertEqual(len(few), len(many))
+        self.assertNotIn('DISTINCT', ' '.join(q['sql'] for q in many.captured_queries))
+
+    def test_filters_apply_before_paging(self):
+        order = Order.objects.filter(order_item__seller=self.seller).first()
+        Order.objects.filter(pk=order.pk).update(status='delivered')
+        response = self.client.get('/order/', {'status': 'delivered', 'page_size': 1})
+        self.assertEqual([row['id'] for row in response.data['results']], [order.id])
+        self.assertIsNone(response.data['next'])
+        response = self.client.get('/order/', {'product': self.mine[0].product_id})
+        self.assertEqual(len(response.data['results']), 3)
+        item = response.data['results'][0]['order_item'][0]
+        self.assertEqual(item['product_name'], item['sku_code'])
+
+    def test_seller_update_returns_own_items(self):
+        order = Order.objects.filter(order_item__seller=self.seller).first()
+        response = self.client.patch(f'/order/{order.id}/', {'status': 'processing'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['order_item']), 2)
+
+
+class SellerFulfilmentTest(APITestCase):
+    def setUp(self):
+        self.first = User.objects.create_user(username='first', password='password123', role='seller')
+        self.second = User.objects.create_user(username='second', password='password123', role='seller')
+        self.admin = User.objects.create_user(username='admin', password='password123', role='admin')
+        customer = User.objects.create_user(username='customer', password='password123', role='customer')
+        self.client.force_authenticate(user=customer)
+        lines = [(make_sku('A1', 5, seller=self.first), 1), (make_sku('A2', 5, seller=self.first), 2),
+                 (make_sku('B1', 5, seller=self.second), 1)]
+        self.order_id = self.client.post('/order/', order_payload(*lines), format='json').data['id']
+
+    def move(self, user, status_, url=None):
+        self.client.force_authenticate(user=user)
+        return self.client.patch(url or f'/order/{self.order_id}/', {'status': status_}, format='json')
+
+    def order_status(self):
+        return Order.objects.get(pk=self.order_id).status
+
+    def test_checkout_splits_by_seller(self):
+        parts = SellerOrder.objects.filter(order_id=self.order_id)
+        self.assertEqual(sorted(parts.values_list('seller__username', flat=True)), ['first', 'second'])
+        self.assertEqual(parts.get(seller=self.first).items.count(), 2)
+
+    def test_order_follows_its_slowest_seller(self):
+        response = self.move(self.first, 'processing')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([part['status'] for part in response.data['seller_orders']], ['processing'])
+        self.assertEqual(self.order_status(), 'pending')
+        self.assertEqual(self.move(self.first, 'delivered').status_code, status.HTTP_403_FORBIDDEN)
+
+        part = SellerOrder.objects.get(order_id=self.order_id, seller=self.second)
+        self.assertEqual(self.move(self.second, 'shipped', f'/seller-order/{part.id}/').status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.move(self.second, 'processing', f'/seller-order/{part.id}/').status_code, status.HTTP_200_OK)
+        self.assertEqual(self.order_status(), 'processing')
+        self.assertEqual(self.move(self.first, 'processing', f'/seller-order/{part.id}/').status_code, status.HTTP_404_NOT_FOUND)
+
+        self.client.force_authenticate(user=self.second)
+        self.assertEqual(len(self.client.get('/seller-order/').data['results']), 1)
+
+    def test_seller_orders_use_their_own_table(self):
+        part = SellerOrder.objects.get(order_id=self.order_id, seller=self.first)
+        url = f'/seller-order/{part.id}/'
+        self.assertEqual(self.move(self.first, 'canceled', url).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.move(self.admin, 'delivered', url).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.move(self.admin, 'shipped', url).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.order_status(), 'pending')
+
+    def test_order_level_changes_reach_every_seller(self):
+        self.move(self.admin, 'shipped')
+        self.assertEqual(set(SellerOrder.objects.values_list('status', flat=True)), {'shipped'})
+        self.move(self.admin, 'canceled')
+        self.assertEqual(set(SellerOrder.objects.values_list('status', flat=True)), {'canceled'})
+
+
+class OrderTransitionTest(APITestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller', password='password123', role='seller')
+        self.admin = User.objects.create_user(username='admin', password='password123', role='admin')
+        self.customer = User.objects.create_user(username='customer', password='password123', role='customer')
+        self.sku = make_sku('A', 500, seller=self.seller)
+        self.client.force_authenticate(user=self.customer)
+        self.ids = [self.client.post('/order/', order_payload((self.sku, 1)), format='json').data['id'] for _ in range(30)]
+
+    def bulk(self, user, status_, ids=None):
+        self.client.force_authenticate(user=user)
+        return self.client.post('/order/bulk_transition/', {'ids': ids or self.ids, 'status': status_}, format='json')
+
+    def test_table(self):
+        from Orders.transitions import transition_error
+        self.assertIsNone(transition_error('seller', 'pending', 'processing'))
+        self.assertIsNone(transition_error('customer', 'processing', 'canceled'))
+        self.assertIsNotNone(transition_error('customer', 'shipped', 'canceled'))
+        self.assertIsNotNone(transition_error('seller', 'shipped', 'delivered'))
+        self.assertIsNotNone(transition_error('admin', 'delivered', 'pending'))
+
+    def test_seller_ships_in_bulk(self):
+        self.assertEqual(self.bulk(self.seller, 'shipped').data['moved'], 0)
+        with CaptureQueriesContext(connection) as few:
+            self.bulk(self.seller, 'processing', self.ids[:2])
+        with CaptureQueriesContext(connection) as many:
+            response = self.bulk(self.seller, 'processing')
+        self.assertEqual(response.data, {'moved': 28, 'skipped': self.ids[:2]})
+        self.assertEqual(len(few), len(many))
+        self.assertEqual(self.bulk(self.seller, 'shipped').data['moved'], 30)
+        self.assertEqual(set(Order.objects.values_list('status', flat=True)), {'shipped'})
+        self.assertEqual(self.bulk(self.seller, 'delivered').status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.bulk(self.admin, 'delivered').data['moved'], 30)
+        self.assertEqual(set(SellerOrder.objects.values_list('status', flat=True)), {'delivered'})
+
+    def test_customer_cancels_own_orders_with_side_effects(self):
+        other = User.objects.create_user(username='other', password='password123', role='customer')
+        self.assertEqual(self.bulk(other, 'canceled').data['moved'], 0)
+        response = self.bulk(self.customer, 'canceled', self.ids[:10])
+        self.assertEqual(response.data['moved'], 10)
+        self.sku.refresh_from_db()
+        self.assertEqual(self.sku.stock, 480)
+        self.assertEqual(self.bulk(self.customer, 'processing').status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_single_update_uses_the_table(self):
+        self.client.force_authenticate(user=self.customer)
+        response = self.client.patch(f'/order/{self.ids[0]}/', {'status': 'shipped'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.patch(f'/order/{self.ids[0]}/', {'status': 'canceled', 'city': 'Pokhara'}, format='json')
+        self.assertEqual((response.data['status'], response.data['city']), ('canceled', 'Pokhara'))
+
+    def test_single_update_is_all_or_nothing(self):
+        self.client.force_authenticate(user=self.customer)
+        url = f'/order/{self.ids[0]}/'
+        # the order moved on between the check and the update
+        with mock.patch('Orders.views.transition', return_value=[]):
+            response = self.client.patch(url, {'status': 'canceled', 'city': 'Pokhara'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(Order.objects.get(pk=self.ids[0]).city, 'Kathmandu')
+        # PUT stays a full update
+        response = self.client.put(url, {'status': 'canceled', 'city': 'Pokhara'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Order.objects.get(pk=self.ids[0]).status, 'pending')
+
+
+class IdempotentCheckoutTest(APITestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user(username='customer', password='password123', role='customer')
+        self.client.force_authenticate(user=self.customer)
+        self.sku = make_sku('A', 5)
+
+    def checkout(self, key, quantity=1):
+        return self.client.post(
+            '/order/', order_payload((self.sku, quantity)), format='json', HTTP_IDEMPOTENCY_KEY=key
+        )
+
+    def test_retry_replays_the_first_response(self):
+        first = self.checkout('key-1')
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        with self.assertNumQueries(1):
+            retry = self.checkout('key-1')
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.data['id'], first.data['id'])
+        self.assertEqual(Order.objects.count(), 1)
+        self.sku.refresh_from_db()
+        self.assertEqual(self.sku.stock, 4)
+
+        self.assertEqual(self.checkout('key-1', quantity=2).status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(self.checkout('key-2').status_code, status.HTTP_201_CREATED)
+
+    def test_failed_requests_do_not_keep_the_key(self):
+        self.assertEqual(self.checkout('key-1', quantity=50).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.checkout('key-1', quantity=50).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.checkout('key-1', quantity=1).status_code, status.HTTP_201_CREATED)
+
+    def test_expired_keys_are_purged(self):
+        from datetime import timedelta
+
+        from django.utils import timezone
+
+        from core.idempotency import purge_expired_keys
+        from core.models import IdempotencyKey
+        self.checkout('key-1')
+        later = timezone.now() + timedelta(days=2)
+        self.assertEqual(purge_expired_keys(now=later), 1)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+
+class CartTest(APITestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user(username='customer', password='password123', role='customer')
+        self.client.force_authenticate(user=self.customer)
+        self.a = make_sku('A', 10, price=1000)
+        self.b = make_sku('B', 10, price=250)
+
+    def line(self, sku, quantity):
+        return self.client.post('/cart/items/', {'sku': sku.id, 'quantity': quantity}, format='json')
+
+    def test_totals_follow_each_change(self):
+        self.line(self.a, 2)
+        response = self.line(self.b, 1)
+        self.assertEqual(response.data['subtotal'], '2250.00')
+        self.assertEqual(response.data['tax'], '292.50')
+        self.assertEqual(response.data['total_amount'], '2742.50')
+
+        make_coupon()
+        response = self.client.post('/cart/coupon/', {'code': 'SALE'}, format='json')
+        self.assertEqual(response.data['discount_amount'], '10.00')
+        response = self.line(self.a, 0)
+        self.assertEqual((response.data['subtotal'], response.data['total_amount']), ('250.00', '472.50'))
+        self.assertEqual(self.line(self.b, 11).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_line_changes_do_not_scan_the_cart(self):
+        skus = [make_sku(f'S{i}', 10) for i in range(20)]
+        self.line(skus[0], 1)
+        with CaptureQueriesContext(connection) as small:
+            self.line(self.a, 1)
+        for sku in skus[1:]:
+            self.line(sku, 1)
+        with CaptureQueriesContext(connection) as large:
+            self.line(self.b, 1)
+        self.assertEqual(len(small), len(large))
+        cart = Cart.objects.get(customer=self.customer)
+        self.assertEqual(cart.subtotal, Decimal('3250.00'))
+
+    def test_checkout_converts_and_empties_the_cart(self):
+        make_coupon()
+        self.line(self.a, 2)
+        self.client.post('/cart/coupon/', {'code': 'SALE'}, format='json')
+        cart = Cart.objects.get(customer=self.customer)
+        address = {k: v for k, v in order_payload().items() if k not in ('order_item', 'country')}
+        response = self.client.post('/cart/checkout/', address, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['total_amount'], str(cart.total_amount))
+        self.assertEqual(response.data['discount_amount'], '10.00')
+        self.a.refresh_from_db()
+        self.assertEqual(self.a.stock, 8)
+        self.assertEqual(Coupon.objects.get().used_count, 1)
+        self.assertEqual(self.client.get('/cart/').data['items'], [])
+        self.assertEqual(self.client.post('/cart/checkout/', address, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_checkout_reprices_changed_skus(self):
+        self.line(self.a, 1)
+        ProductSKU.objects.filter(pk=self.a.pk).update(price=2000)
+        address = {k: v for k, v in order_payload().items() if k not in ('order_item', 'country')}
+        response = self.client.post('/cart/checkout/', address, format='json')
+        self.assertEqual(response.data['total_amount'], '2460.00')
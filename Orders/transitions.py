@@ -0,0 +1,198 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from Orders.cancellation import undo_checkout
+from Orders.events import orders_changed
+from Orders.fulfilment import FORWARD_FLOW, rollup_status
+from Orders.models import Order, SellerOrder
+
+ADMIN=frozenset({'admin'})
+ANYONE=frozenset({'admin','seller','customer'})
+
+# current status -> new status -> roles allowed to make that move.
+# Anything missing is not allowed; delivered and canceled are final.
+TRANSITIONS={
+    'pending':{
+        'processing':frozenset({'admin','seller'}),
+        'shipped':ADMIN,
+        'delivered':ADMIN,
+        'canceled':ANYONE,
+    },
+    'processing':{
+        'pending':ADMIN,
+        'shipped':frozenset({'admin','seller'}),
+        'delivered':ADMIN,
+        'canceled':ANYONE,
+    },
+    'shipped':{
+        'pending':ADMIN,
+        'processing':ADMIN,
+        'delivered':ADMIN,
+        'canceled':ADMIN,
+    },
+    'delivered':{},
+    'canceled':{},
+}
+
+# the same for one seller's part of an order (SellerOrder): sellers move
+# theirs one step along FORWARD_FLOW, admins anywhere; canceling is only
+# done for the whole order
+SELLER_TRANSITIONS={
+    'pending':{
+        'processing':frozenset({'admin','seller'}),
+        'shipped':ADMIN,
+        'delivered':ADMIN,
+    },
+    'processing':{
+        'pending':ADMIN,
+        'shipped':frozenset({'admin','seller'}),
+        'delivered':ADMIN,
+    },
+    'shipped':{
+        'pending':ADMIN,
+        'processing':ADMIN,
+        'delivered':ADMIN,
+    },
+    'delivered':{},
+    'canceled':{},
+}
+
+
+def _sources(table):
+    """
+    (role, new status) -> statuses an order may be in to make that move, so a
+    batch is claimed with one `status IN (...)` filter.
+    """
+    found=defaultdict(frozenset)
+    for old,moves in table.items():
+        for new,roles in moves.items():
+            for role in roles:
+                found[role,new]|={old}
+    return dict(found)
+
+
+SOURCES=_sources(TRANSITIONS)
+SELLER_SOURCES=_sources(SELLER_TRANSITIONS)
+
+# columns written together with the status
+EXTRA_FIELDS={'canceled':{'reserved_until':None}}
+
+_hooks=defaultdict(list)
+
+
+def on_enter(*statuses):
+    """Register `hook(order_ids, status)` to run after orders move into one of `statuses`."""
+    def register(hook):
+        for s in statuses:
+            _hooks[s].append(hook)
+        return hook
+    return register
+
+
+@on_enter('canceled')
+def _undo_checkout(order_ids, new_status):
+    undo_checkout(order_ids)
+
+
+@on_enter('pending','processing','shipped','delivered')
+def _sync_seller_orders(order_ids, new_status):
+    SellerOrder.objects.filter(order_id__in=order_ids).exclude(status='canceled').update(status=new_status)
+
+
+class TransitionError(Exception):
+    pass
+
+
+def transition_error(role, old_status, new_status, table=TRANSITIONS):
+    """
+    Why `role` may not move an order (or with SELLER_TRANSITIONS, a seller
+    order) from `old_status` to `new_status`, or None.
+    """
+    if new_status not in table:
+        return "unknown status"
+    if not table.get(old_status):
+        return f"order is already {old_status}"
+    if role not in table[old_status].get(new_status,()):
+        return f"{role} cannot move an order from {old_status} to {new_status}"
+    return None
+
+
+def visible_orders(user):
+    if user.role=='admin':
+        return Order.objects.all()
+    if user.role=='customer':
+        return Order.objects.filter(customer=user)
+    if user.role=='seller':
+        return Order.objects.filter(Exists(SellerOrder.objects.filter(order=OuterRef('pk'),seller=user)))
+    return Order.objects.none()
+
+
+def _move_parts(parts, sources, new_status):
+    # seller orders move and their orders roll up; returns those order ids
+    rows=list(parts.filter(status__in=sources).order_by('id').select_for_update().values_list('id','order_id'))
+    if rows:
+        SellerOrder.objects.filter(id__in=[pk for pk,_ in rows]).update(status=new_status)
+        rollup_status({order_id for _,order_id in rows})
+    return [order_id for _,order_id in rows]
+
+
+def _advance_seller(user, order_ids, new_status):
+    # sellers move their own part of the order and the order rolls up
+    parts=SellerOrder.objects.filter(order_id__in=order_ids,seller=user)
+    return _move_parts(parts,SELLER_SOURCES['seller',new_status],new_status)
+
+
+def transition(user, order_ids, new_status):
+    """
+    Move every order in `order_ids` that `user` can see and is allowed to
+    move to `new_status`: one locking SELECT, one UPDATE and the hooks for
+    the new status, whatever the batch size. Returns the ids that moved;
+    the rest were in a status the move doesn't start from.
+    """
+    role=getattr(user,'role',None)
+    sources=SOURCES.get((role,new_status))
+    if not sources:
+        raise TransitionError(f"{role} cannot move orders to {new_status}")
+    order_ids=list(order_ids)
+    with transaction.atomic():
+        if role=='seller' and new_status in FORWARD_FLOW[1:]:
+            return _advance_seller(user,order_ids,new_status)
+        return _move(visible_orders(user).filter(id__in=order_ids),sources,new_status)
+
+
+def _move(orders, sources, new_status):
+    moved=list(orders.filter(status__in=sources).order_by('id').select_for_update().values_list('id',flat=True))
+    if moved:
+        Order.objects.filter(id__in=moved).update(status=new_status,**EXTRA_FIELDS.get(new_status,{}))
+        for hook in _hooks[new_status]:
+            hook(moved,new_status)
+        orders_changed.send(sender=Order,order_ids=moved)
+    return moved
+
+
+def transition_seller_orders(user, seller_order_ids, new_status):
+    """
+    `transition` for seller orders: move those in `seller_order_ids` that
+    `user` owns (admins: any) and SELLER_TRANSITIONS allows to `new_status`,
+    then roll their orders up. Returns the ids of the orders that moved.
+    """
+    role=getattr(user,'role',None)
+    sources=SELLER_SOURCES.get((role,new_status))
+    if not sources:
+        raise TransitionError(f"{role} cannot move seller orders to {new_status}")
+    parts=SellerOrder.objects.filter(id__in=list(seller_order_ids))
+    if role!='admin':
+        parts=parts.filter(seller=user)
+    with transaction.atomic():
+        return _move_parts(parts,sources,new_status)
+
+
+def move_orders(order_ids, sources, new_status):
+    """
+    Move the orders in `order_ids` that are in one of `sources` to
+    `new_status` on the system's behalf, e.g. when a payment settles.
+    Same statements and hooks as `transition`, without the role check.
+    """
+    with transaction.atomic():
+        return _move(Order.objects.filter(id__in=list(order_ids)),sources,new_status)
@@ -1,16 +1,22 @@
 from decimal import Decimal
-from django.shortcuts import render
-from Orders.serializers import OrderSerializer,CouponSerailizer
-from Orders.models import Order,Coupon
-from rest_framework import viewsets
+from Orders.serializers import OrderSerializer,CouponSerailizer,SellerOrderSerializer,CartSerializer,CartLineSerializer,CartCheckoutSerializer
+from Orders.models import Order,OrderItem,Coupon,SellerOrder,Cart
+from rest_framework import mixins,viewsets
 from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework.permissions import SAFE_METHODS
 from rest_framework.permissions import IsAuthenticated,IsAdminUser
 from rest_framework.response import Response
 from rest_framework import status 
-from Payments.models import Payment
 from rest_framework.decorators import action
-from django.utils import timezone
+from EMarket.query_plan import plan_queryset
+from Orders.coupons import CouponUnavailable,coupon_problem,get_coupon
+from Orders.pricing import discount_for
+from Orders.carts import CartError,checkout_cart,get_cart,requote,set_country,set_coupon,set_quantity
+from core.idempotency import idempotent
+from Orders.stock import InsufficientStock
+from Orders.fulfilment import FORWARD_FLOW
+from Orders.transitions import SELLER_TRANSITIONS,TRANSITIONS,TransitionError,transition,transition_error,transition_seller_orders
+from django.db import transaction
+from django.db.models import Exists,OuterRef,Prefetch
 
 
 
@@ -21,6 +27,8 @@ from django.utils import timezone
 class CouponViewSet(viewsets.ModelViewSet):
     queryset=Coupon.objects.all()
     serializer_class=CouponSerailizer
+    # a short admin table, listed whole
+    pagination_class=None
     permission_classes=[IsAdminUser]
 
 
@@ -37,13 +45,39 @@ class OrderViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         
         user=self.request.user
+        if user.role=='seller':
+            # only the seller's own lines, served by the (seller, order) index
+            # instead of a DISTINCT over order items, SKUs and products
+            queryset=Order.objects.filter(
+                Exists(OrderItem.objects.filter(order=OuterRef('pk'),seller=user))
+            ).prefetch_related(
+                Prefetch('order_item',queryset=OrderItem.objects.filter(seller=user)),
+                Prefetch('seller_orders',queryset=SellerOrder.objects.filter(seller=user)),
+            )
+            return plan_queryset(queryset,self.get_serializer_class())
+        queryset=plan_queryset(Order.objects.all(),self.get_serializer_class())
         if user.role=='admin':
-            return Order.objects.all()
+            return queryset
         if user.role=='customer':
-           return Order.objects.filter(customer=user)
-        if user.role=='seller':
-            return Order.objects.filter(order_item__sku__product__created_by=user).distinct()
+           return queryset.filter(customer=user)
         return Order.objects.none()
+
+    def filter_queryset(self, queryset):
+        # ?status= and ?product= filter before paging, so a client never has
+        # to filter one page of results itself
+        params=self.request.query_params
+        if params.get('status'):
+            queryset=queryset.filter(status=params['status'])
+        if params.get('product','').isdigit():
+            queryset=queryset.filter(
+                Exists(OrderItem.objects.filter(order=OuterRef('pk'),sku__product_id=params['product']))
+            )
+        return super().filter_queryset(queryset)
+
+    @idempotent('order.create')
+    def create(self, request, *args, **kwargs):
+        return super().create(request,*args,**kwargs)
+
     def perform_create(self, serializer):
         serializer.save(customer=self.request.user)
 
@@ -52,126 +86,178 @@ class OrderViewSet(viewsets.ModelViewSet):
     @action(detail=False,methods=['post'],permission_classes=[IsAuthenticated])
     def  apply_coupon(self,data):
             code=self.request.data.get('code')
-            subtotal = Decimal(str(self.request.data.get('subtotal', '0')))
-
-            try:
-                coupon = Coupon.objects.get(code=code)
-                if coupon.users_used.filter(id=self.request.user.id).exists():
-                    return Response({
-                        'valid':False,
-                        'message':'coupon is already used'
-                        
-                    },status=status.HTTP_400_BAD_REQUEST)
-                if coupon.is_valid(subtotal):
-                    if coupon.discount_type == 'fixed':
-                        discount = coupon.discount_value
-                    else:
-                        discount = (coupon.discount_value / Decimal('100')) * subtotal
-                    
-                    return Response({
-                        "valid": True,
-                        "discount": discount,
-                        "message": "Coupon applied successfully!"
-                    })
-                
-               
-                now = timezone.now()
-                message = "Coupon criteria not met."
-                if not coupon.active:
-                    message = "Coupon is not active."
-                elif not (coupon.valid_from <= now <= coupon.valid_to):
-                    message = "Coupon has expired."
-                elif coupon.used_count >= coupon.usage_limit:
-                    message = "Coupon usage limit reached."
-                elif subtotal < coupon.min_purchase_ammount:
-                    message = f"Minimum purchase of {coupon.min_purchase_ammount} required."
+            # price against the server side cart when there is one
+            cart=Cart.objects.filter(customer=self.request.user,items__isnull=False).first()
+            subtotal=cart.subtotal if cart else Decimal(str(self.request.data.get('subtotal', '0')))
 
-                return Response({"valid": False, "message": message}, status=400)
-            except Coupon.DoesNotExist:
+            coupon = get_coupon(code)
+            if coupon is None:
                 return Response({"valid": False, "message": "Invalid code."}, status=404)
-    def restore_stock(self,order):
-            for item in order.order_item.all():
-                sku=item.sku
-                sku.stock=sku.stock+item.quantity_at_purchase
-                sku.save()
-
-
-
+            message=coupon_problem(coupon,subtotal,self.request.user)
+            if message:
+                return Response({"valid": False, "message": message}, status=400)
+            return Response({
+                "valid": True,
+                "discount": discount_for(coupon,subtotal),
+                "message": "Coupon applied successfully!"
+            })
+
+    BULK_BATCH=500
+
+    def _bulk_ids(self,request):
+        ids=request.data.get('ids')
+        if not isinstance(ids,list) or not ids:
+            return None,Response({"error":"ids must be a non empty list"},status=status.HTTP_400_BAD_REQUEST)
+        try:
+            return sorted({int(pk) for pk in ids}),None
+        except (TypeError,ValueError):
+            return None,Response({"error":"ids must be integers"},status=status.HTTP_400_BAD_REQUEST)
+
+    def _bulk_transition(self,ids,new_status):
+        moved=[]
+        for start in range(0,len(ids),self.BULK_BATCH):
+            moved.extend(transition(self.request.user,ids[start:start+self.BULK_BATCH],new_status))
+        done=set(moved)
+        return moved,[pk for pk in ids if pk not in done]
 
-    
+    @action(detail=False,methods=['post'],permission_classes=[IsAuthenticated])
+    def bulk_cancel(self,request):
+        if request.user.role!='admin':
+            return Response({"error":"only admin can bulk cancel orders"},status=status.HTTP_403_FORBIDDEN)
+        ids,error=self._bulk_ids(request)
+        if error:
+            return error
+        canceled,skipped=self._bulk_transition(ids,'canceled')
+        return Response({
+            "canceled":len(canceled),
+            "skipped":skipped,
+        })
 
-    FORWARD_FLOW=['pending','processing','shipped']
-    
+    @action(detail=False,methods=['post'],permission_classes=[IsAuthenticated])
+    def bulk_transition(self,request):
+        new_status=request.data.get('status')
+        if new_status not in TRANSITIONS:
+            return Response({"error":"unknown status"},status=status.HTTP_400_BAD_REQUEST)
+        ids,error=self._bulk_ids(request)
+        if error:
+            return error
+        try:
+            moved,skipped=self._bulk_transition(ids,new_status)
+        except TransitionError as e:
+            return Response({"error":str(e)},status=status.HTTP_403_FORBIDDEN)
+        return Response({
+            "moved":len(moved),
+            "skipped":skipped,
+        })
 
     def update(self, request, *args, **kwargs):
-       
-        instance=self.get_object()
-        user=self.request.user
-        new_status=self.request.data.get('status')
-        old_status=instance.status
+        new_status=request.data.get('status')
         if not new_status:
             return super().update(request,*args,**kwargs)
-        
-
-        if old_status=='canceled' :
-            return Response({"error":"order cannot be canceled at this point"},status=status.HTTP_403_FORBIDDEN)
-        
-        
-        if old_status=='delivered':
-            return Response({"error": "already delivered"},status=status.HTTP_403_FORBIDDEN)
-
-
-            
-        if new_status=='delivered' and user.role!='admin':
-            return Response({"error":"only admin can mark deliverd"},status=status.HTTP_403_FORBIDDEN)
-        
-
-        if new_status=='canceled':
-            if instance.status in ['shipped','delivered'] and user.role!= 'admin' :
-                 return Response({"error":"cannot cancel at this stage of process"},status=status.HTTP_403_FORBIDDEN)
-
-
-        
 
-        elif user.role=='seller':
-             is_seller_owner=instance.order_item.filter(sku__product__created_by=user).exists()
-             if not is_seller_owner:
-              return Response(status=status.HTTP_403_FORBIDDEN)
-             
-             if old_status not in self.FORWARD_FLOW:
-                 return Response(status=status.HTTP_403_FORBIDDEN)
-             
-             current_index=self.FORWARD_FLOW.index(old_status)
-
-             if (
-                current_index + 1 >= len(self.FORWARD_FLOW)
-                or new_status != self.FORWARD_FLOW[current_index + 1]
-               ):
-                return Response(
-                    {"error": "Seller can only move order forward"},
-                    status=status.HTTP_403_FORBIDDEN
-                )     
-
-
-        elif user.role=='customer'and new_status!='canceled':
-                 return Response({"error":"user can only  cancel the order"},status=status.HTTP_403_FORBIDDEN)
-         
-        old_status=instance.status
-        response = super().update(request, *args, **kwargs)
-        instance.refresh_from_db()
+        instance=self.get_object()
+        user=request.user
+        current=instance.status
+        if user.role=='seller' and new_status in FORWARD_FLOW[1:]:
+            # sellers move their own part, prefetched by get_queryset
+            part=next(iter(instance.seller_orders.all()),None)
+            current=part.status if part else current
+        error=transition_error(user.role,current,new_status) if new_status!=current else None
+        if error:
+            return Response({"error":error},status=status.HTTP_403_FORBIDDEN)
+
+        # the other fields and the status change land together or not at all;
+        # status itself only ever moves through transition()
+        partial=kwargs.get('partial',False)
+        data={key:value for key,value in request.data.items() if key!='status'}
+        with transaction.atomic():
+            if data or not partial:
+                serializer=self.get_serializer(instance,data=data,partial=partial)
+                serializer.is_valid(raise_exception=True)
+                serializer.save()
+            if new_status!=current and not transition(user,[instance.id],new_status):
+                transaction.set_rollback(True)
+                return Response({"error":"the order changed meanwhile, reload it"},status=status.HTTP_409_CONFLICT)
+        return Response(self.get_serializer(self.get_object()).data)
+
+
+
+class SellerOrderViewSet(mixins.ListModelMixin,mixins.RetrieveModelMixin,mixins.UpdateModelMixin,viewsets.GenericViewSet):
+    serializer_class=SellerOrderSerializer
+    authentication_classes=[JWTAuthentication]
+    permission_classes=[IsAuthenticated]
 
-        if old_status!= 'canceled' and instance.status == 'canceled':
-            self.restore_stock(instance)
-           
-            Payment.objects.filter(order=instance).update(status='failed')
+    def get_queryset(self):
+        user=self.request.user
+        queryset=plan_queryset(SellerOrder.objects.all(),self.get_serializer_class())
+        if user.role=='admin':
+            return queryset
+        if user.role=='seller':
+            return queryset.filter(seller=user)
+        return SellerOrder.objects.none()
 
-            if instance.coupon:
-                instance.coupon.users_used.remove(instance.customer)
-                instance.coupon.used_count-=1
-                instance.coupon.save()
+    def update(self, request, *args, **kwargs):
+        instance=self.get_object()
+        new_status=request.data.get('status')
+        if not new_status or new_status==instance.status:
+            return Response(self.get_serializer(instance).data)
+        error=transition_error(request.user.role,instance.status,new_status,SELLER_TRANSITIONS)
+        if error:
+            return Response({"error":error},status=status.HTTP_403_FORBIDDEN)
+        if not transition_seller_orders(request.user,[instance.id],new_status):
+            return Response({"error":"the seller order changed meanwhile, reload it"},status=status.HTTP_409_CONFLICT)
+        return Response(self.get_serializer(self.get_object()).data)
 
-             
-        return response
 
 
+class CartViewSet(viewsets.ViewSet):
+    authentication_classes=[JWTAuthentication]
+    permission_classes=[IsAuthenticated]
 
+    def _cart_response(self,cart,code=status.HTTP_200_OK):
+        # totals are requoted in memory so rate changes show up straight away
+        cart=requote(Cart.objects.select_related('coupon').prefetch_related('items').get(pk=cart.pk))
+        return Response(CartSerializer(cart).data,status=code)
+
+    def list(self,request):
+        return self._cart_response(get_cart(request.user))
+
+    @action(detail=False,methods=['post'])
+    def items(self,request):
+        serializer=CartLineSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data=serializer.validated_data
+        return self._cart_response(set_quantity(request.user,data['sku'],data['quantity']))
+
+    @action(detail=False,methods=['post'])
+    def coupon(self,request):
+        code=request.data.get('code')
+        if not code:
+            return self._cart_response(set_coupon(request.user,None))
+        coupon=get_coupon(code)
+        if coupon is None:
+            return Response({"error":"Invalid code."},status=status.HTTP_404_NOT_FOUND)
+        message=coupon_problem(coupon,get_cart(request.user).subtotal,request.user)
+        if message:
+            return Response({"error":message},status=status.HTTP_400_BAD_REQUEST)
+        return self._cart_response(set_coupon(request.user,coupon))
+
+    @action(detail=False,methods=['post'])
+    def country(self,request):
+        country=str(request.data.get('country') or '').strip()
+        if not country:
+            return Response({"error":"country is required"},status=status.HTTP_400_BAD_REQUEST)
+        return self._cart_response(set_country(request.user,country[:100]))
+
+    @action(detail=False,methods=['post'])
+    @idempotent('cart.checkout')
+    def checkout(self,request):
+        serializer=CartCheckoutSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            order=checkout_cart(request.user,**serializer.validated_data)
+        except (CartError,InsufficientStock,CouponUnavailable) as e:
+            errors=e.messages() if isinstance(e,InsufficientStock) else [str(e)]
+            return Response(errors,status=status.HTTP_400_BAD_REQUEST)
+        order=plan_queryset(Order.objects.filter(pk=order.pk),OrderSerializer).get()
+        return Response(OrderSerializer(order,context={'request':request}).data,status=status.HTTP_201_CREATED)
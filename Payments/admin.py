@@ -1,5 +1,6 @@
 from django.contrib import admin
-from Payments.models import Payment
+from Payments.models import GatewayEvent, Payment
 
 # Register your models here.
-admin.site.register(Payment)
\ No newline at end of file
+admin.site.register(Payment)
+admin.site.register(GatewayEvent)
@@ -0,0 +1,231 @@
+import random
+import threading
+import time
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+TIMEOUT=getattr(settings,'PAYMENT_GATEWAY_TIMEOUT',(3.05,10))
+DEADLINE=getattr(settings,'PAYMENT_GATEWAY_DEADLINE',15)
+RETRIES=getattr(settings,'PAYMENT_GATEWAY_RETRIES',2)
+CONCURRENCY=getattr(settings,'PAYMENT_GATEWAY_CONCURRENCY',10)
+BREAKER_THRESHOLD=getattr(settings,'PAYMENT_GATEWAY_BREAKER_THRESHOLD',5)
+BREAKER_RESET=getattr(settings,'PAYMENT_GATEWAY_BREAKER_RESET',30)
+
+RETRY_STATUSES=frozenset({429,500,502,503,504})
+
+
+class GatewayError(Exception):
+    """The gateway answered, but not with something we understand."""
+
+
+class GatewayUnavailable(GatewayError):
+    """The gateway could not be asked: breaker open, too busy, timed out or down."""
+
+
+class GatewayStatus:
+    """What a gateway says about one transaction, in our payment statuses."""
+
+    def __init__(self, status, reference=None, amount=None, raw=None):
+        # completed, failed, pending or not_found
+        self.status=status
+        self.reference=reference
+        self.amount=amount
+        self.raw=raw
+
+    def __repr__(self):
+        return f"GatewayStatus({self.status!r}, {self.reference!r}, {self.amount!r})"
+
+
+class CircuitBreaker:
+    """
+    Stops calling a gateway after `threshold` failures in a row. While open
+    every call fails straight away; after `reset_after` seconds one probe is
+    let through and its outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, reset_after=BREAKER_RESET):
+        self.threshold=threshold
+        self.reset_after=reset_after
+        self._lock=threading.Lock()
+        self._failures=0
+        self._opened_at=None
+        self._probing=False
+
+    @property
+    def state(self):
+        if self._opened_at is None:
+            return 'closed'
+        if time.monotonic()-self._opened_at<self.reset_after:
+            return 'open'
+        return 'half-open'
+
+    def allow(self):
+        with self._lock:
+            state=self.state
+            if state=='closed':
+                return True
+            if state=='half-open' and not self._probing:
+                self._probing=True
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            self._failures=0
+            self._opened_at=None
+            self._probing=False
+
+    def failure(self):
+        with self._lock:
+            self._failures+=1
+            if self._probing or self._failures>=self.threshold:
+                self._opened_at=time.monotonic()
+            self._probing=False
+
+
+class GatewayClient:
+    """
+    Pooled keep-alive HTTP client for one gateway. Every call has a deadline
+    covering all its attempts; at most `concurrency` calls are in flight and
+    callers over that fail fast rather than queue; failed attempts are
+    retried with full jitter backoff; and a circuit breaker stops the
+    gateway being called at all while it keeps failing.
+    """
+    name='gateway'
+
+    def __init__(self, base_url, timeout=TIMEOUT, deadline=DEADLINE, retries=RETRIES,
+                 concurrency=CONCURRENCY, breaker=None, backoff=0.2):
+        self.base_url=base_url.rstrip('/')
+        self.timeout=timeout if isinstance(timeout,tuple) else (timeout,timeout)
+        self.deadline=deadline
+        self.retries=retries
+        self.backoff=backoff
+        self.breaker=breaker or CircuitBreaker()
+        self._slots=threading.BoundedSemaphore(concurrency)
+        self.session=requests.Session()
+        adapter=HTTPAdapter(pool_connections=1,pool_maxsize=concurrency)
+        self.session.mount('http://',adapter)
+        self.session.mount('https://',adapter)
+
+    def _attempt(self, method, path, remaining, **kwargs):
+        connect,read=self.timeout
+        response=self.session.request(
+            method,f'{self.base_url}{path}',timeout=(min(connect,remaining),min(read,remaining)),**kwargs
+        )
+        if response.status_code in RETRY_STATUSES:
+            raise GatewayUnavailable(f'{self.name} answered {response.status_code}')
+        try:
+            data=response.json()
+        except ValueError:
+            raise GatewayError(f'{self.name} answered {response.status_code} without JSON')
+        if not isinstance(data,dict):
+            raise GatewayError(f'{self.name} answered {response.status_code} without a JSON object')
+        return response.status_code,data
+
+    def request(self, method, path, **kwargs):
+        """Return (status code, decoded JSON object) or raise GatewayError/GatewayUnavailable."""
+        # take the slot first: a half-open breaker counts its one probe as
+        # made as soon as it allows it
+        if not self._slots.acquire(blocking=False):
+            raise GatewayUnavailable(f'too many calls to {self.name} in flight')
+        try:
+            if not self.breaker.allow():
+                raise GatewayUnavailable(f'{self.name} is failing, not calling it for now')
+            started=time.monotonic()
+            for attempt in range(self.retries+1):
+                remaining=self.deadline-(time.monotonic()-started)
+                try:
+                    result=self._attempt(method,path,max(remaining,0.001),**kwargs)
+                except (requests.ConnectionError,requests.Timeout) as e:
+                    error=GatewayUnavailable(f'{self.name} unreachable: {e}')
+                except GatewayUnavailable as e:
+                    error=e
+                except GatewayError:
+                    # it answered, so it is up
+                    self.breaker.success()
+                    raise
+                else:
+                    self.breaker.success()
+                    return result
+                pause=random.uniform(0,self.backoff*2**attempt)
+                if attempt==self.retries or time.monotonic()-started+pause>=self.deadline:
+                    break
+                time.sleep(pause)
+            self.breaker.failure()
+            raise error
+        finally:
+            self._slots.release()
+
+
+def _amount(value, divisor=1):
+    try:
+        return Decimal(str(value))/divisor
+    except (InvalidOperation, TypeError):
+        return None
+
+
+class EsewaClient(GatewayClient):
+    name='esewa'
+    COMPLETED={'COMPLETE'}
+    FAILED={'CANCELED','USER_CANCELED','FAILED','EXPIRED','ABANDONED','FULL_REFUND'}
+
+    def __init__(self, base_url=None, product_code=None, **kwargs):
+        super().__init__(base_url or getattr(settings,'ESEWA_BASE_URL','https://rc-epay.esewa.com.np'),**kwargs)
+        self.product_code=product_code or getattr(settings,'ESEWA_PRODUCT_CODE','EPAYTEST')
+
+    def status(self, transaction_uuid, total_amount):
+        amount=Decimal(total_amount)
+        params={
+            'product_code':self.product_code,
+            # eSewa wants whole amounts without decimals
+            'total_amount':str(int(amount)) if amount%1==0 else str(amount),
+            'transaction_uuid':transaction_uuid,
+        }
+        _,data=self.request('GET','/api/epay/transaction/status/',params=params)
+        state=str(data.get('status','')).upper()
+        if state in self.COMPLETED:
+            status='completed'
+        elif state in self.FAILED:
+            status='failed'
+        elif state=='NOT_FOUND':
+            status='not_found'
+        else:
+            status='pending'
+        return GatewayStatus(status,data.get('ref_id'),_amount(data.get('total_amount')),data)
+
+
+class KhaltiClient(GatewayClient):
+    name='khalti'
+    FAILED={'User canceled','Expired','Refunded','Partially Refunded'}
+
+    def __init__(self, base_url=None, secret_key=None, **kwargs):
+        super().__init__(base_url or getattr(settings,'KHALTI_BASE_URL','https://a.khalti.com'),**kwargs)
+        self.session.headers['Authorization']=f"Key {secret_key or getattr(settings,'KHALTI_SECRET_KEY','')}"
+
+    def lookup(self, pidx):
+        code,data=self.request('POST','/api/v2/epayment/lookup/',json={'pidx':pidx})
+        state=data.get('status')
+        if code==404:
+            status='not_found'
+        elif state=='Completed':
+            status='completed'
+        elif state in self.FAILED:
+            status='failed'
+        else:
+            status='pending'
+        # Khalti amounts are in paisa
+        return GatewayStatus(status,data.get('transaction_id'),_amount(data.get('total_amount'),100),data)
+
+
+@lru_cache(maxsize=None)
+def esewa():
+    return EsewaClient()
+
+
+@lru_cache(maxsize=None)
+def khalti():
+    return KhaltiClient()
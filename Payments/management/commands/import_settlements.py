@@ -0,0 +1,29 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+from Payments.settlements import CHUNK, FLAGGED, format_of, import_settlements, read_rows
+
+
+class Command(BaseCommand):
+    help='Settle payments from an eSewa/Khalti settlement file (CSV, JSON array or JSON Lines)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format',choices=['csv','json'],help='defaults to the file extension')
+        parser.add_argument('--chunk-size',type=int,default=CHUNK,help='rows matched and written per query')
+
+    def handle(self, *args, **options):
+        path=options['path']
+        outcomes={}
+        try:
+            with open(path,encoding='utf-8-sig',newline='') as file:
+                rows=read_rows(file,options['format'] or format_of(path))
+                for number,row,result in import_settlements(rows,options['chunk_size']):
+                    outcome=result['outcome']
+                    outcomes[outcome]=outcomes.get(outcome,0)+1
+                    if outcome in FLAGGED:
+                        self.stderr.write(f"row {number}: {outcome} {row}")
+        except (OSError,ValueError,csv.Error) as e:
+            raise CommandError(f'{path}: {e}')
+        summary=', '.join(f'{count} {outcome}' for outcome,count in sorted(outcomes.items()))
+        self.stdout.write(f"imported {sum(outcomes.values())} rows: {summary or 'nothing to do'}")
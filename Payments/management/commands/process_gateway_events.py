@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+from Payments.webhooks import BATCH, process_all
+
+
+class Command(BaseCommand):
+    help='Settle payments from the eSewa/Khalti webhook events received so far'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop',action='store_true',help='keep polling until interrupted')
+        parser.add_argument('--interval',type=float,default=1,help='seconds between polls with --loop')
+        parser.add_argument('--batch-size',type=int,default=BATCH)
+
+    def handle(self, *args, **options):
+        while True:
+            handled=process_all(batch_size=options['batch_size'])
+            if handled or not options['loop']:
+                self.stdout.write(f"processed {handled} gateway events")
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+from Payments.gateways import CONCURRENCY
+from Payments.reconcile import reconcile_payments
+
+
+class Command(BaseCommand):
+    help='Ask eSewa/Khalti about pending payments that are due a check and settle them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop',action='store_true',help='keep polling until interrupted')
+        parser.add_argument('--interval',type=float,default=5,help='seconds between polls with --loop')
+        parser.add_argument('--batch-size',type=int,default=100)
+        parser.add_argument('--concurrency',type=int,default=CONCURRENCY,help='gateway calls in flight at once')
+
+    def handle(self, *args, **options):
+        while True:
+            totals=reconcile_payments(batch_size=options['batch_size'],concurrency=options['concurrency'])
+            if totals['checked'] or not options['loop']:
+                self.stdout.write(
+                    f"checked {totals['checked']} payments: {totals['completed']} completed, {totals['failed']} failed"
+                )
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,37 @@
+# Generated by Django 6.0.1 on 2026-10-18 03:51
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Now
+
+
+def queue_pending(apps, schema_editor):
+    Payment = apps.get_model('Payments', 'Payment')
+    Payment.objects.filter(status='pending').exclude(method='cod').update(check_after=Now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Orders', '0017_cart_taxable'),
+        ('Payments', '0003_payment_pidx_alter_payment_method'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='check_after',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='checks',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['status', 'check_after'], name='Payments_pa_status_f07632_idx'),
+        ),
+        migrations.RunPython(queue_pending, migrations.RunPython.noop),
+    ]
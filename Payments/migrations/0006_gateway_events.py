@@ -0,0 +1,32 @@
+# Generated by Django 6.0.1 on 2026-10-18 04:01
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Payments', '0005_payment_order_status_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GatewayEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gateway', models.CharField(choices=[('esewa', 'eSewa'), ('khalti', 'Khalti')], max_length=20)),
+                ('event_id', models.CharField(max_length=200)),
+                ('payload', models.JSONField()),
+                ('received_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('outcome', models.CharField(blank=True, max_length=50)),
+                ('payment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='gateway_events', to='Payments.payment')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['processed_at', 'id'], name='Payments_ga_process_443f19_idx')],
+                'unique_together': {('gateway', 'event_id')},
+            },
+        ),
+    ]
@@ -18,7 +18,8 @@ class Payment(models.Model):
     
     ]
 
-    order=models.ForeignKey(Order,  on_delete=models.CASCADE,related_name='payment_details')
+    # covered by the (order, status) index below
+    order=models.ForeignKey(Order,  on_delete=models.CASCADE,related_name='payment_details',db_index=False)
     user=models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     method=models.CharField( max_length=50, choices=PAYMENT_CHOICES)
     amount=models.DecimalField(max_digits=10,decimal_places=2)
@@ -28,10 +29,44 @@ class Payment(models.Model):
     created_at=models.DateTimeField(default=timezone.now)
     transaction_uuid=models.CharField(max_length=100,unique=True,blank=True,null=True)
     pidx=models.CharField(max_length=50,unique=True,blank=True,null=True)
+    # when the reconciliation worker should next ask the gateway, see
+    # Payments.reconcile; null once there is nothing left to ask
+    check_after=models.DateTimeField(null=True,blank=True)
+    checks=models.PositiveIntegerField(default=0)
 
+    class Meta:
+        indexes=[
+            models.Index(fields=['status','check_after']),
+            models.Index(fields=['order','status']),
+        ]
 
     def  __str__(self):
         return f'order {self.order.id}-{self.method}({self.status})'
+
+
+class GatewayEvent(models.Model):
+    """
+    A webhook call from a gateway, stored as received and settled later by
+    Payments.webhooks.process_events. Gateways retry deliveries, so the same
+    event id is only ever stored once per gateway.
+    """
+    gateway=models.CharField(max_length=20,choices=Payment.PAYMENT_CHOICES[:2])
+    event_id=models.CharField(max_length=200)
+    payload=models.JSONField()
+    received_at=models.DateTimeField(default=timezone.now)
+    processed_at=models.DateTimeField(null=True,blank=True)
+    payment=models.ForeignKey(Payment,on_delete=models.SET_NULL,null=True,blank=True,related_name='gateway_events')
+    outcome=models.CharField(max_length=50,blank=True)
+
+    class Meta:
+        unique_together=('gateway','event_id')
+        indexes=[
+            # the worker's queue: unprocessed events in arrival order
+            models.Index(fields=['processed_at','id']),
+        ]
+
+    def __str__(self):
+        return f'{self.gateway} event {self.event_id}'
     
     
     
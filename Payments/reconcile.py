@@ -0,0 +1,237 @@
+import asyncio
+import logging
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from Orders.events import orders_changed
+from Orders.models import Order
+from Orders.transitions import move_orders
+from Payments.gateways import CONCURRENCY, GatewayError, GatewayStatus, esewa, khalti
+from Payments.models import Payment
+
+logger=logging.getLogger(__name__)
+
+# local development only: eSewa's sandbox has no record of payments that
+# never reached it, so let those through instead of leaving them pending
+DEV_MODE=settings.DEBUG and getattr(settings,'ESEWA_DEV_MODE',False)
+# first look a little after the customer is sent to the gateway
+FIRST_CHECK=timedelta(seconds=getattr(settings,'PAYMENT_FIRST_CHECK_SECONDS',60))
+# a claimed payment is handed to another worker if nothing comes back by then
+LEASE=timedelta(seconds=getattr(settings,'PAYMENT_CHECK_LEASE_SECONDS',120))
+RECHECK=getattr(settings,'PAYMENT_RECHECK_SECONDS',30)
+MAX_RECHECK=getattr(settings,'PAYMENT_MAX_RECHECK_SECONDS',900)
+
+LATE_COMPLETION='completed but failed locally'
+
+# Khalti payments can only be looked up once we know their pidx
+QUEUED=Q(method='esewa')|Q(method='khalti',pidx__isnull=False)
+
+
+def enqueue(payment_ids, when=None):
+    """
+    Ask the worker to look at these pending payments by `when` (now by
+    default). Only ever brings a check forward, so a browser polling for
+    its result doesn't write anything once the check is due.
+    """
+    when=when or timezone.now()
+    return Payment.objects.filter(
+        QUEUED,Q(check_after__isnull=True)|Q(check_after__gt=when),id__in=list(payment_ids),status='pending'
+    ).update(check_after=when)
+
+
+def claim(batch_size, now=None):
+    """
+    Take up to `batch_size` due payments off the queue. Rows are claimed
+    with SKIP LOCKED and leased by pushing `check_after` forward, so any
+    number of workers can share the queue and a crashed worker's batch
+    comes back on its own.
+    """
+    now=now or timezone.now()
+    with transaction.atomic():
+        payments=list(
+            Payment.objects.filter(QUEUED,status='pending',check_after__lte=now)
+            .order_by('check_after').select_for_update(skip_locked=True)[:batch_size]
+        )
+        Payment.objects.filter(id__in=[p.id for p in payments]).update(
+            check_after=now+LEASE,checks=F('checks')+1
+        )
+    for payment in payments:
+        payment.checks+=1
+    return payments
+
+
+def lookup(payment):
+    if payment.method=='khalti':
+        return khalti().lookup(payment.pidx)
+    return esewa().status(payment.transaction_uuid,payment.amount)
+
+
+async def lookup_all(payments, concurrency=CONCURRENCY):
+    """
+    Ask the gateways about every payment at once, at most `concurrency` at a
+    time. The client is blocking, so each call runs in a thread; a failed
+    call comes back as its exception.
+    """
+    semaphore=asyncio.Semaphore(concurrency)
+
+    async def one(payment):
+        async with semaphore:
+            try:
+                return payment,await asyncio.to_thread(lookup,payment)
+            except GatewayError as e:
+                return payment,e
+
+    return await asyncio.gather(*(one(payment) for payment in payments))
+
+
+def recheck_delay(checks):
+    return timedelta(seconds=min(RECHECK*2**max(checks-1,0),MAX_RECHECK))
+
+
+def apply_results(results, now=None, require_amount=False):
+    """
+    Write what the gateways said back in bulk: one locking read, one bulk
+    UPDATE for the payments and one order transition per outcome. Returns
+    {payment id: outcome}; payments someone else settled in the meantime
+    are left alone and come back as "already <status>", or LATE_COMPLETION
+    if the gateway took money for a payment already failed here. With
+    `require_amount` a completion that doesn't say how much was paid is
+    treated as an amount mismatch.
+    """
+    now=now or timezone.now()
+    answers={}
+    for payment,result in results:
+        answers[payment.id]=result
+    outcomes={}
+    settled={'completed':[],'failed':[]}
+    with transaction.atomic():
+        payments=list(
+            Payment.objects.filter(id__in=list(answers))
+            .order_by('id').select_for_update()
+        )
+        for payment in payments:
+            outcomes[payment.id]=f'already {payment.status}'
+            result=answers[payment.id]
+            if payment.status=='failed' and not isinstance(result,Exception) and result.status=='completed':
+                # money taken for an order we gave up on, a person has to sort it out
+                logger.warning('payment %s: gateway says completed, failed here',payment.id)
+                outcomes[payment.id]=LATE_COMPLETION
+        payments=[payment for payment in payments if payment.status=='pending']
+        for payment in payments:
+            result=answers[payment.id]
+            outcomes[payment.id]='pending'
+            payment.check_after=now+recheck_delay(payment.checks)
+            if isinstance(result,Exception):
+                outcomes[payment.id]='unavailable'
+                continue
+            status=result.status
+            if status=='not_found' and DEV_MODE and payment.method=='esewa':
+                status='completed'
+                result.raw={'dev_mode':True,'original_response':result.raw}
+                result.reference=f'DEV_{payment.transaction_uuid}'
+            if status=='completed' and (
+                result.amount!=Decimal(payment.amount) if result.amount is not None else require_amount
+            ):
+                # needs a person to look at it, stop asking
+                logger.warning('payment %s: gateway amount %s, expected %s',payment.id,result.amount,payment.amount)
+                payment.raw_json=result.raw
+                payment.check_after=None
+                outcomes[payment.id]='amount mismatch'
+                continue
+            if status in settled:
+                payment.status=status
+                payment.gateway_transaction_id=result.reference or payment.gateway_transaction_id
+                payment.raw_json=result.raw
+                payment.check_after=None
+                settled[status].append(payment.order_id)
+                outcomes[payment.id]=status
+        Payment.objects.bulk_update(
+            payments,['status','gateway_transaction_id','raw_json','check_after'],batch_size=500
+        )
+        move_orders(settled['completed'],('pending',),'processing')
+        move_orders(settled['failed'],('pending',),'canceled')
+        # bulk_update sends no save signals
+        orders_changed.send(sender=Order,order_ids=settled['completed']+settled['failed'])
+    return outcomes
+
+
+def resolve_payments(transaction_uuids=(), pidxs=(), references=()):
+    """
+    Find the payments gateways refer to by `transaction_uuid`, `pidx` or
+    their own reference (`gateway_transaction_id`), all unique, in one
+    query. Returns ({transaction_uuid: payment}, {pidx: payment},
+    {reference: payment}).
+    """
+    by_uuid,by_pidx,by_reference={},{},{}
+    transaction_uuids,pidxs,references=(set(keys)-{None} for keys in (transaction_uuids,pidxs,references))
+    if not transaction_uuids and not pidxs and not references:
+        return by_uuid,by_pidx,by_reference
+    for payment in Payment.objects.filter(
+        Q(transaction_uuid__in=transaction_uuids)|Q(pidx__in=pidxs)|Q(gateway_transaction_id__in=references)
+    ):
+        if payment.transaction_uuid in transaction_uuids:
+            by_uuid[payment.transaction_uuid]=payment
+        if payment.pidx in pidxs:
+            by_pidx[payment.pidx]=payment
+        if payment.gateway_transaction_id in references:
+            by_reference[payment.gateway_transaction_id]=payment
+    return by_uuid,by_pidx,by_reference
+
+
+def match_callbacks(callbacks):
+    """
+    The payment each callback is about, or None, found in one query. A
+    callback is a dict with `transaction_uuid`, `pidx` or the gateway's
+    `reference`, a `status` (completed, failed or pending) and optionally
+    `amount` and `raw`.
+    """
+    by_uuid,by_pidx,by_reference=resolve_payments(
+        (c.get('transaction_uuid') for c in callbacks),(c.get('pidx') for c in callbacks),
+        (c.get('reference') for c in callbacks)
+    )
+    return [
+        by_uuid.get(c.get('transaction_uuid')) or by_pidx.get(c.get('pidx')) or by_reference.get(c.get('reference'))
+        for c in callbacks
+    ]
+
+
+def callback_status(callback):
+    return GatewayStatus(
+        callback['status'],callback.get('reference'),callback.get('amount'),
+        callback.get('raw') or {key:str(value) for key,value in callback.items() if value is not None}
+    )
+
+
+def settle_callbacks(callbacks):
+    """
+    Apply what gateway callbacks or settlement rows say about payments. The
+    payments are found in one query and written through apply_results, so
+    hundreds of callbacks cost the same few statements as one. Returns
+    {'payment', 'outcome'} per callback, in order.
+    """
+    found=match_callbacks(callbacks)
+    answers=[(payment,callback_status(c)) for payment,c in zip(found,callbacks) if payment is not None]
+    outcomes=apply_results(answers) if answers else {}
+    return [
+        {'payment':payment.id,'outcome':outcomes[payment.id]} if payment else {'payment':None,'outcome':'unknown payment'}
+        for payment in found
+    ]
+
+
+def reconcile_payments(batch_size=100, concurrency=CONCURRENCY):
+    """Work through every due payment, a batch at a time. Returns counts by outcome."""
+    totals={'checked':0,'completed':0,'failed':0}
+    while True:
+        payments=claim(batch_size)
+        if payments:
+            results=asyncio.run(lookup_all(payments,concurrency))
+            for outcome in apply_results(results).values():
+                if outcome in totals:
+                    totals[outcome]+=1
+            totals['checked']+=len(payments)
+        if len(payments)<batch_size:
+            return totals
@@ -3,6 +3,8 @@ from rest_framework.serializers import ModelSerializer
 from Orders.models import Order
 from rest_framework import serializers
 import uuid
+from django.utils import timezone
+from Payments.reconcile import FIRST_CHECK
 
 
 
@@ -39,11 +41,20 @@ class PaymentSerializer(ModelSerializer):
             final_ammount=getattr(order,'total_amount',0)
 
 
+            check_after=None
+            if validated_data.get('method')=='cod':
+                # nothing to wait for, keep the stock until the seller ships
+                Order.objects.filter(pk=order.pk).update(reserved_until=None)
+            elif validated_data.get('method')=='esewa':
+                # the reconciliation worker settles it even if the customer never comes back
+                check_after=timezone.now()+FIRST_CHECK
+
             payement=Payment.objects.create(
                 user=request.user,
                 amount=final_ammount,
                 transaction_uuid=transaction_uuid,
                 status='pending',
+                check_after=check_after,
                 **{k: v for k, v in validated_data.items() if k != 'transaction_uuid'}
             )
 
@@ -65,3 +76,25 @@ class KhaltiVerificationSerializer(serializers.Serializer):
 
 
 
+
+
+class PaymentCallbackSerializer(serializers.Serializer):
+        transaction_uuid=serializers.CharField(required=False)
+        pidx=serializers.CharField(required=False)
+        status=serializers.ChoiceField(choices=['completed','failed','pending'])
+        reference=serializers.CharField(required=False)
+        amount=serializers.DecimalField(max_digits=10,decimal_places=2,required=False)
+
+        def validate(self, data):
+            if not any(data.get(key) for key in ('transaction_uuid','pidx','reference')):
+                raise serializers.ValidationError('give transaction_uuid, pidx or reference')
+            return data
+
+
+class BatchVerificationSerializer(serializers.Serializer):
+        callbacks=PaymentCallbackSerializer(many=True,allow_empty=False,max_length=1000)
+
+
+class SettlementFileSerializer(serializers.Serializer):
+        file=serializers.FileField()
+        format=serializers.ChoiceField(choices=['csv','json'],required=False)
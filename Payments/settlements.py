@@ -0,0 +1,124 @@
+import csv
+import json
+import re
+from collections import Counter
+from itertools import islice
+
+from django.conf import settings
+from Payments.gateways import EsewaClient, KhaltiClient, _amount
+from Payments.reconcile import LATE_COMPLETION, settle_callbacks
+
+CHUNK=getattr(settings,'SETTLEMENT_CHUNK_SIZE',1000)
+FLAGGED=('amount mismatch','unknown payment',LATE_COMPLETION)
+
+# settlement file column -> the names eSewa/Khalti exports use for it
+COLUMNS={
+    'transaction_uuid':('transaction_uuid',),
+    'pidx':('pidx',),
+    'reference':('reference','gateway_transaction_id','ref_id','transaction_id','transaction_code'),
+    'amount':('amount','total_amount'),
+    'status':('status',),
+}
+COMPLETED=EsewaClient.COMPLETED|{'COMPLETED'}
+FAILED=EsewaClient.FAILED|{state.upper() for state in KhaltiClient.FAILED}|{'FAILED'}
+
+_between=re.compile(r'[\s,\[\]]*')
+
+
+def read_csv(file):
+    yield from csv.DictReader(file)
+
+
+def read_json(file, size=1<<16):
+    """
+    Rows of a JSON array of objects, or of JSON Lines, decoded one object at
+    a time from `size` character reads, so the file is never held whole.
+    """
+    decoder=json.JSONDecoder()
+    buffer,pos,done='',0,False
+    while True:
+        pos=_between.match(buffer,pos).end()
+        if pos<len(buffer):
+            try:
+                row,pos=decoder.raw_decode(buffer,pos)
+            except json.JSONDecodeError:
+                # half an object, wait for the rest unless there is none
+                if done:
+                    raise
+            else:
+                if not isinstance(row,dict):
+                    raise ValueError('settlement rows must be JSON objects')
+                yield row
+                continue
+        if done:
+            return
+        chunk=file.read(size)
+        done=not chunk
+        buffer=buffer[pos:]+chunk
+        pos=0
+
+
+def read_rows(file, format):
+    return read_csv(file) if format=='csv' else read_json(file)
+
+
+def format_of(name):
+    return 'csv' if name.lower().endswith('.csv') else 'json'
+
+
+def _status(value):
+    state=str(value or '').strip().upper()
+    if state in COMPLETED:
+        return 'completed'
+    if state in FAILED:
+        return 'failed'
+    return 'pending'
+
+
+def as_callback(row):
+    """A settlement row in the shape settle_callbacks takes; amounts are in rupees."""
+    values={}
+    for field,names in COLUMNS.items():
+        for name in names:
+            value=row.get(name)
+            if value not in (None,''):
+                values[field]=str(value).strip()
+                break
+    return {
+        'transaction_uuid':values.get('transaction_uuid'),
+        'pidx':values.get('pidx'),
+        'reference':values.get('reference'),
+        'status':_status(values.get('status')),
+        'amount':_amount(values['amount']) if 'amount' in values else None,
+        'raw':row,
+    }
+
+
+def import_settlements(rows, chunk_size=CHUNK):
+    """
+    Settle payments from a stream of settlement rows, `chunk_size` rows per
+    query and transaction, so memory stays flat however long the file is
+    and a failure only loses the chunk it happened in. Yields (number, row,
+    result) for every row, numbered from 1, as its chunk is written;
+    importing the same file twice changes nothing the second time.
+    """
+    rows=iter(rows)
+    number=0
+    while True:
+        chunk=list(islice(rows,chunk_size))
+        if not chunk:
+            return
+        for row,result in zip(chunk,settle_callbacks([as_callback(row) for row in chunk])):
+            number+=1
+            yield number,row,result
+
+
+def summarise(results, keep=100):
+    """Count outcomes and keep the first `keep` rows that need a person to look at them."""
+    outcomes=Counter()
+    flagged=[]
+    for number,row,result in results:
+        outcomes[result['outcome']]+=1
+        if result['outcome'] in FLAGGED and len(flagged)<keep:
+            flagged.append({'number':number,'payment':result['payment'],'outcome':result['outcome'],'row':row})
+    return {'rows':sum(outcomes.values()),'outcomes':dict(outcomes),'flagged':flagged}
@@ -1,3 +1,551 @@
-from django.test import TestCase
+import base64
+import hashlib
+import hmac
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from Orders.models import Order
+from Orders.tests import make_sku, order_payload
+from Payments.gateways import CircuitBreaker, EsewaClient, GatewayError, GatewayUnavailable, KhaltiClient
+from Payments.models import GatewayEvent, Payment
+from Payments.reconcile import enqueue, reconcile_payments, resolve_payments
+from Payments.settlements import read_json
+from Payments.webhooks import process_events
+from Users.models import User
+
+
+class IdempotentPaymentTest(APITestCase):
+    def test_retried_payment_is_created_once(self):
+        customer = User.objects.create_user(username='customer', password='password123', role='customer')
+        order = Order.objects.create(
+            customer=customer, full_name='Test Customer', email='customer@example.com', address='Street 1',
+            city='Kathmandu', postal_code='44600', total_amount=500,
+        )
+        self.client.force_authenticate(user=customer)
+        payload = {'order': order.id, 'method': 'cod'}
+        first = self.client.post('/payment/', payload, format='json', HTTP_IDEMPOTENCY_KEY='pay-1')
+        retry = self.client.post('/payment/', payload, format='json', HTTP_IDEMPOTENCY_KEY='pay-1')
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(Payment.objects.count(), 1)
+
+
+class StubGateway:
+    """
+    Local HTTP server standing in for eSewa/Khalti. `reply(status, body,
+    delay)` queues answers in order (the last one repeats) and `hits` counts
+    requests served.
+    """
+
+    def __init__(self):
+        stub = self
+        self.replies = [(200, {}, 0)]
+        self.hits = 0
+        self.requests = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def answer(self):
+                stub.hits += 1
+                length = int(self.headers.get('Content-Length') or 0)
+                stub.requests.append((self.command, self.path, self.rfile.read(length), dict(self.headers)))
+                code, body, delay = stub.replies.pop(0) if len(stub.replies) > 1 else stub.replies[0]
+                time.sleep(delay)
+                payload = body if isinstance(body, bytes) else json.dumps(body).encode()
+                self.send_response(code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = answer
+
+            def log_message(self, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+            def handle_error(self, request, client_address):
+                pass  # clients that gave up on a slow answer
+
+        self.server = Server(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def reply(self, *replies):
+        self.replies = [reply if len(reply) == 3 else (*reply, 0) for reply in replies]
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class GatewayClientTest(SimpleTestCase):
+    def setUp(self):
+        self.stub = StubGateway()
+        self.addCleanup(self.stub.stop)
+
+    def client_for(self, cls=EsewaClient, **kwargs):
+        options = dict(timeout=(0.5, 0.5), deadline=2, retries=2, backoff=0.01, concurrency=2)
+        options.update(kwargs)
+        return cls(base_url=self.stub.url, **options)
+
+    def test_esewa_status_is_normalised(self):
+        self.stub.reply((200, {'status': 'COMPLETE', 'ref_id': 'R1', 'total_amount': '500.0'}))
+        result = self.client_for().status('7-abc', Decimal('500.00'))
+        self.assertEqual((result.status, result.reference, result.amount), ('completed', 'R1', Decimal('500.0')))
+        method, path, _, _ = self.stub.requests[0]
+        self.assertIn('total_amount=500&', path)
+        self.stub.reply((200, {'status': 'USER_CANCELED'}))
+        self.assertEqual(self.client_for().status('7-abc', 500).status, 'failed')
+
+    def test_khalti_lookup_sends_key_and_converts_paisa(self):
+        self.stub.reply((200, {'status': 'Completed', 'transaction_id': 'T1', 'total_amount': 50000}))
+        result = self.client_for(KhaltiClient, secret_key='secret').lookup('px1')
+        self.assertEqual((result.status, result.amount), ('completed', Decimal('500')))
+        method, _, body, headers = self.stub.requests[0]
+        self.assertEqual((method, json.loads(body), headers['Authorization']), ('POST', {'pidx': 'px1'}, 'Key secret'))
+        self.stub.reply((404, {'detail': 'Not found.'}))
+        self.assertEqual(self.client_for(KhaltiClient).lookup('px2').status, 'not_found')
+
+    def test_answers_that_are_not_objects_are_gateway_errors(self):
+        for body in (['Completed'], 'Completed', None):
+            self.stub.reply((200, body))
+            with self.assertRaises(GatewayError):
+                self.client_for(KhaltiClient).lookup('px1')
+            with self.assertRaises(GatewayError):
+                self.client_for().status('7-abc', 500)
+
+    def test_retries_server_errors(self):
+        self.stub.reply((503, {}), (502, {}), (200, {'status': 'PENDING'}))
+        self.assertEqual(self.client_for().status('7-abc', 500).status, 'pending')
+        self.assertEqual(self.stub.hits, 3)
+
+    def test_deadline_covers_every_attempt(self):
+        self.stub.reply((200, {'status': 'COMPLETE'}, 1))
+        client = self.client_for(timeout=(0.5, 0.2), deadline=0.5)
+        started = time.monotonic()
+        with self.assertRaises(GatewayUnavailable):
+            client.status('7-abc', 500)
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_breaker_fails_fast_then_probes(self):
+        self.stub.reply((500, {}))
+        client = self.client_for(retries=0, breaker=CircuitBreaker(threshold=2, reset_after=0.2))
+        for _ in range(2):
+            with self.assertRaises(GatewayUnavailable):
+                client.status('7-abc', 500)
+        with self.assertRaisesMessage(GatewayUnavailable, 'not calling it'):
+            client.status('7-abc', 500)
+        self.assertEqual(self.stub.hits, 2)
+        time.sleep(0.25)
+        self.stub.reply((200, {'status': 'COMPLETE'}))
+        self.assertEqual(client.status('7-abc', 500).status, 'completed')
+        self.assertEqual(client.breaker.state, 'closed')
+
+    def test_busy_client_does_not_use_up_the_probe(self):
+        self.stub.reply((500, {}))
+        client = self.client_for(retries=0, concurrency=1, breaker=CircuitBreaker(threshold=1, reset_after=0.1))
+        with self.assertRaises(GatewayUnavailable):
+            client.status('7-abc', 500)
+        time.sleep(0.15)
+        client._slots.acquire()
+        with self.assertRaisesMessage(GatewayUnavailable, 'in flight'):
+            client.status('7-abc', 500)
+        client._slots.release()
+        self.stub.reply((200, {'status': 'COMPLETE'}))
+        self.assertEqual(client.status('7-abc', 500).status, 'completed')
+        self.assertEqual(client.breaker.state, 'closed')
+
+    def test_calls_over_the_concurrency_limit_fail_fast(self):
+        self.stub.reply((200, {'status': 'COMPLETE'}, 0.3))
+        client = self.client_for(concurrency=1)
+        slow = threading.Thread(target=client.status, args=('7-abc', 500))
+        slow.start()
+        time.sleep(0.1)
+        with self.assertRaisesMessage(GatewayUnavailable, 'in flight'):
+            client.status('7-def', 500)
+        slow.join()
+
+
+class ReconciliationTest(APITestCase):
+    def setUp(self):
+        self.stub = StubGateway()
+        self.addCleanup(self.stub.stop)
+        for name, cls in (('esewa', EsewaClient), ('khalti', KhaltiClient)):
+            client = cls(base_url=self.stub.url, retries=0, backoff=0.01, concurrency=10)
+            patcher = mock.patch(f'Payments.reconcile.{name}', return_value=client)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.customer = User.objects.create_user(username='customer', password='password123', role='customer')
+        self.sku = make_sku('PAY', 100, price=500)
+        self.client.force_authenticate(user=self.customer)
+
+    def pay(self, method='esewa'):
+        order_id = self.client.post('/order/', order_payload((self.sku, 1)), format='json').data['id']
+        self.client.post('/payment/', {'order': order_id, 'method': method}, format='json')
+        return Payment.objects.get(order_id=order_id)
+
+    def verify(self, payment):
+        return self.client.post('/payment/verify_esewa/', {
+            'transaction_uuid': payment.transaction_uuid, 'total_amount': '500', 'transaction_code': 'C1'
+        }, format='json')
+
+    def test_verify_only_enqueues_and_reads_status(self):
+        payment = self.pay()
+        self.assertGreater(payment.check_after, timezone.now())
+        response = self.verify(payment)
+        self.assertEqual((response.status_code, response.data['status']), (status.HTTP_202_ACCEPTED, 'Payment Pending'))
+        self.assertLessEqual(Payment.objects.get(pk=payment.pk).check_after, timezone.now())
+        self.assertEqual(self.stub.hits, 0)
+
+        self.stub.reply((200, {'status': 'COMPLETE', 'ref_id': 'R1', 'total_amount': str(payment.amount)}))
+        self.assertEqual(reconcile_payments(batch_size=10), {'checked': 1, 'completed': 1, 'failed': 0})
+        payment.refresh_from_db()
+        self.assertEqual((payment.status, payment.gateway_transaction_id, payment.check_after), ('completed', 'R1', None))
+        self.assertEqual(payment.order.status, 'processing')
+        self.assertEqual(list(payment.order.seller_orders.values_list('status', flat=True)), ['processing'])
+        self.assertEqual(self.verify(payment).data['status'], 'Payment Verified')
+
+    def test_failed_payment_cancels_the_order(self):
+        payment = self.pay()
+        enqueue([payment.id])
+        self.stub.reply((200, {'status': 'USER_CANCELED'}))
+        reconcile_payments()
+        self.assertEqual(Order.objects.get(pk=payment.order_id).status, 'canceled')
+        self.sku.refresh_from_db()
+        self.assertEqual(self.sku.stock, 100)
+        self.assertEqual(self.verify(payment).data['status'], 'Payment Failed')
+
+    def test_outage_and_mismatch_leave_payment_pending(self):
+        payment = self.pay()
+        enqueue([payment.id])
+        self.stub.reply((503, {}))
+        self.assertEqual(reconcile_payments()['checked'], 1)
+        payment.refresh_from_db()
+        self.assertEqual((payment.status, payment.checks), ('pending', 1))
+        self.assertGreater(payment.check_after, timezone.now())
+        self.assertEqual(reconcile_payments()['checked'], 0)
+
+        enqueue([payment.id])
+        self.stub.reply((200, {'status': 'COMPLETE', 'ref_id': 'R2', 'total_amount': '1.0'}))
+        with self.assertLogs('Payments.reconcile', 'WARNING'):
+            reconcile_payments()
+        payment.refresh_from_db()
+        self.assertEqual((payment.status, payment.check_after), ('pending', None))
+
+    def test_unknown_transactions_stay_pending(self):
+        esewa, khalti = self.pay(), self.pay('khalti')
+        Payment.objects.filter(pk=khalti.pk).update(pidx='px1')
+        enqueue([esewa.id, khalti.id])
+        # a payment abandoned before reaching the gateway, as both gateways report it
+        self.stub.reply((404, {'status': 'NOT_FOUND'}))
+        self.assertEqual(reconcile_payments(), {'checked': 2, 'completed': 0, 'failed': 0})
+        for payment in (esewa, khalti):
+            payment.refresh_from_db()
+            self.assertEqual(payment.status, 'pending')
+            self.assertGreater(payment.check_after, timezone.now())
+            self.assertEqual(payment.order.status, 'pending')
+
+        # the development shortcut never applies to Khalti
+        enqueue([esewa.id, khalti.id])
+        with mock.patch('Payments.reconcile.DEV_MODE', True):
+            self.assertEqual(reconcile_payments()['completed'], 1)
+        self.assertEqual(Payment.objects.get(pk=esewa.pk).status, 'completed')
+        self.assertEqual(Payment.objects.get(pk=khalti.pk).status, 'pending')
+
+    def test_khalti_payments_queue_once_pidx_is_known(self):
+        payment = self.pay('khalti')
+        self.assertIsNone(payment.check_after)
+        response = self.client.post(
+            '/payment/verify_khalti/', {'pidx': 'px1', 'transaction_uuid': payment.transaction_uuid}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.stub.reply((200, {'status': 'Completed', 'transaction_id': 'T1', 'total_amount': int(payment.amount * 100)}))
+        self.assertEqual(reconcile_payments()['completed'], 1)
+        method, path, body, _ = self.stub.requests[0]
+        self.assertEqual((method, json.loads(body)), ('POST', {'pidx': 'px1'}))
+
+    def test_batch_is_looked_up_concurrently_and_written_in_bulk(self):
+        def settle(count):
+            payments = [self.pay() for _ in range(count)]
+            enqueue([p.id for p in payments])
+            self.stub.reply((200, {'status': 'COMPLETE', 'total_amount': str(payments[0].amount)}, 0.1))
+            with CaptureQueriesContext(connection) as queries:
+                started = time.monotonic()
+                self.assertEqual(reconcile_payments(batch_size=50, concurrency=10)['completed'], count)
+            return time.monotonic() - started, len(queries)
+
+        _, few = settle(2)
+        elapsed, many = settle(20)
+        # 20 lookups of 100ms each, ten at a time
+        self.assertLess(elapsed, 1)
+        self.assertEqual(few, many)
+
+
+class PaymentResolutionTest(APITestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user(username='customer', password='password123', role='customer')
+        self.admin = User.objects.create_user(username='admin', password='password123', role='admin')
+        self.sku = make_sku('PAY', 1000, price=500)
+        self.client.force_authenticate(user=self.customer)
+
+    def pay(self, order_id=None):
+        if order_id is None:
+            order_id = self.client.post('/order/', order_payload((self.sku, 1)), format='json').data['id']
+        self.client.post('/payment/', {'order': order_id, 'method': 'esewa'}, format='json')
+        return Payment.objects.filter(order_id=order_id).latest('pk')
+
+    def settle(self, callbacks):
+        self.client.force_authenticate(user=self.admin)
+        return self.client.post('/payment/verify_batch/', {'callbacks': callbacks}, format='json')
+
+    def test_verify_finds_the_payment_by_transaction_uuid(self):
+        first = self.pay()
+        second = self.pay(first.order_id)
+        Payment.objects.filter(pk=second.pk).update(status='completed')
+        response = self.client.post('/payment/verify_esewa/', {
+            'transaction_uuid': second.transaction_uuid, 'total_amount': '500', 'transaction_code': 'C1'
+        }, format='json')
+        self.assertEqual(response.data['status'], 'Payment Verified')
+        with self.assertNumQueries(1):
+            by_uuid, _, _ = resolve_payments([first.transaction_uuid, 'nope'], ['px'])
+        self.assertEqual(list(by_uuid), [first.transaction_uuid])
+
+    def test_batch_settles_callbacks_in_bulk(self):
+        paid, declined, short = self.pay(), self.pay(), self.pay()
+        with self.assertLogs('Payments.reconcile', 'WARNING'):
+            response = self.settle([
+                {'transaction_uuid': paid.transaction_uuid, 'status': 'completed', 'reference': 'R1', 'amount': str(paid.amount)},
+                {'transaction_uuid': declined.transaction_uuid, 'status': 'failed'},
+                {'transaction_uuid': short.transaction_uuid, 'status': 'completed', 'amount': '1.00'},
+                {'transaction_uuid': 'unknown', 'status': 'completed'},
+            ])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [result['outcome'] for result in response.data['results']],
+            ['completed', 'failed', 'amount mismatch', 'unknown payment'],
+        )
+        self.assertEqual(Order.objects.get(pk=paid.order_id).status, 'processing')
+        self.assertEqual(Order.objects.get(pk=declined.order_id).status, 'canceled')
+        repeat = self.settle([{'transaction_uuid': paid.transaction_uuid, 'status': 'completed'}])
+        self.assertEqual(repeat.data['results'][0]['outcome'], 'already completed')
+
+    def test_batch_cost_does_not_grow_with_size(self):
+        def settle(count):
+            self.client.force_authenticate(user=self.customer)
+            payments = [self.pay() for _ in range(count)]
+            callbacks = [{'transaction_uuid': p.transaction_uuid, 'status': 'completed'} for p in payments]
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.settle(callbacks).status_code, status.HTTP_200_OK)
+            return len(queries)
+
+        self.assertEqual(settle(2), settle(50))
+        self.client.force_authenticate(user=self.customer)
+        response = self.client.post('/payment/verify_batch/', {'callbacks': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class SettlementImportTest(APITestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user(username='customer', password='password123', role='customer')
+        self.admin = User.objects.create_user(username='admin', password='password123', role='admin')
+        self.sku = make_sku('SET', 1000, price=200)
+        self.client.force_authenticate(user=self.customer)
+        self.payments = []
+        for _ in range(3):
+            order_id = self.client.post('/order/', order_payload((self.sku, 1)), format='json').data['id']
+            self.client.post('/payment/', {'order': order_id, 'method': 'esewa'}, format='json')
+            self.payments.append(Payment.objects.get(order_id=order_id))
+        Payment.objects.filter(pk=self.payments[2].pk).update(gateway_transaction_id='REF-3')
+
+    def csv(self):
+        paid, declined, by_reference = self.payments
+        return (
+            'transaction_uuid,ref_id,total_amount,status\n'
+            f'{paid.transaction_uuid},REF-1,{paid.amount},COMPLETE\n'
+            f'{declined.transaction_uuid},,{declined.amount},CANCELED\n'
+            f',REF-3,1.00,COMPLETE\n'
+            'missing,REF-9,10,COMPLETE\n'
+        )
+
+    def test_command_streams_a_csv_in_chunks(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as file:
+            file.write(self.csv())
+        self.addCleanup(os.remove, file.name)
+        out, err = io.StringIO(), io.StringIO()
+        with self.assertLogs('Payments.reconcile', 'WARNING'):
+            call_command('import_settlements', file.name, chunk_size=2, stdout=out, stderr=err)
+        self.assertIn('imported 4 rows: 1 amount mismatch, 1 completed, 1 failed, 1 unknown payment', out.getvalue())
+        self.assertIn('row 4: unknown payment', err.getvalue())
+        paid, declined, by_reference = (Payment.objects.get(pk=p.pk) for p in self.payments)
+        self.assertEqual((paid.status, paid.gateway_transaction_id), ('completed', 'REF-1'))
+        self.assertEqual(declined.status, 'failed')
+        self.assertEqual((by_reference.status, by_reference.check_after), ('pending', None))
+        self.assertEqual(Order.objects.get(pk=paid.order_id).status, 'processing')
+        self.assertEqual(Order.objects.get(pk=declined.order_id).status, 'canceled')
+
+        out = io.StringIO()
+        with self.assertLogs('Payments.reconcile', 'WARNING'):
+            call_command('import_settlements', file.name, stdout=out, stderr=io.StringIO())
+        self.assertIn('1 already completed, 1 already failed', out.getvalue())
+
+    def test_json_is_decoded_an_object_at_a_time(self):
+        rows = [{'transaction_uuid': f'T{i}', 'status': 'COMPLETE', 'note': 'a [b], {c}'} for i in range(20)]
+        self.assertEqual(list(read_json(io.StringIO(json.dumps(rows)), size=7)), rows)
+        lines = '\n'.join(json.dumps(row) for row in rows)
+        self.assertEqual(list(read_json(io.StringIO(lines), size=5)), rows)
+        with self.assertRaises(ValueError):
+            list(read_json(io.StringIO('[{"transaction_uuid": "T1"}, {"broken"'), size=4))
+
+    def test_admin_uploads_a_settlement_file(self):
+        paid = self.payments[0]
+        rows = [{'transaction_uuid': paid.transaction_uuid, 'total_amount': str(paid.amount), 'status': 'COMPLETE'}]
+        upload = SimpleUploadedFile('settlement.json', json.dumps(rows).encode())
+        response = self.client.post('/payment/import_settlements/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.admin)
+        upload = SimpleUploadedFile('settlement.csv', self.csv().encode())
+        with self.assertLogs('Payments.reconcile', 'WARNING'):
+            response = self.client.post('/payment/import_settlements/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['rows'], 4)
+        self.assertEqual(response.data['outcomes']['completed'], 1)
+        self.assertEqual(
+            [(row['number'], row['outcome']) for row in response.data['flagged']],
+            [(3, 'amount mismatch'), (4, 'unknown payment')]
+        )
+
+
+    def test_money_taken_for_a_failed_payment_is_flagged(self):
+        paid, declined, _ = self.payments
+        Payment.objects.filter(pk=declined.pk).update(status='failed')
+        rows = [
+            {'transaction_uuid': declined.transaction_uuid, 'total_amount': str(declined.amount), 'status': 'COMPLETE'},
+            {'transaction_uuid': paid.transaction_uuid, 'total_amount': str(paid.amount), 'status': 'CANCELED'},
+        ]
+        self.client.force_authenticate(user=self.admin)
+        upload = SimpleUploadedFile('settlement.json', json.dumps(rows).encode())
+        with self.assertLogs('Payments.reconcile', 'WARNING'):
+            response = self.client.post('/payment/import_settlements/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['outcomes'], {'completed but failed locally': 1, 'failed': 1})
+        self.assertEqual(
+            [(row['number'], row['outcome']) for row in response.data['flagged']],
+            [(1, 'completed but failed locally')]
+        )
+        self.assertEqual(Payment.objects.get(pk=declined.pk).status, 'failed')
+
+
+class GatewayWebhookTest(APITestCase):
+    def setUp(self):
+        for name, secret in (('ESEWA_SECRET_KEY', 'esewa-secret'), ('KHALTI_WEBHOOK_SECRET', 'khalti-secret')):
+            patcher = mock.patch(f'Payments.webhooks.{name}', secret)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.customer = User.objects.create_user(username='customer', password='password123', role='customer')
+        self.sku = make_sku('HOOK', 1000, price=300)
+        self.client.force_authenticate(user=self.customer)
+        self.payments = []
+        for method in ('esewa', 'khalti'):
+            order_id = self.client.post('/order/', order_payload((self.sku, 1)), format='json').data['id']
+            self.client.post('/payment/', {'order': order_id, 'method': method}, format='json')
+            self.payments.append(Payment.objects.get(order_id=order_id))
+        Payment.objects.filter(pk=self.payments[1].pk).update(pidx='PIDX-1')
+        self.client.force_authenticate(user=None)
+
+    def esewa(self, payment, state, code='C1', signature=None, secret=b'esewa-secret', amount=True):
+        fields = {
+            'transaction_code': code, 'status': state, 'total_amount': str(payment.amount),
+            'transaction_uuid': payment.transaction_uuid, 'product_code': 'EPAYTEST',
+        }
+        if not amount:
+            del fields['total_amount']
+        fields['signed_field_names'] = ','.join(list(fields) + ['signed_field_names'])
+        message = ','.join(f'{key}={value}' for key, value in fields.items()).encode()
+        digest = hmac.new(secret, message, hashlib.sha256).digest()
+        fields['signature'] = signature or base64.b64encode(digest).decode()
+        data = base64.b64encode(json.dumps(fields).encode()).decode()
+        return self.client.post('/payment/webhook/esewa/', {'data': data}, format='json')
+
+    def khalti(self, payload, secret=b'khalti-secret'):
+        body = json.dumps(payload).encode()
+        signature = hmac.new(secret, body, hashlib.sha256).hexdigest()
+        return self.client.post(
+            '/payment/webhook/khalti/', body, content_type='application/json', HTTP_X_KHALTI_SIGNATURE=signature
+        )
+
+    def test_events_are_verified_stored_once_and_settled_later(self):
+        esewa, khalti = self.payments
+        self.assertEqual(self.esewa(esewa, 'COMPLETE').status_code, status.HTTP_200_OK)
+        self.assertEqual(self.esewa(esewa, 'COMPLETE').status_code, status.HTTP_200_OK)
+        self.assertEqual(self.esewa(esewa, 'COMPLETE', signature='forged').status_code, status.HTTP_400_BAD_REQUEST)
+        paisa = int(khalti.amount * 100)
+        self.khalti({'pidx': 'PIDX-1', 'status': 'Pending', 'total_amount': paisa})
+        self.khalti({'pidx': 'PIDX-1', 'status': 'User canceled', 'transaction_id': 'K1', 'total_amount': paisa})
+        self.khalti({'pidx': 'PIDX-1', 'status': 'Completed', 'total_amount': paisa})
+        self.khalti({'pidx': 'PIDX-2', 'status': 'Completed'})
+        self.assertEqual(self.khalti({'pidx': 'PIDX-1', 'status': 'Completed'}, secret=b'wrong').status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.assertEqual(GatewayEvent.objects.count(), 5)
+        self.assertEqual(Payment.objects.get(pk=esewa.pk).status, 'pending')
+        out = io.StringIO()
+        call_command('process_gateway_events', batch_size=2, stdout=out)
+        self.assertIn('processed 5 gateway events', out.getvalue())
+
+        esewa, khalti = (Payment.objects.get(pk=p.pk) for p in self.payments)
+        self.assertEqual((esewa.status, esewa.gateway_transaction_id), ('completed', 'C1'))
+        self.assertEqual(Order.objects.get(pk=esewa.order_id).status, 'processing')
+        # the cancel came first, the late "Completed" doesn't undo it
+        self.assertEqual((khalti.status, khalti.gateway_transaction_id), ('failed', 'K1'))
+        self.assertEqual(
+            list(GatewayEvent.objects.order_by('id').values_list('outcome', flat=True)),
+            ['completed', 'pending', 'failed', 'superseded', 'unknown payment'],
+        )
+        self.assertEqual(process_events(), 0)
+
+    def test_batch_cost_does_not_grow_with_events(self):
+        def process(count):
+            GatewayEvent.objects.bulk_create(
+                GatewayEvent(gateway='esewa', event_id=f'{count}-{i}', payload={'transaction_uuid': f'nope-{i}', 'status': 'COMPLETE'})
+                for i in range(count)
+            )
+            with CaptureQueriesContext(connection) as queries:
+                process_events()
+            return len(queries)
+
+        self.assertEqual(process(2), process(100))
+
+    def test_callbacks_are_refused_without_a_secret(self):
+        esewa = self.payments[0]
+        with mock.patch('Payments.webhooks.KHALTI_WEBHOOK_SECRET', ''), mock.patch('Payments.webhooks.ESEWA_SECRET_KEY', ''):
+            self.assertEqual(self.khalti({'pidx': 'PIDX-1', 'status': 'Completed'}, secret=b'').status_code, status.HTTP_400_BAD_REQUEST)
+            # eSewa's test key is public, it must not be a fallback
+            response = self.esewa(esewa, 'COMPLETE', secret=b'8gBm/:&EnhH.1/q')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(GatewayEvent.objects.exists())
+
+    def test_completions_must_carry_the_amount(self):
+        esewa, khalti = self.payments
+        self.assertEqual(self.esewa(esewa, 'COMPLETE', amount=False).status_code, status.HTTP_400_BAD_REQUEST)
+        self.khalti({'pidx': 'PIDX-1', 'status': 'Completed', 'transaction_id': 'K1'})
+        with self.assertLogs('Payments.reconcile', 'WARNING'):
+            process_events()
+        self.assertEqual(GatewayEvent.objects.get().outcome, 'amount mismatch')
+        self.assertEqual(Payment.objects.get(pk=khalti.pk).status, 'pending')
+        self.assertEqual(Order.objects.get(pk=khalti.order_id).status, 'pending')
@@ -1,14 +1,18 @@
+import csv
+import io
+
 from django.shortcuts import render
-from Payments.serializers import PaymentSerializer, EsewaVerificationSerializer,KhaltiVerificationSerializer
+from Payments.serializers import PaymentSerializer, EsewaVerificationSerializer,KhaltiVerificationSerializer,BatchVerificationSerializer,SettlementFileSerializer
 from Payments.models import Payment
 from rest_framework import viewsets, status
 from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.decorators import action
 from rest_framework.response import Response
-import requests
-from django.conf import settings
-DEV_MODE = getattr(settings, 'ESEWA_DEV_MODE', True)
+from core.idempotency import idempotent
+from Payments.reconcile import enqueue, settle_callbacks
+from Payments.settlements import format_of, import_settlements, read_rows, summarise
+from Payments.webhooks import InvalidEvent, receive
 
 
 class PaymentViewSet(viewsets.ModelViewSet):
@@ -19,110 +23,54 @@ class PaymentViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         return Payment.objects.filter(user=self.request.user)
-   
-    """ 
-   
-    @action(
-                detail=False,
-                methods=['post'],
-                serializer_class=KhaltiVerificationSerializer,
 
+    def filter_queryset(self, queryset):
+        # ?order= and ?status=, served by the (order, status) index
+        params=self.request.query_params
+        if params.get('order','').isdigit():
+            queryset=queryset.filter(order_id=params['order'])
+        if params.get('status'):
+            queryset=queryset.filter(status=params['status'])
+        return super().filter_queryset(queryset)
+
+    @idempotent('payment.create')
+    def create(self, request, *args, **kwargs):
+        return super().create(request,*args,**kwargs)
+
+    def _verification(self, payment):
+        # the reconciliation worker asks the gateway, this only reads back
+        # what it found so far
+        if payment.status=='completed':
+            return Response({"status":"Payment Verified"},status=status.HTTP_200_OK)
+        if payment.status=='failed':
+            return Response({"status":"Payment Failed"},status=status.HTTP_200_OK)
+        enqueue([payment.id])
+        return Response(
+            {"status":"Payment Pending","details":"Payment is still being confirmed. Please check again in a moment."},
+            status=status.HTTP_202_ACCEPTED
         )
-    def verify_khalti(self,request):
+
+    @action(
+        detail=False,
+        methods=['post'],
+        serializer_class=KhaltiVerificationSerializer
+    )
+    def verify_khalti(self, request):
         serializer=self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         pidx=serializer.validated_data['pidx']
-        url = "https://a.khalti.com/api/v2/epayment/lookup/"
-        headers={
-            'Authorization':'Key ',
-            'Content-Type':'application/json',
-
-        }
-        payload={
-            'pidx':pidx
-        }
-        try:
-            response=requests.post(url,headers=headers,json=payload)
-            resp_data=response.json()
-            khalti_status=resp_data.get('status')
-
-
-            try:
-                payment=Payment.objects.get(pidx=pidx)
-            except Payment.DoesNotExist:
-                transaction_uuid=resp_data.get('purchase_order_id')
-                if not transaction_uuid:
-                    return Response('payment not found',status=status.HTTP_404_NOT_FOUND)
-                try:
-                    payment=Payment.objects.get(transaction_uuid=transaction_uuid)
-                except Payment.DoesNotExist:
-                    return Response({"error":"payment not found in system"},status=status.HTTP_404_NOT_FOUND)
-            
-
-            if khalti_status == 'Completed':
-                khalti_amount = Decimal(resp_data.get('total_amount', 0)) / 100
-
-            
-                if khalti_amount != Decimal(payment.amount):
-                            return Response(
-                                {
-                                    "error": "Amount mismatch", 
-                                    "khalti_amount": khalti_amount, 
-                                    "db_amount": payment.amount
-                                }, 
-                                status=status.HTTP_400_BAD_REQUEST
-                            )
-                payment.status='completed'
-                payment.gateway_transaction_id=resp_data.get('transaction_id')
-                payment.raw_json=resp_data
-                payment.save()
-
-                payment.order.status='processing'
-                payment.order.save()
-
-                return Response({"status": "Payment Verified via Khalti"}, status=status.HTTP_200_OK)
-        
-
-
-
-            elif khalti_status in ['User canceled', 'Expired', 'Refunded']:
-                payment.status = 'failed'
-                payment.raw_json = resp_data
-                payment.save()
-
-                payment.order.status = 'canceled'
-                payment.order.save()
-
-                return Response(
-                    {"error": f"Payment {khalti_status}"},
-                    status=status.HTTP_200_OK
-                )
-            else:
-               return Response({'error': f'Payment current status: {payment.order.status}'},status=status.HTTP_400_BAD_REQUEST)
-
-        except Exception as e:
-                return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)    
-            
-
-
-
-
-
-
-        
-    
-     """
-    
-    
-    
-
-        
-
-        
-
-
-
-
+        transaction_uuid=serializer.validated_data.get('transaction_uuid')
+
+        payments=self.get_queryset()
+        payment=payments.filter(pidx=pidx).first()
+        if payment is None and transaction_uuid:
+            payment=payments.filter(transaction_uuid=transaction_uuid,pidx__isnull=True).first()
+            if payment is not None:
+                payment.pidx=pidx
+                payment.save(update_fields=['pidx'])
+        if payment is None:
+            return Response({"error":"payment not found in system"},status=status.HTTP_404_NOT_FOUND)
+        return self._verification(payment)
 
     @action(
         detail=False,
@@ -133,124 +81,73 @@ class PaymentViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        data = serializer.validated_data
-        transaction_uuid = data['transaction_uuid'] 
-        total_amount = data['total_amount']         
-        transaction_code = data['transaction_code']
-
-        url = "https://rc-epay.esewa.com.np/api/epay/transaction/status/"
-        raw_uuid=data['transaction_uuid']
-        if "-" in str(raw_uuid):
-            order_id = str(raw_uuid).split("-")[0]
-        else:
-            order_id = raw_uuid
-        try:
-            payment = Payment.objects.get(
-                order__id=order_id,
-                status='pending'
-            )
-        except Payment.DoesNotExist:
+        # transaction_uuid is unique, one index lookup finds the payment
+        payment = self.get_queryset().filter(transaction_uuid=serializer.validated_data['transaction_uuid']).first()
+        if payment is None:
             return Response(
-                {"error": "Pending payment not found for this Order ID"},
+                {"error": "Payment not found for this transaction"},
                 status=status.HTTP_404_NOT_FOUND
             )
-        clean_amount = payment.amount
-        if clean_amount % 1 == 0:
-            clean_amount = int(clean_amount)
-
+        return self._verification(payment)
 
-        params = {
-            'product_code': 'EPAYTEST',
-            'total_amount':str(clean_amount),
-            'transaction_uuid': transaction_uuid,
-        }
-        
+    @action(
+        detail=False,
+        methods=['post'],
+        serializer_class=BatchVerificationSerializer
+    )
+    def verify_batch(self, request):
+        """Settle up to a thousand gateway callbacks or settlement rows in one go (admins only)."""
+        if request.user.role!='admin':
+            return Response({"error":"only admins can settle payments in bulk"},status=status.HTTP_403_FORBIDDEN)
+        serializer=self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        callbacks=serializer.validated_data['callbacks']
+        results=settle_callbacks(callbacks)
+        for callback,result in zip(callbacks,results):
+            result['transaction_uuid']=callback.get('transaction_uuid')
+            result['pidx']=callback.get('pidx')
+        return Response({"results":results},status=status.HTTP_200_OK)
 
+    @action(
+        detail=False,
+        methods=['post'],
+        serializer_class=SettlementFileSerializer
+    )
+    def import_settlements(self, request):
+        """
+        Settle payments from an uploaded settlement file (admins only). The
+        upload is read a chunk of rows at a time; for very large files use
+        the import_settlements command on the server instead.
+        """
+        if request.user.role!='admin':
+            return Response({"error":"only admins can import settlements"},status=status.HTTP_403_FORBIDDEN)
+        serializer=self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload=serializer.validated_data['file']
+        format=serializer.validated_data.get('format') or format_of(upload.name)
+        file=io.TextIOWrapper(upload.file,encoding='utf-8-sig',newline='')
         try:
-            response = requests.get(url, params=params)
-            resp_data = response.json()
-            status_value = resp_data.get('status', '').upper()
-
-            if status_value == 'COMPLETE':
-                payment.status = 'completed'
-                payment.gateway_transaction_id = resp_data.get('ref_id') or transaction_code 
-                payment.raw_json = resp_data
-                payment.save()
-
-                payment.order.status = 'processing'
-                payment.order.save()
-
-                return Response(
-                    {"status": "Payment Verified"},
-                    status=status.HTTP_200_OK
-                )
-
-            elif status_value in ['CANCELED','USER_CANCELED','FAILED','EXPIRED','ABANDONED']:
-                payment.status = 'failed'
-                payment.gateway_transaction_id = resp_data.get('ref_id') or transaction_code 
-                payment.raw_json = resp_data
-                payment.save()
-
-                payment.order.status = 'canceled'
-                payment.order.save()
-
-                return Response(
-                    {"status": "Payment Failed"},
-                    status=status.HTTP_200_OK
-                )
-            
-            elif status_value == 'PENDING':
-           
-                return Response(
-                    {"error": "Payment is still processing. Please try again in a moment."},
-                    status=status.HTTP_202_ACCEPTED
-                )
-            
-            elif status_value == 'NOT_FOUND':
-                if DEV_MODE:
-                    # In development mode, auto-approve NOT_FOUND transactions for testing
-                    print(f" DEV_MODE: Auto-approving NOT_FOUND transaction {transaction_uuid}")
-                    payment.status = 'completed'
-                    payment.gateway_transaction_id = f"DEV_{transaction_code}"
-                    payment.raw_json = {"dev_mode": True, "original_response": resp_data}
-                    payment.save()
-
-                    payment.order.status = 'processing'
-                    payment.order.save()
-
-                    return Response(
-                        {
-                            "status": "Payment Verified",
-                            "dev_mode": True,
-                            "message": "Development mode: Payment auto-approved"
-                        },
-                        status=status.HTTP_200_OK
-                    )
-                else:
-                    return Response(
-                        {
-                            "error": "Transaction not found",
-                            "details": "This transaction was not found in eSewa's system. This can happen if: 1) The payment was not completed, 2) Using test credentials with real transactions, or 3) The transaction is too old.",
-                            "transaction_uuid": transaction_uuid
-                        },
-                        status=status.HTTP_404_NOT_FOUND
-                    )
-            
-            else:
-                
-                return Response(
-                    {
-                        "error": "Verification Failed",
-                        "details": f"Unexpected status: {status_value}",
-                        "esewa_response": resp_data
-                    },
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-        except Exception as e:
-            return Response(
-                {"error": str(e)},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
-        
+            summary=summarise(import_settlements(read_rows(file,format)))
+        except (ValueError,csv.Error) as e:
+            return Response({"error":f"could not read the settlement file: {e}; rows before it were imported"},status=status.HTTP_400_BAD_REQUEST)
+        finally:
+            file.detach()
+        return Response(summary,status=status.HTTP_200_OK)
 
+    @action(
+        detail=False,
+        methods=['post'],
+        url_path='webhook/(?P<gateway>esewa|khalti)',
+        authentication_classes=[],
+        permission_classes=[AllowAny]
+    )
+    def webhook(self, request, gateway):
+        """
+        Server-to-server callbacks from eSewa/Khalti. The signature is
+        checked and the event stored; process_gateway_events settles it.
+        """
+        try:
+            receive(gateway,request.body,request.headers)
+        except InvalidEvent as e:
+            return Response({"error":str(e)},status=status.HTTP_400_BAD_REQUEST)
+        return Response({"status":"received"},status=status.HTTP_200_OK)
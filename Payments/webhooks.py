@@ -0,0 +1,158 @@
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from Payments import settlements
+from Payments.models import GatewayEvent
+from Payments.reconcile import apply_results, callback_status, match_callbacks
+
+# unset refuses the gateway's callbacks; never eSewa's public test key,
+# which anyone can read in the checkout page
+ESEWA_SECRET_KEY=getattr(settings,'ESEWA_SECRET_KEY','')
+# shared with whatever relays Khalti's callbacks
+KHALTI_WEBHOOK_SECRET=getattr(settings,'KHALTI_WEBHOOK_SECRET','')
+BATCH=getattr(settings,'GATEWAY_EVENT_BATCH_SIZE',500)
+
+FINAL=('completed','failed')
+
+
+class InvalidEvent(Exception):
+    """The request is not a gateway event we can trust."""
+
+
+def _sign(secret, message):
+    return hmac.new(secret.encode(),message,hashlib.sha256).digest()
+
+
+def _payload(body):
+    try:
+        payload=json.loads(body)
+    except ValueError:
+        raise InvalidEvent('body is not JSON')
+    if not isinstance(payload,dict):
+        raise InvalidEvent('body is not a JSON object')
+    return payload
+
+
+def _esewa(body, headers):
+    """
+    eSewa sends the payload it redirects the customer with, as JSON or as
+    base64 JSON under `data`. `signature` is a base64 HMAC-SHA256 over
+    "field=value,..." for the fields named in `signed_field_names`.
+    """
+    if not ESEWA_SECRET_KEY:
+        raise InvalidEvent('eSewa callbacks are not configured')
+    payload=_payload(body)
+    if 'data' in payload:
+        try:
+            payload=_payload(base64.b64decode(payload['data'],validate=True))
+        except (binascii.Error,TypeError):
+            raise InvalidEvent('data is not base64')
+    fields=str(payload.get('signed_field_names','')).split(',')
+    if not all(field in payload for field in fields):
+        raise InvalidEvent('signed fields are missing')
+    message=','.join(f'{field}={payload[field]}' for field in fields).encode()
+    expected=base64.b64encode(_sign(ESEWA_SECRET_KEY,message)).decode()
+    if not hmac.compare_digest(expected,str(payload.get('signature',''))):
+        raise InvalidEvent('bad signature')
+    if not {'transaction_uuid','status','total_amount'}<=set(fields):
+        raise InvalidEvent('transaction_uuid, status and total_amount must be signed')
+    key=payload.get('transaction_code') or payload['transaction_uuid']
+    return f"{key}:{payload['status']}",payload
+
+
+def _khalti(body, headers):
+    """The raw body signed with KHALTI_WEBHOOK_SECRET, hex HMAC-SHA256 in X-Khalti-Signature."""
+    if not KHALTI_WEBHOOK_SECRET:
+        raise InvalidEvent('Khalti callbacks are not configured')
+    expected=_sign(KHALTI_WEBHOOK_SECRET,body).hex()
+    if not hmac.compare_digest(expected,headers.get('X-Khalti-Signature','')):
+        raise InvalidEvent('bad signature')
+    payload=_payload(body)
+    if not payload.get('pidx'):
+        raise InvalidEvent('pidx is missing')
+    return str(payload.get('event_id') or f"{payload['pidx']}:{payload.get('status')}"),payload
+
+
+VERIFIERS={'esewa':_esewa,'khalti':_khalti}
+
+
+def receive(gateway, body, headers):
+    """
+    Check a webhook call is really from `gateway` and store it for
+    process_events; one INSERT, nothing else, so the gateway gets its answer
+    straight away. A redelivered event is dropped by the (gateway, event_id)
+    unique key. Raises InvalidEvent.
+    """
+    event_id,payload=VERIFIERS[gateway](body,headers)
+    if len(event_id)>200:
+        raise InvalidEvent('event id is too long')
+    GatewayEvent.objects.bulk_create(
+        [GatewayEvent(gateway=gateway,event_id=event_id,payload=payload)],ignore_conflicts=True
+    )
+
+
+def as_callback(event):
+    callback=settlements.as_callback(event.payload)
+    if event.gateway=='khalti' and callback['amount'] is not None:
+        # Khalti amounts are in paisa
+        callback['amount']/=100
+    return callback
+
+
+def process_events(batch_size=BATCH):
+    """
+    Settle up to `batch_size` stored events, oldest first. Events are
+    grouped by the payment they are about and each payment gets one answer:
+    its first completed/failed event in arrival order, else its latest one;
+    the rest are marked superseded. A completion that doesn't say how much
+    was paid counts as an amount mismatch. Claimed with SKIP LOCKED and
+    settled in the same transaction, so workers can share the queue and a
+    crash just leaves the batch for the next run. Returns how many events
+    were handled.
+    """
+    with transaction.atomic():
+        events=list(
+            GatewayEvent.objects.filter(processed_at__isnull=True)
+            .order_by('id').select_for_update(skip_locked=True)[:batch_size]
+        )
+        if not events:
+            return 0
+        callbacks=[as_callback(event) for event in events]
+        found=match_callbacks(callbacks)
+        chosen={}
+        for i,payment in enumerate(found):
+            if payment is None:
+                continue
+            current=chosen.get(payment.id)
+            if current is None or callbacks[current]['status'] not in FINAL:
+                chosen[payment.id]=i
+        answers=[(found[i],callback_status(callbacks[i])) for i in chosen.values()]
+        outcomes=apply_results(answers,require_amount=True) if answers else {}
+        now=timezone.now()
+        for i,(event,payment) in enumerate(zip(events,found)):
+            event.processed_at=now
+            event.payment=payment
+            if payment is None:
+                event.outcome='unknown payment'
+            elif chosen[payment.id]==i:
+                event.outcome=outcomes[payment.id]
+            else:
+                event.outcome='superseded'
+        GatewayEvent.objects.bulk_update(events,['processed_at','payment','outcome'],batch_size=500)
+    return len(events)
+
+
+def process_all(batch_size=BATCH):
+    """Work through every stored event. Returns how many were handled."""
+    handled=0
+    while True:
+        count=process_events(batch_size)
+        handled+=count
+        if count<batch_size:
+            return handled
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class ProductsConfig(AppConfig):
     name = 'Products'
+
+    def ready(self):
+        from Products import signals  # noqa: F401
@@ -0,0 +1,58 @@
+from Products.models import Category, CategoryClosure
+from EMarket.cache import ProcessCache
+
+
+def link_category(category):
+    """Add closure rows for a freshly created category."""
+    rows=[CategoryClosure(ancestor_id=category.pk,descendant_id=category.pk,depth=0)]
+    if category.parent_id:
+        rows+=[
+            CategoryClosure(ancestor_id=ancestor_id,descendant_id=category.pk,depth=depth+1)
+            for ancestor_id,depth in CategoryClosure.objects.filter(
+                descendant_id=category.parent_id
+            ).values_list('ancestor_id','depth')
+        ]
+    CategoryClosure.objects.bulk_create(rows)
+
+
+def move_category(category):
+    """Re-hang the subtree under `category` after its parent changed."""
+    subtree=list(CategoryClosure.objects.filter(ancestor_id=category.pk).values_list('descendant_id','depth'))
+    subtree_ids=[pk for pk,_ in subtree]
+    CategoryClosure.objects.filter(descendant_id__in=subtree_ids).exclude(ancestor_id__in=subtree_ids).delete()
+    if category.parent_id:
+        ancestors=CategoryClosure.objects.filter(descendant_id=category.parent_id).values_list('ancestor_id','depth')
+        CategoryClosure.objects.bulk_create([
+            CategoryClosure(ancestor_id=ancestor_id,descendant_id=pk,depth=up+down+1)
+            for ancestor_id,up in ancestors
+            for pk,down in subtree
+        ])
+
+
+def descendant_ids(category_ids):
+    """Subquery of every category at or below `category_ids`."""
+    return CategoryClosure.objects.filter(ancestor_id__in=category_ids).values('descendant_id')
+
+
+def ancestors(category):
+    return Category.objects.filter(descendant_links__descendant=category).order_by('-descendant_links__depth')
+
+
+def _load_tree():
+    from Products.serializers import CategorySerializer
+
+    categories=Category.objects.select_related('parent','created_by').order_by('name','id')
+    flat=CategorySerializer(categories,many=True).data
+    nodes={}
+    roots=[]
+    for category,data in zip(categories,flat):
+        nodes[category.pk]=dict(data,children=[])
+    for category in categories:
+        if category.parent_id in nodes:
+            nodes[category.parent_id]['children'].append(nodes[category.pk])
+        else:
+            roots.append(nodes[category.pk])
+    return {'flat':list(flat),'nested':roots}
+
+
+category_tree=ProcessCache('category-tree',_load_tree)
@@ -0,0 +1,148 @@
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Count, Exists, Max, Min, OuterRef, Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from Products.categories import descendant_ids
+from Products.models import Category, ProductSKU, SKUAtrribute
+
+
+class ProductFacetFilter(BaseFilterBackend):
+    """
+    Server side catalog filters:
+
+        ?category=<id or name>      the category and everything below it
+        ?min_price=&max_price=      base price or any SKU price in range
+        ?attribute=Color:Red        repeatable, values of one attribute are
+                                    OR'ed, different attributes must all be
+                                    on the same SKU
+        ?in_stock=true              product or one of its SKUs has stock
+        ?seller=<id or username>    listed by that seller
+
+    `facets()` returns the counts for each filter dimension with every other
+    active filter applied, which is what a sidebar needs to show how many
+    results picking a value would give.
+    """
+
+    def parse(self, request):
+        params=request.query_params
+        filters={}
+
+        category=params.get('category')
+        if category:
+            if category.isdigit():
+                roots=[int(category)]
+            else:
+                roots=Category.objects.filter(name=category).values('id')
+            filters['category']=descendant_ids(roots)
+
+        for key in ('min_price','max_price'):
+            if params.get(key):
+                try:
+                    filters[key]=Decimal(params[key])
+                except InvalidOperation:
+                    raise ValidationError({key:'must be a number'})
+
+        attributes=defaultdict(set)
+        for pair in params.getlist('attribute'):
+            attribute,sep,value=pair.partition(':')
+            if not sep or not attribute or not value:
+                raise ValidationError({'attribute':'use attribute=<name>:<value>'})
+            attributes[attribute].add(value)
+        if attributes:
+            filters['attribute']=dict(attributes)
+
+        if params.get('in_stock','').lower() in ('1','true','yes'):
+            filters['in_stock']=True
+
+        seller=params.get('seller')
+        if seller:
+            filters['seller']=Q(created_by_id=seller) if seller.isdigit() else Q(created_by__username=seller)
+        return filters
+
+    def apply(self, queryset, filters, exclude=()):
+        if 'category' in filters and 'category' not in exclude:
+            queryset=queryset.filter(category_id__in=filters['category'])
+
+        price_range={}
+        if 'min_price' in filters and 'price' not in exclude:
+            price_range['gte']=filters['min_price']
+        if 'max_price' in filters and 'price' not in exclude:
+            price_range['lte']=filters['max_price']
+        if price_range:
+            base=Q(**{f'base_price__{op}':value for op,value in price_range.items()})
+            sku=ProductSKU.objects.filter(
+                product=OuterRef('pk'),
+                **{f'price__{op}':value for op,value in price_range.items()}
+            )
+            queryset=queryset.filter(base|Q(Exists(sku)))
+
+        attributes={
+            name:values for name,values in filters.get('attribute',{}).items()
+            if f'attribute:{name}' not in exclude
+        }
+        if attributes:
+            skus=ProductSKU.objects.filter(product=OuterRef('pk'))
+            for name,values in attributes.items():
+                skus=skus.filter(Exists(SKUAtrribute.objects.filter(
+                    sku=OuterRef('pk'),attribute=name,value__in=values
+                )))
+            queryset=queryset.filter(Exists(skus))
+
+        if filters.get('in_stock') and 'in_stock' not in exclude:
+            stocked=ProductSKU.objects.filter(product=OuterRef('pk'),stock__gt=0)
+            queryset=queryset.filter(Q(stock__gt=0)|Q(Exists(stocked)))
+
+        if 'seller' in filters:
+            queryset=queryset.filter(filters['seller'])
+        return queryset
+
+    def filter_queryset(self, request, queryset, view):
+        return self.apply(queryset,self.parse(request))
+
+    def facets(self, request, queryset):
+        filters=self.parse(request)
+        selected=filters.get('attribute',{})
+
+        categories=(
+            self.apply(queryset,filters,exclude=('category',))
+            .order_by().values('category','category__name')
+            .annotate(count=Count('pk'))
+        )
+
+        attributes=defaultdict(dict)
+
+        def count_values(product_qs, names=None, exclude_names=()):
+            rows=SKUAtrribute.objects.filter(sku__product__in=product_qs.order_by().values('pk'))
+            if names is not None:
+                rows=rows.filter(attribute__in=names)
+            if exclude_names:
+                rows=rows.exclude(attribute__in=exclude_names)
+            rows=rows.values('attribute','value').annotate(count=Count('sku__product',distinct=True))
+            for row in rows:
+                attributes[row['attribute']][row['value']]=row['count']
+
+        # attributes nobody picked yet are counted against the full filter set,
+        # each picked one against everything except its own selection
+        count_values(self.apply(queryset,filters),exclude_names=list(selected))
+        for name in selected:
+            count_values(self.apply(queryset,filters,exclude=(f'attribute:{name}',)),names=[name])
+
+        without_stock=self.apply(queryset,filters,exclude=('in_stock',))
+        in_stock=self.apply(without_stock,{'in_stock':True}).count()
+
+        prices=self.apply(queryset,filters,exclude=('price',)).aggregate(
+            min_price=Min('base_price'),max_price=Max('base_price')
+        )
+
+        return {
+            'category':[
+                {'id':row['category'],'name':row['category__name'],'count':row['count']}
+                for row in categories
+            ],
+            'attribute':{name:values for name,values in attributes.items()},
+            'in_stock':in_stock,
+            'price':prices,
+        }
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from Products.models import Product
+from Products.search import reindex_products, vocabulary
+
+
+class Command(BaseCommand):
+    help='Rebuild the product search index from scratch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size',type=int,default=500)
+
+    def handle(self, *args, **options):
+        batch_size=options['batch_size']
+        ids=list(Product.objects.order_by('pk').values_list('pk',flat=True))
+        for start in range(0,len(ids),batch_size):
+            reindex_products(ids[start:start+batch_size])
+        vocabulary.clear()
+        self.stdout.write(self.style.SUCCESS(f'indexed {len(ids)} products'))
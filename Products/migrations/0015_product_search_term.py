@@ -0,0 +1,27 @@
+# Generated by Django 6.0.1 on 2026-10-18 03:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Products', '0014_product_rating_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=40)),
+                ('weight', models.FloatField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='Products.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term'], name='product_search_term_idx', opclasses=['varchar_pattern_ops'])],
+                'unique_together': {('product', 'term')},
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 6.0.1 on 2026-10-18 03:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Products', '0015_product_search_term'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='productsku',
+            index=models.Index(fields=['product', 'price'], name='Products_pr_product_1d04b0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productsku',
+            index=models.Index(fields=['product', 'stock'], name='Products_pr_product_4b073b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='skuatrribute',
+            index=models.Index(fields=['attribute', 'value'], name='Products_sk_attribu_3ccc3b_idx'),
+        ),
+    ]
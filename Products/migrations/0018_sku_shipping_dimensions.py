@@ -0,0 +1,33 @@
+# Generated by Django 6.0.1 on 2026-10-18 03:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Products', '0017_category_closure'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productsku',
+            name='height',
+            field=models.DecimalField(decimal_places=1, default=0, max_digits=7),
+        ),
+        migrations.AddField(
+            model_name='productsku',
+            name='length',
+            field=models.DecimalField(decimal_places=1, default=0, max_digits=7),
+        ),
+        migrations.AddField(
+            model_name='productsku',
+            name='weight',
+            field=models.DecimalField(decimal_places=3, default=0, max_digits=8),
+        ),
+        migrations.AddField(
+            model_name='productsku',
+            name='width',
+            field=models.DecimalField(decimal_places=1, default=0, max_digits=7),
+        ),
+    ]
@@ -27,6 +27,19 @@ class Product(models.Model):
     image=models.ImageField(upload_to='Products/',blank=True,null=True)
     is_active=models.BooleanField(default=True) 
     created_at=models.DateTimeField(default=timezone.now)
+    # kept in step with Reviews.Review by Reviews.signals
+    rating_sum=models.PositiveIntegerField(default=0)
+    review_count=models.PositiveIntegerField(default=0)
+    avg_rating=models.FloatField(default=0)
+
+    class Meta:
+        indexes=[
+            models.Index(fields=['base_price','id']),
+            models.Index(fields=['created_at','id']),
+            models.Index(fields=['stock','id']),
+            models.Index(fields=['name','id']),
+            models.Index(fields=['avg_rating','id']),
+        ]
 
     def __str__(self):
         return self.name
@@ -48,6 +61,16 @@ class ProductSKU(models.Model):
     price=models.DecimalField(decimal_places=2,max_digits=10)
     stock=models.PositiveIntegerField(default=0) 
     image=models.ImageField(upload_to='ProductSKU/',blank=True,null=True)
+    # shipping: kg and cm per unit
+    weight=models.DecimalField(max_digits=8,decimal_places=3,default=0)
+    length=models.DecimalField(max_digits=7,decimal_places=1,default=0)
+    width=models.DecimalField(max_digits=7,decimal_places=1,default=0)
+    height=models.DecimalField(max_digits=7,decimal_places=1,default=0)
+    class Meta:
+        indexes=[
+            models.Index(fields=['product','price']),
+            models.Index(fields=['product','stock']),
+        ]
 
 
     def __str__(self):
@@ -61,6 +84,9 @@ class SKUAtrribute(models.Model):
     value=models.CharField(max_length=20)
     class Meta:
         unique_together=('sku','attribute')
+        indexes=[
+            models.Index(fields=['attribute','value']),
+        ]
     
     def __str__(self):
         return f"{self.attribute}:{self.value}"
@@ -68,3 +94,31 @@ class SKUAtrribute(models.Model):
 
 
 
+
+class ProductSearchTerm(models.Model):
+    product=models.ForeignKey(Product,on_delete=models.CASCADE,related_name='search_terms')
+    term=models.CharField(max_length=40)
+    weight=models.FloatField()
+    class Meta:
+        unique_together=('product','term')
+        indexes=[
+            models.Index(fields=['term'],name='product_search_term_idx',opclasses=['varchar_pattern_ops']),
+        ]
+
+    def __str__(self):
+        return f"{self.term}:{self.weight}"
+
+class CategoryClosure(models.Model):
+    # one row per (ancestor, descendant) pair including each category with
+    # itself at depth 0, maintained by Products.signals
+    ancestor=models.ForeignKey(Category,on_delete=models.CASCADE,related_name='descendant_links')
+    descendant=models.ForeignKey(Category,on_delete=models.CASCADE,related_name='ancestor_links')
+    depth=models.PositiveIntegerField()
+    class Meta:
+        unique_together=('ancestor','descendant')
+        indexes=[
+            models.Index(fields=['descendant','depth']),
+        ]
+
+    def __str__(self):
+        return f"{self.ancestor_id}>{self.descendant_id} ({self.depth})"
@@ -0,0 +1,203 @@
+import re
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, Q, Sum, Value, When
+from rest_framework.filters import BaseFilterBackend
+
+from EMarket.batching import CommitBatch
+from Products.models import Product, ProductSearchTerm
+
+# how much a hit in each part of a product counts towards its rank
+NAME_WEIGHT=1.0
+CATEGORY_WEIGHT=0.6
+ATTRIBUTE_WEIGHT=0.4
+DESCRIPTION_WEIGHT=0.2
+
+EXACT_FACTOR=1.0
+PREFIX_FACTOR=0.6
+TYPO_FACTOR=0.4
+
+MAX_QUERY_TOKENS=8
+TOKEN_RE=re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text):
+    if not text:
+        return []
+    text=unicodedata.normalize('NFKD',str(text)).encode('ascii','ignore').decode('ascii')
+    return TOKEN_RE.findall(text.lower())
+
+
+def product_terms(product):
+    """Return {term: weight} for everything searchable about `product`."""
+    weights=defaultdict(float)
+
+    def add(text, weight):
+        for term in tokenize(text):
+            term=term[:ProductSearchTerm._meta.get_field('term').max_length]
+            weights[term]=max(weights[term],weight)
+
+    add(product.description,DESCRIPTION_WEIGHT)
+    for spec in product.specs.all():
+        add(spec.attribute,ATTRIBUTE_WEIGHT)
+        add(spec.value,ATTRIBUTE_WEIGHT)
+    for sku in product.skus.all():
+        for attr in sku.sku_attribute.all():
+            add(attr.attribute,ATTRIBUTE_WEIGHT)
+            add(attr.value,ATTRIBUTE_WEIGHT)
+    category=product.category
+    if category is not None:
+        add(category.name,CATEGORY_WEIGHT)
+        if category.parent is not None:
+            add(category.parent.name,CATEGORY_WEIGHT)
+    add(product.name,NAME_WEIGHT)
+    return weights
+
+
+class Vocabulary:
+    """
+    In-process index over the distinct indexed terms used for typo tolerance.
+    Every term is filed under itself and each single-character deletion of
+    it, so two words within one edit of each other always share a key and a
+    lookup is a handful of dict hits rather than a scan. Reloaded from the
+    database every `ttl` seconds so terms indexed by other workers show up.
+    """
+    ttl=300
+    min_length=4
+
+    def __init__(self):
+        self._lock=threading.Lock()
+        self._keys=None
+        self._loaded_at=0
+
+    @staticmethod
+    def _variants(term):
+        yield term
+        for i in range(len(term)):
+            yield term[:i]+term[i+1:]
+
+    def _add(self, keys, term):
+        if len(term)>=self.min_length:
+            for variant in self._variants(term):
+                keys[variant].add(term)
+
+    def _ensure_loaded(self):
+        if self._keys is not None and time.monotonic()-self._loaded_at<self.ttl:
+            return self._keys
+        keys=defaultdict(set)
+        for term in ProductSearchTerm.objects.values_list('term',flat=True).distinct().iterator():
+            self._add(keys,term)
+        with self._lock:
+            self._keys=keys
+            self._loaded_at=time.monotonic()
+        return keys
+
+    def add(self, terms):
+        with self._lock:
+            if self._keys is not None:
+                for term in terms:
+                    self._add(self._keys,term)
+
+    def similar(self, token):
+        if len(token)<self.min_length:
+            return set()
+        keys=self._ensure_loaded()
+        found=set()
+        for variant in self._variants(token):
+            found|=keys.get(variant,set())
+        found.discard(token)
+        return found
+
+    def clear(self):
+        with self._lock:
+            self._keys=None
+
+
+vocabulary=Vocabulary()
+
+
+def reindex_products(product_ids):
+    products=(
+        Product.objects.filter(pk__in=list(product_ids))
+        .select_related('category__parent')
+        .prefetch_related('specs','skus__sku_attribute')
+    )
+    rows=[]
+    for product in products:
+        for term,weight in product_terms(product).items():
+            rows.append(ProductSearchTerm(product=product,term=term,weight=weight))
+    with transaction.atomic():
+        ProductSearchTerm.objects.filter(product_id__in=list(product_ids)).delete()
+        ProductSearchTerm.objects.bulk_create(rows,batch_size=1000)
+    vocabulary.add({row.term for row in rows})
+
+
+_pending=CommitBatch(reindex_products)
+
+
+def schedule_reindex(product_id):
+    """
+    Reindex a product once the current transaction commits. Changes to a
+    product and all its specs/SKUs inside one transaction collapse into a
+    single reindex.
+    """
+    _pending.add([product_id])
+
+
+def search_products(queryset, query):
+    """
+    Restrict `queryset` to products matching every word of `query` (exactly,
+    as a prefix, or within one typo) and annotate `search_rank`.
+    """
+    tokens=list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TOKENS]
+    # a word that prefixes another is implied by it
+    tokens=[t for t in tokens if not any(o!=t and o.startswith(t) for o in tokens)]
+    if not tokens:
+        return queryset
+
+    matched=Q()
+    rank=[]
+    hit=[]
+    for index,token in enumerate(tokens):
+        similar=vocabulary.similar(token)
+        condition=Q(search_terms__term__startswith=token)
+        if similar:
+            condition|=Q(search_terms__term__in=similar)
+        matched|=condition
+        rank.append(When(search_terms__term=token,then=F('search_terms__weight')*EXACT_FACTOR))
+        rank.append(When(search_terms__term__startswith=token,then=F('search_terms__weight')*PREFIX_FACTOR))
+        if similar:
+            rank.append(When(search_terms__term__in=similar,then=F('search_terms__weight')*TYPO_FACTOR))
+        hit.append(When(condition,then=Value(index)))
+
+    return (
+        queryset.filter(matched)
+        .annotate(
+            search_rank=Sum(Case(*rank,default=Value(0.0),output_field=FloatField())),
+            search_hits=Count(Case(*hit),distinct=True),
+        )
+        .filter(search_hits=len(tokens))
+    )
+
+
+class ProductSearchFilter(BaseFilterBackend):
+    """
+    `?search=` over the product search index. Results come back best match
+    first unless the client asked for an explicit `?ordering=`.
+    """
+    search_param='search'
+
+    def filter_queryset(self, request, queryset, view):
+        query=request.query_params.get(self.search_param,'').strip()
+        if not query:
+            return queryset
+        queryset=search_products(queryset,query)
+        if 'search_rank' not in queryset.query.annotations:
+            return queryset
+        if not request.query_params.get('ordering'):
+            queryset=queryset.order_by('-search_rank')
+        return queryset
@@ -1,6 +1,6 @@
 
 from rest_framework.serializers import ModelSerializer
-from Products.models import Category,Product,ProductSpecs,ProductSKU,SKUAtrribute
+from Products.models import Category,CategoryClosure,Product,ProductSpecs,ProductSKU,SKUAtrribute
 from rest_framework import serializers
 from django.db import transaction
 
@@ -19,6 +19,13 @@ class CategorySerializer(ModelSerializer):
     class Meta:
         model=Category
         fields='__all__'
+
+    def validate_parent(self,parent):
+        if parent and self.instance and CategoryClosure.objects.filter(
+            ancestor=self.instance,descendant=parent
+        ).exists():
+            raise serializers.ValidationError('a category cannot be moved under itself')
+        return parent
 class ProductSpecsSerializer(ModelSerializer):
     class Meta:
         model=ProductSpecs
@@ -34,7 +41,7 @@ class ProductSKUSerializer(ModelSerializer):
     sku_attribute=SKUAttributeSerializer(many=True,required=False)
     class Meta:
         model=ProductSKU
-        fields=['id','sku_code', 'price', 'stock' ,'image','sku_attribute']
+        fields=['id','sku_code', 'price', 'stock' ,'image','weight','length','width','height','sku_attribute']
         extra_kwargs = {
             'sku_code': {'validators': []}  
         }
@@ -57,6 +64,7 @@ class ProductSerializer(ModelSerializer):
        read_only_fields=['created_by']
        
     
+    @transaction.atomic
     def create (self,validated_data):
         specs_data=validated_data.pop('specs',[])
         skus_data=validated_data.pop('skus',[])
@@ -71,6 +79,7 @@ class ProductSerializer(ModelSerializer):
                SKUAtrribute.objects.create(sku=sku_obj, **attr)
         return product
     
+    @transaction.atomic
     def update(self, instance, validated_data):
         specs_data = validated_data.pop('specs', None)
         skus_data = validated_data.pop('skus', None)
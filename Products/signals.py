@@ -0,0 +1,63 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from Products.models import Category, Product, ProductSKU, ProductSpecs, SKUAtrribute
+from Products.search import schedule_reindex
+from Products.categories import category_tree, descendant_ids, link_category, move_category
+
+
+@receiver(post_save,sender=Product)
+def reindex_product(sender, instance, **kwargs):
+    schedule_reindex(instance.pk)
+
+
+@receiver(post_save,sender=ProductSpecs)
+@receiver(post_delete,sender=ProductSpecs)
+@receiver(post_save,sender=ProductSKU)
+@receiver(post_delete,sender=ProductSKU)
+def reindex_product_children(sender, instance, **kwargs):
+    schedule_reindex(instance.product_id)
+
+
+@receiver(post_save,sender=SKUAtrribute)
+@receiver(post_delete,sender=SKUAtrribute)
+def reindex_sku_product(sender, instance, **kwargs):
+    if SKUAtrribute.sku.is_cached(instance):
+        product_id=instance.sku.product_id
+    else:
+        product_id=ProductSKU.objects.filter(pk=instance.sku_id).values_list('product_id',flat=True).first()
+    if product_id:
+        schedule_reindex(product_id)
+
+
+@receiver(pre_save,sender=Category)
+def remember_parent(sender, instance, **kwargs):
+    if instance.pk is None or instance._state.adding:
+        instance._previous_parent_id=None
+        return
+    instance._previous_parent_id=(
+        Category.objects.filter(pk=instance.pk).values_list('parent_id',flat=True).first()
+    )
+
+
+@receiver(post_save,sender=Category)
+def update_category_tree(sender, instance, created, **kwargs):
+    if created:
+        link_category(instance)
+    elif instance.parent_id!=getattr(instance,'_previous_parent_id',instance.parent_id):
+        move_category(instance)
+    category_tree.invalidate()
+
+
+@receiver(post_delete,sender=Category)
+def drop_category(sender, instance, **kwargs):
+    category_tree.invalidate()
+
+
+@receiver(post_save,sender=Category)
+def reindex_category_products(sender, instance, created, **kwargs):
+    if created:
+        return
+    for product_id in Product.objects.filter(
+        category_id__in=descendant_ids([instance.pk])
+    ).values_list('pk',flat=True).iterator():
+        schedule_reindex(product_id)
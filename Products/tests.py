@@ -1,8 +1,11 @@
+from django.db.models import Case, F, When
 from django.test import TestCase
-from rest_framework.test import APITestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
 from django.contrib.auth import get_user_model
-from Products.models import Category, Product, ProductSKU
+from Products.models import Category, Product, ProductSKU, ProductSpecs, SKUAtrribute
 from rest_framework import status
+from EMarket.pagination import KeysetCursorPagination
 
 User = get_user_model()
 
@@ -85,3 +88,281 @@ class ProductUpdateTest(APITestCase):
         self.assertEqual(sku.sku_code, "SKU123")
         self.assertEqual(sku.price, 150.00)
         self.assertEqual(sku.stock, 20)
+
+
+class ProductCursorPaginationTest(APITestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller', password='password123', role='seller')
+        self.category = Category.objects.create(name='Electronics')
+        # lots of ties on base_price so the pk tie breaker has to do the work
+        for i in range(25):
+            Product.objects.create(
+                name=f'Product {i}',
+                description='desc',
+                base_price=(i % 3) * 10,
+                category=self.category,
+                created_by=self.seller,
+            )
+
+    def walk(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_pages_cover_every_product_once_on_ties(self):
+        ids = self.walk('/product/?ordering=base_price&page_size=4')
+        self.assertEqual(len(ids), 25)
+        self.assertEqual(len(set(ids)), 25)
+        expected = list(Product.objects.order_by('base_price', 'id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_rating_ordering_covers_every_product(self):
+        ids = self.walk('/product/?ordering=-avg_rating&page_size=7')
+        self.assertEqual(sorted(ids), sorted(Product.objects.values_list('id', flat=True)))
+
+    def test_pages_across_null_sort_keys_both_ways(self):
+        # products priced 0 get a NULL key; they sort last both ways
+        queryset = Product.objects.annotate(
+            key=Case(When(base_price__gt=0, then=F('base_price')))
+        ).order_by('-key')
+        expected = list(queryset.order_by(F('key').desc(nulls_last=True), '-pk').values_list('id', flat=True))
+        self.assertEqual(queryset.filter(key__isnull=True).count(), 9)
+
+        def page(url):
+            paginator = KeysetCursorPagination()
+            rows = paginator.paginate_queryset(queryset, Request(APIRequestFactory().get(url)))
+            return [row.id for row in rows], paginator.get_next_link(), paginator.get_previous_link()
+
+        forward, url = [], '/product/?page_size=3'
+        while url:
+            ids, url, previous = page(url)
+            forward.extend(ids)
+        self.assertEqual(forward, expected)
+
+        # and back from the last page through the previous links
+        backward, url = ids, previous
+        while url:
+            ids, _, url = page(url)
+            backward = ids + backward
+        self.assertEqual(backward, expected)
+
+    def test_previous_link_returns_same_page(self):
+        first = self.client.get('/product/?ordering=-created_at&page_size=5')
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(
+            [item['id'] for item in back.data['results']],
+            [item['id'] for item in first.data['results']],
+        )
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/product/?cursor=garbage')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ProductListQueryCountTest(APITestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller', password='password123', role='seller')
+        parent = Category.objects.create(name='Electronics')
+        self.category = Category.objects.create(name='Phones', parent=parent)
+        for i in range(12):
+            product = Product.objects.create(
+                name=f'Phone {i}',
+                description='desc',
+                base_price=100,
+                category=self.category,
+                created_by=self.seller,
+            )
+            ProductSpecs.objects.create(product=product, attribute='RAM', value='8GB')
+            for j in range(2):
+                sku = ProductSKU.objects.create(product=product, sku_code=f'P{i}-{j}', price=100, stock=5)
+                SKUAtrribute.objects.create(sku=sku, attribute='Color', value='Black')
+
+    def test_list_query_count_does_not_grow_with_page_size(self):
+        # products, skus, sku attributes, specs
+        with self.assertNumQueries(4):
+            small = self.client.get('/product/?page_size=2')
+        with self.assertNumQueries(4):
+            large = self.client.get('/product/?page_size=12')
+        self.assertEqual(len(small.data['results']), 2)
+        self.assertEqual(len(large.data['results']), 12)
+        self.assertEqual(large.data['results'][0]['parent_category'], 'Electronics')
+
+
+class ProductRatingTotalsTest(APITestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name='Books')
+        self.product = Product.objects.create(name='Novel', description='desc', base_price=10, category=self.category)
+        self.users = [User.objects.create_user(username=f'reader{i}', password='password123') for i in range(3)]
+
+    def test_totals_follow_review_changes(self):
+        from Reviews.models import Review
+        from Reviews.ratings import rebuild_ratings
+
+        reviews = [Review.objects.create(product=self.product, user=user, rating=rating)
+                   for user, rating in zip(self.users, [5, 4, 3])]
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.rating_sum, self.product.review_count), (12, 3))
+        self.assertAlmostEqual(self.product.avg_rating, 4.0)
+
+        reviews[2].rating = 1
+        reviews[2].save()
+        reviews[0].delete()
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.rating_sum, self.product.review_count), (5, 2))
+        self.assertAlmostEqual(self.product.avg_rating, 2.5)
+
+        Product.objects.filter(pk=self.product.pk).update(rating_sum=0, review_count=0, avg_rating=0)
+        rebuild_ratings()
+        self.product.refresh_from_db()
+        self.assertAlmostEqual(self.product.avg_rating, 2.5)
+
+        Review.objects.all().delete()
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.rating_sum, self.product.review_count, self.product.avg_rating), (0, 0, 0))
+
+
+class ProductSearchTest(APITestCase):
+    def setUp(self):
+        from Products.search import vocabulary
+        vocabulary.clear()
+        self.seller = User.objects.create_user(username='seller', password='password123', role='seller')
+        self.client.force_authenticate(user=self.seller)
+        phones = Category.objects.create(name='Phones', parent=Category.objects.create(name='Electronics'))
+        Category.objects.create(name='Kitchen')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/product/', {
+                'name': 'Galaxy Phone',
+                'description': 'A fast android handset',
+                'base_price': '500.00',
+                'category': phones.name,
+                'specs': [{'attribute': 'Storage', 'value': '128GB'}],
+                'skus': [{'sku_code': 'GAL-1', 'price': '500.00', 'stock': 3,
+                          'sku_attribute': [{'attribute': 'Color', 'value': 'Midnight'}]}],
+            }, format='json')
+            self.client.post('/product/', {
+                'name': 'Phone Case',
+                'description': 'Protects your galaxy',
+                'base_price': '10.00',
+                'category': 'Kitchen',
+            }, format='json')
+        self.client.force_authenticate(user=None)
+
+    def names(self, query):
+        response = self.client.get('/product/', {'search': query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item['name'] for item in response.data['results']]
+
+    def test_name_match_ranks_above_description_match(self):
+        self.assertEqual(self.names('galaxy'), ['Galaxy Phone', 'Phone Case'])
+
+    def test_every_word_must_match(self):
+        self.assertEqual(self.names('phone case'), ['Phone Case'])
+
+    def test_prefix_typo_category_and_attribute_matches(self):
+        self.assertEqual(self.names('galax'), ['Galaxy Phone', 'Phone Case'])
+        self.assertEqual(self.names('glaxy'), ['Galaxy Phone', 'Phone Case'])
+        self.assertEqual(self.names('electronics'), ['Galaxy Phone'])
+        self.assertEqual(self.names('midnight 128gb'), ['Galaxy Phone'])
+
+
+class ProductFacetFilterTest(APITestCase):
+    def setUp(self):
+        electronics = Category.objects.create(name='Electronics')
+        phones = Category.objects.create(name='Phones', parent=electronics)
+        android = Category.objects.create(name='Android', parent=phones)
+        kitchen = Category.objects.create(name='Kitchen')
+
+        def product(name, category, price, skus):
+            item = Product.objects.create(name=name, description='desc', base_price=price, category=category)
+            for code, sku_price, stock, attrs in skus:
+                sku = ProductSKU.objects.create(product=item, sku_code=code, price=sku_price, stock=stock)
+                for attribute, value in attrs.items():
+                    SKUAtrribute.objects.create(sku=sku, attribute=attribute, value=value)
+            return item
+
+        product('Pixel', android, 600, [('PX-B', 600, 2, {'Color': 'Black', 'Size': 'M'}),
+                                        ('PX-W', 650, 0, {'Color': 'White', 'Size': 'L'})])
+        product('Flip', phones, 300, [('FL-R', 300, 0, {'Color': 'Red', 'Size': 'M'})])
+        product('Kettle', kitchen, 40, [('KT-W', 40, 5, {'Color': 'White'})])
+
+    def names(self, params):
+        response = self.client.get('/product/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return sorted(item['name'] for item in response.data['results'])
+
+    def test_category_includes_descendants(self):
+        self.assertEqual(self.names({'category': 'Electronics'}), ['Flip', 'Pixel'])
+
+    def test_price_stock_and_attributes(self):
+        self.assertEqual(self.names({'min_price': 620, 'max_price': 700}), ['Pixel'])
+        self.assertEqual(self.names({'in_stock': 'true'}), ['Kettle', 'Pixel'])
+        self.assertEqual(self.names({'attribute': ['Color:White', 'Color:Red']}), ['Flip', 'Kettle', 'Pixel'])
+        # both attributes have to be on the same SKU
+        self.assertEqual(self.names({'attribute': ['Color:White', 'Size:M']}), [])
+
+    def test_seller(self):
+        seller = User.objects.create_user(username='seller', password='password123', role='seller')
+        Product.objects.filter(name='Flip').update(created_by=seller)
+        self.assertEqual(self.names({'seller': seller.id}), ['Flip'])
+        self.assertEqual(self.names({'seller': 'seller'}), ['Flip'])
+
+    def test_facet_counts(self):
+        response = self.client.get('/product/facets/', {'category': 'Electronics', 'attribute': 'Color:Black'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['name'] for item in response.data['results']], ['Pixel'])
+        facets = response.data['facets']
+        self.assertEqual(facets['attribute']['Color'], {'Black': 1, 'White': 1, 'Red': 1})
+        self.assertEqual(facets['attribute']['Size'], {'M': 1, 'L': 1})
+        self.assertEqual(facets['in_stock'], 1)
+        self.assertEqual({item['name']: item['count'] for item in facets['category']}, {'Android': 1})
+
+
+class CategoryClosureTest(APITestCase):
+    def setUp(self):
+        self.root = Category.objects.create(name='Electronics')
+        self.phones = Category.objects.create(name='Phones', parent=self.root)
+        self.android = Category.objects.create(name='Android', parent=self.phones)
+        self.home = Category.objects.create(name='Home')
+
+    def test_descendants_follow_moves_and_deletes(self):
+        from Products.categories import ancestors, descendant_ids
+
+        def below(category):
+            return set(Category.objects.filter(id__in=descendant_ids([category.pk])).values_list('name', flat=True))
+
+        self.assertEqual(below(self.root), {'Electronics', 'Phones', 'Android'})
+        self.assertEqual([c.name for c in ancestors(self.android)], ['Electronics', 'Phones', 'Android'])
+
+        self.phones.parent = self.home
+        self.phones.save()
+        self.assertEqual(below(self.root), {'Electronics'})
+        self.assertEqual(below(self.home), {'Home', 'Phones', 'Android'})
+        self.assertEqual([c.name for c in ancestors(self.android)], ['Home', 'Phones', 'Android'])
+
+        self.phones.delete()
+        self.assertEqual(below(self.home), {'Home'})
+
+    def test_cannot_move_under_own_descendant(self):
+        admin = User.objects.create_user(username='admin', password='password123', role='admin')
+        self.client.force_authenticate(user=admin)
+        response = self.client.patch(f'/category/{self.root.id}/', {'parent': 'Android'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_tree_is_served_from_cache(self):
+        from Products.categories import category_tree
+        category_tree.invalidate()
+        self.client.get('/category/tree/')
+        # only the shared cache stamps are read
+        with self.assertNumQueries(1):
+            response = self.client.get('/category/tree/')
+        electronics = next(node for node in response.data if node['name'] == 'Electronics')
+        self.assertEqual(electronics['children'][0]['name'], 'Phones')
+        self.assertEqual(electronics['children'][0]['children'][0]['name'], 'Android')
+        with self.assertNumQueries(1):
+            response = self.client.get('/category/')
+        self.assertEqual(len(response.data), 4)
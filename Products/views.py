@@ -1,6 +1,5 @@
 from rest_framework.decorators import permission_classes
 from django.shortcuts import render
-from django.db.models import Avg,Count
 from  rest_framework import viewsets,permissions
 from Products.models import Product,Category
 from Products.serializers import ProductSerializer,CategorySerializer
@@ -12,16 +11,30 @@ from rest_framework.filters import OrderingFilter
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import status
+from EMarket.query_plan import plan_queryset
+from Products.search import ProductSearchFilter,search_products
+from Products.filters import ProductFacetFilter
+from Products.categories import category_tree
 
 
 # Create your views here.
 class CategoryViewSet(viewsets.ModelViewSet):
-    queryset=Category.objects.all()
     serializer_class=CategorySerializer
     authentication_classes=[JWTAuthentication]
 
+    def get_queryset(self):
+        return plan_queryset(Category.objects.all(),self.get_serializer_class())
+
+    def list(self, request, *args, **kwargs):
+        # the whole tree is small and cached in memory, no need to page it
+        return Response(category_tree.get()['flat'])
+
+    @action(detail=False,methods=['get'])
+    def tree(self,request):
+        return Response(category_tree.get()['nested'])
+
     def get_permissions(self):
-        if self.action in ['list','retrieve']:
+        if self.action in ['list','retrieve','tree']:
             return[AllowAny()]
         return[IsAuthenticated()]
     
@@ -34,19 +47,15 @@ class CategoryViewSet(viewsets.ModelViewSet):
 class ProductViewSet(viewsets.ModelViewSet):
     serializer_class=ProductSerializer
     authentication_classes=[JWTAuthentication]
-    filter_backends=[OrderingFilter]
+    filter_backends=[ProductFacetFilter,OrderingFilter,ProductSearchFilter]
     ordering_fields=['base_price','created_at','stock','name','avg_rating']
-    search_fields=['category','description','category__name']
     ordering=['-name']
 
   
 
     def get_queryset(self):
         user=self.request.user
-        queryset = Product.objects.annotate(
-            avg_rating=Avg('reviews__rating'),
-            review_count=Count('reviews')
-        )
+        queryset=plan_queryset(Product.objects.all(),self.get_serializer_class())
         if user.is_authenticated and user.role=='admin':
            return queryset
         
@@ -58,7 +67,7 @@ class ProductViewSet(viewsets.ModelViewSet):
 
 
     def get_permissions(self):
-        if self.action in ['list','retrieve'] :
+        if self.action in ['list','retrieve','facets'] :
             return [AllowAny()]
         if self.action=='create':
             return [IsSeller()]
@@ -70,6 +79,19 @@ class ProductViewSet(viewsets.ModelViewSet):
     def  perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
     
+    @action(detail=False,methods=['get'],permission_classes=[AllowAny])
+    def facets(self,request):
+        page=self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+        serializer=self.get_serializer(page,many=True)
+        response=self.get_paginated_response(serializer.data)
+
+        base=self.get_queryset().prefetch_related(None)
+        query=request.query_params.get('search','').strip()
+        if query:
+            base=base.filter(pk__in=search_products(base,query).values('pk'))
+        response.data['facets']=ProductFacetFilter().facets(request,base)
+        return response
+
     @action(detail=False,methods=['get'] , permission_classes=[AllowAny])
     def compare(self,request):
         ids_param=request.query_params.get('id')
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class ReviewsConfig(AppConfig):
     name = 'Reviews'
+
+    def ready(self):
+        from Reviews import signals  # noqa: F401
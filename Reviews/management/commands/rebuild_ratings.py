@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from Reviews.ratings import rebuild_ratings
+
+
+class Command(BaseCommand):
+    help='Recompute Product.rating_sum/review_count/avg_rating from the reviews table'
+
+    def handle(self, *args, **options):
+        updated=rebuild_ratings()
+        self.stdout.write(self.style.SUCCESS(f'rebuilt ratings for {updated} products'))
@@ -0,0 +1,34 @@
+# Generated by Django 6.0.1 on 2026-10-18 03:12
+
+from django.db import migrations
+from django.db.models import Avg, Count, FloatField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill(apps, schema_editor):
+    Product = apps.get_model('Products', 'Product')
+    Review = apps.get_model('Reviews', 'Review')
+
+    def stat(aggregate):
+        return Subquery(
+            Review.objects.filter(product=OuterRef('pk')).order_by()
+            .values('product').annotate(value=aggregate).values('value')[:1]
+        )
+
+    Product.objects.update(
+        rating_sum=Coalesce(stat(Sum('rating')), 0),
+        review_count=Coalesce(stat(Count('id')), 0),
+        avg_rating=Coalesce(stat(Avg('rating', output_field=FloatField())), Value(0.0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Reviews', '0001_initial'),
+        ('Products', '0014_product_rating_totals'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+from django.db.models import Avg, Case, Count, F, FloatField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce
+from Products.models import Product
+from Reviews.models import Review
+
+
+def apply_rating(product_id, rating, count):
+    """
+    Shift a product's stored rating totals by `rating` points over `count`
+    reviews (negative to remove). Done as one UPDATE on the product row so
+    concurrent reviews never overwrite each other's totals.
+    """
+    new_sum=F('rating_sum')+rating
+    new_count=F('review_count')+count
+    Product.objects.filter(pk=product_id).update(
+        rating_sum=new_sum,
+        review_count=new_count,
+        avg_rating=Case(
+            When(review_count__lte=-count,then=Value(0.0)),
+            default=Cast(new_sum,FloatField())/Cast(new_count,FloatField()),
+            output_field=FloatField(),
+        ),
+    )
+
+
+def _stat(aggregate):
+    return Subquery(
+        Review.objects.filter(product=OuterRef('pk'))
+        .order_by()
+        .values('product')
+        .annotate(value=aggregate)
+        .values('value')[:1]
+    )
+
+
+def rebuild_ratings(products=None):
+    """Recompute the stored totals from the Review table in a single UPDATE."""
+    if products is None:
+        products=Product.objects.all()
+    return products.update(
+        rating_sum=Coalesce(_stat(Sum('rating')),0),
+        review_count=Coalesce(_stat(Count('id')),0),
+        avg_rating=Coalesce(_stat(Avg('rating',output_field=FloatField())),Value(0.0)),
+    )
@@ -0,0 +1,30 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from Reviews.models import Review
+from Reviews.ratings import apply_rating
+
+
+@receiver(pre_save,sender=Review)
+def remember_rating(sender, instance, **kwargs):
+    if instance.pk is None or instance._state.adding:
+        instance._previous=None
+        return
+    instance._previous=(
+        Review.objects.filter(pk=instance.pk).values_list('product_id','rating').first()
+    )
+
+
+@receiver(post_save,sender=Review)
+def add_rating(sender, instance, created, **kwargs):
+    previous=getattr(instance,'_previous',None)
+    if previous:
+        product_id,rating=previous
+        if product_id==instance.product_id and rating==instance.rating:
+            return
+        apply_rating(product_id,-rating,-1)
+    apply_rating(instance.product_id,instance.rating,1)
+
+
+@receiver(post_delete,sender=Review)
+def remove_rating(sender, instance, **kwargs):
+    apply_rating(instance.product_id,-instance.rating,-1)
@@ -15,8 +15,11 @@ class ReviewViewset(viewsets.ModelViewSet):
     filter_backends=[OrderingFilter]
     ordering_fields=['rating']
 
-
-
+    def filter_queryset(self, queryset):
+        product=self.request.query_params.get('product','')
+        if product.isdigit():
+            queryset=queryset.filter(product_id=product)
+        return super().filter_queryset(queryset)
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)    
\ No newline at end of file
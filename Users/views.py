@@ -34,6 +34,12 @@ class UserViewSet(viewsets.ModelViewSet):
        if user.is_authenticated and user.role=='admin':
            return User.objects.all()
        return User.objects.filter(id=user.id)
+
+    def filter_queryset(self, queryset):
+        role=self.request.query_params.get('role')
+        if role:
+            queryset=queryset.filter(role=role)
+        return super().filter_queryset(queryset)
     
 class UserRegistrationViewset(mixins.CreateModelMixin,viewsets.GenericViewSet):
     queryset=EmailVerificationToken.objects.all()
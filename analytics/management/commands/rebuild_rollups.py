@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from analytics.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help='Recount the sales rollups from every order'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size',type=int,default=500)
+
+    def handle(self, *args, **options):
+        counted=rebuild_rollups(batch_size=options['batch_size'])
+        self.stdout.write(f'counted {counted} orders')
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+from analytics.rollups import refresh_stale
+
+
+class Command(BaseCommand):
+    help='Bring the sales rollups up to date with the orders changed since the last run'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop',action='store_true',help='keep refreshing until interrupted')
+        parser.add_argument('--interval',type=float,default=5,help='seconds between runs with --loop')
+        parser.add_argument('--batch-size',type=int,default=500)
+
+    def handle(self, *args, **options):
+        while True:
+            refreshed=refresh_stale(batch_size=options['batch_size'])
+            if refreshed or not options['loop']:
+                self.stdout.write(f'refreshed {refreshed} orders')
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,48 @@
+# Generated by Django 6.0.1 on 2026-10-18 03:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('Orders', '0017_cart_taxable'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CountedOrder',
+            fields=[
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='Orders.order')),
+                ('status', models.CharField(max_length=50)),
+                ('paid', models.BooleanField(default=False)),
+                ('parts', models.JSONField(default=dict)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=10)),
+                ('scope', models.CharField(choices=[('all', 'Marketplace'), ('seller', 'Seller'), ('product', 'Product')], max_length=10)),
+                ('subject', models.BigIntegerField(default=0)),
+                ('bucket', models.DateTimeField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('delivered', 'Delivered'), ('processing', 'Processing'), ('shipped', 'Shipped'), ('canceled', 'Canceled')], max_length=50)),
+                ('orders', models.IntegerField(default=0)),
+                ('units', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('paid_orders', models.IntegerField(default=0)),
+                ('paid_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('seller', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['seller', 'period', 'scope', 'bucket'], name='analytics_s_seller__e02528_idx')],
+                'unique_together': {('period', 'scope', 'subject', 'bucket', 'status')},
+            },
+        ),
+    ]
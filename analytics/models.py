@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.db import models
+from Orders.models import Order
+
+
+class SalesRollup(models.Model):
+    # counters for the orders created in one hour or day, for the whole
+    # marketplace, one seller or one product; kept current by analytics.rollups
+    PERIOD_CHOICES=[
+        ('hour','Hour'),
+        ('day','Day'),
+    ]
+    SCOPE_CHOICES=[
+        ('all','Marketplace'),
+        ('seller','Seller'),
+        ('product','Product'),
+    ]
+    period=models.CharField(max_length=10,choices=PERIOD_CHOICES)
+    scope=models.CharField(max_length=10,choices=SCOPE_CHOICES)
+    # 0 for the marketplace, else the seller or product id
+    subject=models.BigIntegerField(default=0)
+    bucket=models.DateTimeField()
+    status=models.CharField(max_length=50,choices=Order.STATUS_CHOICES)
+    # who sells the product, on product rows
+    seller=models.ForeignKey(settings.AUTH_USER_MODEL,on_delete=models.SET_NULL,null=True,blank=True,related_name='+',db_index=False)
+    orders=models.IntegerField(default=0)
+    units=models.IntegerField(default=0)
+    revenue=models.DecimalField(max_digits=14,decimal_places=2,default=0)
+    paid_orders=models.IntegerField(default=0)
+    paid_revenue=models.DecimalField(max_digits=14,decimal_places=2,default=0)
+
+    class Meta:
+        unique_together=('period','scope','subject','bucket','status')
+        indexes=[
+            models.Index(fields=['seller','period','scope','bucket']),
+        ]
+
+    def __str__(self):
+        return f"{self.scope}:{self.subject} {self.period} {self.bucket:%Y-%m-%d %H:00} {self.status}"
+
+
+class CountedOrder(models.Model):
+    # the state an order was last counted in, so a change is applied to the
+    # rollups as a difference
+    order=models.OneToOneField(Order,on_delete=models.CASCADE,primary_key=True,related_name='+')
+    status=models.CharField(max_length=50)
+    paid=models.BooleanField(default=False)
+    # seller order id -> status
+    parts=models.JSONField(default=dict)
+
+    def __str__(self):
+        return f"order #{self.order_id}:{self.status}"
+
+
+class StaleOrder(models.Model):
+    # an order whose counts may be out of date, written when a change to it
+    # commits and worked off by refresh_rollups; an order can be listed
+    # more than once, so a change landing mid-refresh is never lost
+    order=models.ForeignKey(Order,on_delete=models.CASCADE,related_name='+')
+
+    def __str__(self):
+        return f"order #{self.order_id}"
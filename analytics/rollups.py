@@ -0,0 +1,204 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q, Sum
+from django.utils import timezone
+
+from EMarket.batching import CommitBatch
+from analytics.models import CountedOrder, SalesRollup, StaleOrder
+from Orders.models import Order, OrderItem, SellerOrder
+from Payments.models import Payment
+
+PERIODS=('hour','day')
+COUNTERS=('orders','units','revenue','paid_orders','paid_revenue')
+
+
+def bucket_of(moment, period):
+    moment=timezone.localtime(moment).replace(minute=0,second=0,microsecond=0)
+    if period=='day':
+        moment=moment.replace(hour=0)
+    return moment
+
+
+def _add(deltas, key, sign, orders, units, revenue, paid):
+    row=deltas[key]
+    row[0]+=sign*orders
+    row[1]+=sign*units
+    row[2]+=sign*revenue
+    if paid:
+        row[3]+=sign*orders
+        row[4]+=sign*revenue
+
+
+def _contribute(deltas, owners, order, lines, state, sign):
+    """Add (sign=1) or take away (sign=-1) what `order` counts for in `state`."""
+    status,paid,parts=state
+    buckets=[(period,bucket_of(order['created_at'],period)) for period in PERIODS]
+    units=sum(line['units'] for line in lines)
+    by_part=defaultdict(list)
+    for line in lines:
+        by_part[line['seller_order_id']].append(line)
+
+    for period,bucket in buckets:
+        _add(deltas,(period,'all',0,bucket,status),sign,1,units,order['total_amount'],paid)
+        for part_id,part_lines in by_part.items():
+            # items from before the split follow the order
+            part_status=parts.get(str(part_id),status)
+            seller_id=part_lines[0]['seller_id']
+            if seller_id is not None:
+                _add(
+                    deltas,(period,'seller',seller_id,bucket,part_status),sign,1,
+                    sum(line['units'] for line in part_lines),sum(line['revenue'] for line in part_lines),paid
+                )
+            products=defaultdict(lambda:[0,Decimal(0)])
+            for line in part_lines:
+                products[line['product_id']][0]+=line['units']
+                products[line['product_id']][1]+=line['revenue']
+            for product_id,(product_units,revenue) in products.items():
+                key=(period,'product',product_id,bucket,part_status)
+                owners[key]=seller_id
+                _add(deltas,key,sign,1,product_units,revenue,paid)
+
+
+def _apply(deltas, owners):
+    deltas={key:row for key,row in deltas.items() if any(row)}
+    if not deltas:
+        return
+    keys=sorted(deltas,key=lambda k:(k[0],k[1],k[2],k[3].isoformat(),k[4]))
+    # make sure every row exists, then lock them all in one go; inserts and
+    # locks are taken in key order so concurrent refreshes can't deadlock
+    SalesRollup.objects.bulk_create(
+        [
+            SalesRollup(
+                period=key[0],scope=key[1],subject=key[2],bucket=key[3],status=key[4],seller_id=owners.get(key)
+            )
+            for key in keys
+        ],
+        ignore_conflicts=True,batch_size=500
+    )
+    subjects=defaultdict(set)
+    for _,scope,subject,_,_ in keys:
+        subjects[scope].add(subject)
+    condition=Q(pk__in=[])
+    for scope,ids in subjects.items():
+        condition|=Q(scope=scope,subject__in=ids)
+    rows=(
+        SalesRollup.objects.filter(condition,bucket__in={key[3] for key in keys})
+        .order_by('pk').select_for_update()
+    )
+    changed=[]
+    for row in rows:
+        delta=deltas.get((row.period,row.scope,row.subject,row.bucket,row.status))
+        if delta is None:
+            continue
+        for field,value in zip(COUNTERS,delta):
+            setattr(row,field,getattr(row,field)+value)
+        changed.append(row)
+    SalesRollup.objects.bulk_update(changed,COUNTERS,batch_size=500)
+
+
+def refresh_orders(order_ids):
+    """
+    Bring the rollups in line with the current state of `order_ids`. Each
+    order's contribution in the state it was last counted in is taken away
+    and its contribution now is added, so only the rows an order actually
+    moves between are written, and running it twice changes nothing. A fixed
+    number of statements per call whatever the batch size.
+    """
+    order_ids=sorted(set(order_ids))
+    if not order_ids:
+        return
+    with transaction.atomic():
+        paid=Payment.objects.filter(order=OuterRef('pk'),status='completed')
+        orders={
+            row['id']:row for row in
+            Order.objects.filter(id__in=order_ids).order_by('id').select_for_update()
+            .annotate(paid=Exists(paid)).values('id','created_at','status','total_amount','paid')
+        }
+        parts=defaultdict(dict)
+        for part_id,order_id,part_status in (
+            SellerOrder.objects.filter(order_id__in=list(orders)).order_by().values_list('id','order_id','status')
+        ):
+            parts[order_id][str(part_id)]=part_status
+        lines=defaultdict(list)
+        for line in (
+            OrderItem.objects.filter(order_id__in=list(orders))
+            .values('order_id','seller_order_id','seller_id',product_id=F('sku__product_id'))
+            .annotate(units=Sum('quantity_at_purchase'),revenue=Sum(F('price_at_purchase')*F('quantity_at_purchase')))
+            .order_by()
+        ):
+            line['revenue']=Decimal(line['revenue'])
+            lines[line['order_id']].append(line)
+        counted={c.order_id:c for c in CountedOrder.objects.filter(order_id__in=list(orders))}
+
+        deltas=defaultdict(lambda:[0,0,Decimal(0),0,Decimal(0)])
+        owners={}
+        snapshots=[]
+        for order_id,order in orders.items():
+            state=(order['status'],order['paid'],parts[order_id])
+            previous=counted.get(order_id)
+            if previous is not None:
+                if (previous.status,previous.paid,previous.parts)==state:
+                    continue
+                _contribute(deltas,owners,order,lines[order_id],(previous.status,previous.paid,previous.parts),-1)
+            _contribute(deltas,owners,order,lines[order_id],state,1)
+            snapshots.append(CountedOrder(order_id=order_id,status=state[0],paid=state[1],parts=state[2]))
+        _apply(deltas,owners)
+        CountedOrder.objects.bulk_create(
+            snapshots,update_conflicts=True,unique_fields=['order'],update_fields=['status','paid','parts']
+        )
+
+
+def rebuild_rollups(batch_size=500):
+    """Recount every order from scratch, `batch_size` orders per transaction."""
+    with transaction.atomic():
+        SalesRollup.objects.all().delete()
+        CountedOrder.objects.all().delete()
+    last=0
+    counted=0
+    while True:
+        ids=list(Order.objects.filter(id__gt=last).order_by('id').values_list('id',flat=True)[:batch_size])
+        if not ids:
+            return counted
+        refresh_orders(ids)
+        counted+=len(ids)
+        last=ids[-1]
+
+
+def refresh_stale(batch_size=500):
+    """
+    Refresh the orders listed in StaleOrder, `batch_size` entries per
+    transaction, claimed with SKIP LOCKED so several workers can share the
+    queue. Returns how many orders were refreshed.
+    """
+    refreshed=0
+    while True:
+        with transaction.atomic():
+            stale=list(
+                StaleOrder.objects.order_by('id').select_for_update(skip_locked=True)
+                .values_list('id','order_id')[:batch_size]
+            )
+            order_ids={order_id for _,order_id in stale}
+            refresh_orders(order_ids)
+            StaleOrder.objects.filter(id__in=[pk for pk,_ in stale]).delete()
+        refreshed+=len(order_ids)
+        if len(stale)<batch_size:
+            return refreshed
+
+
+def _mark_stale(order_ids):
+    StaleOrder.objects.bulk_create([StaleOrder(order_id=order_id) for order_id in order_ids],batch_size=500)
+
+
+_pending=CommitBatch(_mark_stale,robust=True)
+
+
+def schedule_refresh(order_ids):
+    """
+    List `order_ids` for refresh_stale once the current transaction
+    commits: one INSERT per transaction, so a checkout or status change
+    never waits on the shared counter rows. A failure is logged and left
+    for `rebuild_rollups`.
+    """
+    _pending.add(order_ids)
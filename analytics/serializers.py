@@ -0,0 +1,69 @@
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+from rest_framework import serializers
+from analytics.models import SalesRollup
+from Orders.models import Order
+
+MAX_DAYS=366
+MAX_HOURLY_DAYS=31
+
+
+class DashboardQuerySerializer(serializers.Serializer):
+    period=serializers.ChoiceField(choices=SalesRollup.PERIOD_CHOICES,default='day')
+    since=serializers.DateField(required=False)
+    until=serializers.DateField(required=False)
+    status=serializers.ChoiceField(choices=Order.STATUS_CHOICES,required=False)
+    seller=serializers.IntegerField(required=False)
+    limit=serializers.IntegerField(min_value=1,max_value=100,default=10)
+
+    def validate(self, data):
+        until=data.get('until') or timezone.localdate()
+        since=data.get('since') or until-timedelta(days=29)
+        days=(until-since).days+1
+        if days<1:
+            raise serializers.ValidationError({'since':'must not be after until'})
+        if days>(MAX_HOURLY_DAYS if data['period']=='hour' else MAX_DAYS):
+            raise serializers.ValidationError({'since':f"at most {MAX_HOURLY_DAYS if data['period']=='hour' else MAX_DAYS} days per {data['period']}ly query"})
+        data['since'],data['until']=since,until
+        # whole local days, until inclusive
+        data['start']=timezone.make_aware(datetime.combine(since,time.min))
+        data['end']=timezone.make_aware(datetime.combine(until+timedelta(days=1),time.min))
+        return data
+
+
+class RollupTotalsSerializer(serializers.Serializer):
+    orders=serializers.IntegerField()
+    units=serializers.IntegerField()
+    revenue=serializers.DecimalField(max_digits=14,decimal_places=2)
+    average_order_value=serializers.DecimalField(max_digits=14,decimal_places=2)
+    paid_orders=serializers.IntegerField()
+    paid_revenue=serializers.DecimalField(max_digits=14,decimal_places=2)
+
+
+class StatusTotalsSerializer(RollupTotalsSerializer):
+    status=serializers.CharField()
+
+
+class SeriesPointSerializer(RollupTotalsSerializer):
+    bucket=serializers.DateTimeField()
+
+
+class ProductTotalsSerializer(RollupTotalsSerializer):
+    product=serializers.IntegerField()
+    name=serializers.CharField(allow_null=True)
+
+
+class CatalogSerializer(serializers.Serializer):
+    products=serializers.IntegerField()
+    active_products=serializers.IntegerField()
+    stock=serializers.IntegerField()
+    users=serializers.IntegerField(required=False)
+
+
+class DashboardSummarySerializer(serializers.Serializer):
+    since=serializers.DateField()
+    until=serializers.DateField()
+    totals=RollupTotalsSerializer()
+    by_status=StatusTotalsSerializer(many=True)
+    catalog=CatalogSerializer()
@@ -0,0 +1,21 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from analytics.rollups import schedule_refresh
+from Orders.events import orders_changed
+from Orders.models import Order
+from Payments.models import Payment
+
+
+@receiver(post_save,sender=Order)
+def order_saved(sender, instance, **kwargs):
+    schedule_refresh([instance.pk])
+
+
+@receiver(post_save,sender=Payment)
+def payment_saved(sender, instance, **kwargs):
+    schedule_refresh([instance.order_id])
+
+
+@receiver(orders_changed)
+def orders_updated(sender, order_ids, **kwargs):
+    schedule_refresh(order_ids)
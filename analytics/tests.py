@@ -0,0 +1,159 @@
+from decimal import Decimal
+
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from analytics.models import SalesRollup, StaleOrder
+from analytics.rollups import bucket_of, rebuild_rollups, refresh_orders, refresh_stale
+from Orders.models import Order, SellerOrder
+from Orders.tests import make_sku, order_payload
+from Payments.models import Payment
+from Users.models import User
+
+
+class SalesRollupTest(APITestCase):
+    def setUp(self):
+        self.first = User.objects.create_user(username='first', password='password123', role='seller')
+        self.second = User.objects.create_user(username='second', password='password123', role='seller')
+        self.admin = User.objects.create_user(username='admin', password='password123', role='admin')
+        self.customer = User.objects.create_user(username='customer', password='password123', role='customer')
+        self.a = make_sku('A1', 50, price=100, seller=self.first)
+        self.b = make_sku('B1', 50, price=300, seller=self.second)
+
+    def checkout(self, *lines):
+        self.client.force_authenticate(user=self.customer)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/order/', order_payload(*lines), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        refresh_stale()
+        return Order.objects.get(pk=response.data['id'])
+
+    def row(self, scope, subject, status_, period='day'):
+        return SalesRollup.objects.filter(
+            period=period, scope=scope, subject=subject, status=status_, bucket=bucket_of(timezone.now(), period)
+        ).values('orders', 'units', 'revenue', 'paid_orders', 'paid_revenue').first()
+
+    def snapshot(self):
+        return sorted(SalesRollup.objects.exclude(
+            orders=0, units=0, revenue=0, paid_orders=0, paid_revenue=0
+        ).values_list('period', 'scope', 'subject', 'bucket', 'status', 'orders', 'units', 'revenue', 'paid_orders', 'paid_revenue'))
+
+    def test_checkout_counts_marketplace_seller_and_product(self):
+        first = self.checkout((self.a, 2), (self.b, 1))
+        second = self.checkout((self.a, 1))
+        for period in ('hour', 'day'):
+            self.assertEqual(self.row('all', 0, 'pending', period)['orders'], 2)
+        marketplace = self.row('all', 0, 'pending')
+        self.assertEqual(marketplace['units'], 4)
+        self.assertEqual(marketplace['revenue'], first.total_amount + second.total_amount)
+        self.assertEqual(self.row('seller', self.first.id, 'pending'), {
+            'orders': 2, 'units': 3, 'revenue': Decimal('300.00'), 'paid_orders': 0, 'paid_revenue': Decimal('0.00')
+        })
+        self.assertEqual(self.row('seller', self.second.id, 'pending')['revenue'], Decimal('300.00'))
+        self.assertEqual(self.row('product', self.b.product_id, 'pending')['units'], 1)
+
+    def test_status_and_payment_changes_move_the_counts(self):
+        order = self.checkout((self.a, 2), (self.b, 1))
+        self.client.force_authenticate(user=self.first)
+        part = SellerOrder.objects.get(order=order, seller=self.first)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/seller-order/{part.id}/', {'status': 'processing'}, format='json')
+        refresh_stale()
+        self.assertEqual(self.row('seller', self.first.id, 'processing')['orders'], 1)
+        self.assertEqual(self.row('seller', self.first.id, 'pending')['orders'], 0)
+        self.assertEqual(self.row('all', 0, 'pending')['orders'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Payment.objects.create(order=order, user=self.customer, method='cod', amount=order.total_amount, status='completed')
+        refresh_stale()
+        self.assertEqual(self.row('all', 0, 'pending')['paid_revenue'], order.total_amount)
+
+        self.client.force_authenticate(user=self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/order/{order.id}/', {'status': 'canceled'}, format='json')
+        refresh_stale()
+        self.assertEqual(self.row('all', 0, 'pending')['orders'], 0)
+        self.assertEqual(self.row('all', 0, 'canceled')['orders'], 1)
+        self.assertEqual(self.row('seller', self.second.id, 'canceled')['units'], 1)
+
+    def test_requests_only_list_the_orders_they_change(self):
+        self.client.force_authenticate(user=self.customer)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            response = self.client.post('/order/', order_payload((self.a, 2), (self.b, 1)), format='json')
+        self.assertEqual(len(callbacks), 1)
+        self.assertFalse(SalesRollup.objects.exists())
+        self.assertEqual(list(StaleOrder.objects.values_list('order_id', flat=True)), [response.data['id']])
+
+        self.assertEqual(refresh_stale(batch_size=1), 1)
+        self.assertFalse(StaleOrder.objects.exists())
+        self.assertEqual(self.row('all', 0, 'pending')['orders'], 1)
+        self.assertEqual(refresh_stale(), 0)
+
+    def test_refresh_is_idempotent_and_matches_rebuild(self):
+        order = self.checkout((self.a, 2), (self.b, 1))
+        self.checkout((self.b, 3))
+        Order.objects.filter(pk=order.pk).update(status='shipped')
+        SellerOrder.objects.filter(order=order).update(status='shipped')
+        refresh_orders([order.pk])
+        counted = self.snapshot()
+        # the four reads inside a savepoint, nothing written
+        with self.assertNumQueries(6):
+            refresh_orders([order.pk])
+        self.assertEqual(self.snapshot(), counted)
+        self.assertEqual(rebuild_rollups(batch_size=1), 2)
+        self.assertEqual(self.snapshot(), counted)
+
+
+class DashboardTest(APITestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller', password='password123', role='seller')
+        other = User.objects.create_user(username='other', password='password123', role='seller')
+        self.admin = User.objects.create_user(username='admin', password='password123', role='admin')
+        self.customer = User.objects.create_user(username='customer', password='password123', role='customer')
+        self.mine = make_sku('MINE', 50, price=100, seller=self.seller)
+        self.theirs = make_sku('THEIRS', 50, price=500, seller=other)
+        self.client.force_authenticate(user=self.customer)
+        with self.captureOnCommitCallbacks(execute=True):
+            for lines in (((self.mine, 1),), ((self.mine, 2), (self.theirs, 1)), ((self.theirs, 1),)):
+                self.client.post('/order/', order_payload(*lines), format='json')
+            canceled = Order.objects.order_by('pk').last()
+            self.client.force_authenticate(user=self.admin)
+            self.client.patch(f'/order/{canceled.id}/', {'status': 'canceled'}, format='json')
+        refresh_stale()
+
+    def get(self, user, url):
+        self.client.force_authenticate(user=user)
+        return self.client.get(url)
+
+    def test_admin_summary(self):
+        response = self.get(self.admin, '/dashboard/summary/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        live = Order.objects.exclude(status='canceled')
+        self.assertEqual(response.data['totals']['orders'], 2)
+        self.assertEqual(Decimal(response.data['totals']['revenue']), sum(o.total_amount for o in live))
+        self.assertEqual(
+            {row['status']: row['orders'] for row in response.data['by_status']}, {'pending': 2, 'canceled': 1}
+        )
+        self.assertEqual(response.data['catalog']['users'], 4)
+
+    def test_seller_sees_only_their_sales(self):
+        with self.assertNumQueries(2):
+            response = self.get(self.seller, '/dashboard/summary/')
+        self.assertEqual(response.data['totals']['units'], 3)
+        self.assertEqual(response.data['totals']['average_order_value'], '150.00')
+        self.assertEqual(response.data['catalog'], {'products': 1, 'active_products': 1, 'stock': 0})
+
+        products = self.get(self.seller, '/dashboard/products/').data
+        self.assertEqual([(row['name'], row['units']) for row in products], [('MINE', 3)])
+        admin_top = self.get(self.admin, '/dashboard/products/?limit=1').data
+        self.assertEqual([(row['name'], row['revenue']) for row in admin_top], [('THEIRS', '500.00')])
+
+        series = self.get(self.seller, '/dashboard/series/?period=hour').data
+        self.assertEqual([point['orders'] for point in series], [2])
+        self.assertEqual(self.get(self.admin, f'/dashboard/series/?seller={self.seller.id}').data, self.get(self.seller, '/dashboard/series/').data)
+
+    def test_customers_and_bad_ranges_are_refused(self):
+        self.assertEqual(self.get(self.customer, '/dashboard/summary/').status_code, status.HTTP_403_FORBIDDEN)
+        response = self.get(self.admin, '/dashboard/series/?period=hour&since=2026-01-01&until=2026-06-01')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,108 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db.models import Count, Q, Sum
+from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from analytics.models import SalesRollup
+from analytics.rollups import COUNTERS
+from analytics.serializers import (
+    DashboardQuerySerializer,DashboardSummarySerializer,ProductTotalsSerializer,SeriesPointSerializer
+)
+from Products.models import Product
+
+ZERO=Decimal('0.00')
+CENT=Decimal('0.01')
+SUMS={field:Sum(field) for field in COUNTERS}
+
+
+def totals(row):
+    row={**row,**{field:row.get(field) or 0 for field in COUNTERS}}
+    orders,revenue=row['orders'],Decimal(row['revenue'])
+    row['average_order_value']=(revenue/orders).quantize(CENT) if orders else ZERO
+    return row
+
+
+# Create your views here.
+class DashboardViewSet(viewsets.ViewSet):
+    """
+    Sales figures read from the hourly and daily rollups, so every endpoint
+    is a range scan over one index however many orders there are. Admins
+    see the marketplace (or one seller with ?seller=), sellers their own
+    sales. Canceled orders are left out of totals.
+    """
+    authentication_classes=[JWTAuthentication]
+    permission_classes=[IsAuthenticated]
+
+    def _query(self, request):
+        serializer=DashboardQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        data=serializer.validated_data
+        user=request.user
+        if user.role=='admin':
+            data['seller']=data.get('seller')
+        elif user.role=='seller':
+            data['seller']=user.id
+        else:
+            raise PermissionDenied("only admins and sellers have a dashboard")
+        return data
+
+    def _rollups(self, data, period='day'):
+        scope,subject=('seller',data['seller']) if data['seller'] else ('all',0)
+        return SalesRollup.objects.filter(
+            period=period,scope=scope,subject=subject,bucket__gte=data['start'],bucket__lt=data['end']
+        )
+
+    @action(detail=False,methods=['get'])
+    def summary(self, request):
+        data=self._query(request)
+        by_status=[
+            totals(row) for row in
+            self._rollups(data).values('status').annotate(**SUMS).order_by('status')
+        ]
+        live=[row for row in by_status if row['status']!='canceled']
+        overall=totals({field:sum((row[field] for row in live),0) for field in COUNTERS})
+
+        products=Product.objects.all()
+        if data['seller']:
+            products=products.filter(created_by_id=data['seller'])
+        catalog=products.aggregate(
+            products=Count('pk'),active_products=Count('pk',filter=Q(is_active=True)),stock=Sum('stock')
+        )
+        catalog['stock']=catalog['stock'] or 0
+        if request.user.role=='admin' and not data['seller']:
+            catalog['users']=get_user_model().objects.count()
+        return Response(DashboardSummarySerializer({
+            'since':data['since'],'until':data['until'],
+            'totals':overall,'by_status':by_status,'catalog':catalog,
+        }).data)
+
+    @action(detail=False,methods=['get'])
+    def series(self, request):
+        data=self._query(request)
+        rows=self._rollups(data,data['period'])
+        rows=rows.filter(status=data['status']) if data.get('status') else rows.exclude(status='canceled')
+        points=[totals(row) for row in rows.values('bucket').annotate(**SUMS).order_by('bucket')]
+        return Response(SeriesPointSerializer(points,many=True).data)
+
+    @action(detail=False,methods=['get'])
+    def products(self, request):
+        data=self._query(request)
+        rows=SalesRollup.objects.filter(
+            period='day',scope='product',bucket__gte=data['start'],bucket__lt=data['end']
+        ).exclude(status='canceled')
+        if data['seller']:
+            rows=rows.filter(seller_id=data['seller'])
+        top=[
+            totals(row) for row in
+            rows.values('subject').annotate(**SUMS).order_by('-revenue','subject')[:data['limit']]
+        ]
+        names=dict(Product.objects.filter(pk__in=[row['subject'] for row in top]).values_list('pk','name'))
+        for row in top:
+            row['product']=row['subject']
+            row['name']=names.get(row['subject'])
+        return Response(ProductTotalsSerializer(top,many=True).data)
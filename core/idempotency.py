@@ -0,0 +1,104 @@
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from core.models import IdempotencyKey
+
+HEADER='HTTP_IDEMPOTENCY_KEY'
+KEY_TTL=timedelta(hours=getattr(settings,'IDEMPOTENCY_KEY_TTL_HOURS',24))
+MAX_KEY_LENGTH=IdempotencyKey._meta.get_field('key').max_length
+
+
+def fingerprint(request):
+    body=json.dumps(request.data,sort_keys=True,cls=DjangoJSONEncoder,default=str)
+    return hashlib.sha256(f'{request.method} {request.path}\n{body}'.encode()).hexdigest()
+
+
+def _replay(record, request_fingerprint):
+    if record is None:
+        return Response(
+            {"error":"a request with this Idempotency-Key is still in progress"},
+            status=status.HTTP_409_CONFLICT
+        )
+    if record.fingerprint!=request_fingerprint:
+        return Response(
+            {"error":"Idempotency-Key was already used for a different request"},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    response=Response(record.response,status=record.status_code)
+    response['Idempotent-Replayed']='true'
+    return response
+
+
+def idempotent(scope):
+    """
+    Make a POST view safe to retry. When the client sends an
+    `Idempotency-Key` header, the first successful response is stored for
+    KEY_TTL and repeats of the same request get it back from one indexed
+    lookup without running the view again. The key row is claimed in the
+    same transaction as the view's writes, so a duplicate that races the
+    original waits on the unique index and then replays its response. Failed
+    requests don't keep the key, so they can be retried for real.
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            key=request.META.get(HEADER)
+            if not key or not request.user.is_authenticated:
+                return view_method(self,request,*args,**kwargs)
+            if len(key)>MAX_KEY_LENGTH:
+                return Response({"error":"Idempotency-Key is too long"},status=status.HTTP_400_BAD_REQUEST)
+
+            request_fingerprint=fingerprint(request)
+            now=timezone.now()
+            lookup={'user':request.user,'scope':scope,'key':key}
+            record=IdempotencyKey.objects.filter(expires_at__gt=now,**lookup).first()
+            if record is not None:
+                return _replay(record,request_fingerprint)
+
+            with transaction.atomic():
+                IdempotencyKey.objects.filter(expires_at__lte=now,**lookup).delete()
+                try:
+                    with transaction.atomic():
+                        record=IdempotencyKey.objects.create(
+                            fingerprint=request_fingerprint,expires_at=now+KEY_TTL,**lookup
+                        )
+                except IntegrityError:
+                    return _replay(
+                        IdempotencyKey.objects.filter(status_code__isnull=False,**lookup).first(),
+                        request_fingerprint
+                    )
+
+                response=view_method(self,request,*args,**kwargs)
+                if status.is_success(response.status_code):
+                    record.status_code=response.status_code
+                    record.response=response.data
+                    record.save(update_fields=['status_code','response'])
+                else:
+                    record.delete()
+                return response
+        return wrapper
+    return decorator
+
+
+def purge_expired_keys(now=None, batch_size=1000):
+    """Delete expired keys in batches off the expires_at index."""
+    now=now or timezone.now()
+    purged=0
+    while True:
+        ids=list(
+            IdempotencyKey.objects.filter(expires_at__lte=now)
+            .order_by('expires_at').values_list('id',flat=True)[:batch_size]
+        )
+        if ids:
+            IdempotencyKey.objects.filter(id__in=ids).delete()
+        purged+=len(ids)
+        if len(ids)<batch_size:
+            return purged
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+from core.idempotency import purge_expired_keys
+
+
+class Command(BaseCommand):
+    help='Delete stored idempotent responses past their TTL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop',action='store_true',help='keep sweeping until interrupted')
+        parser.add_argument('--interval',type=float,default=300,help='seconds between sweeps with --loop')
+        parser.add_argument('--batch-size',type=int,default=1000)
+
+    def handle(self, *args, **options):
+        while True:
+            purged=purge_expired_keys(batch_size=options['batch_size'])
+            if purged or not options['loop']:
+                self.stdout.write(f'purged {purged} keys')
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,41 @@
+# Generated by Django 6.0.1 on 2026-10-18 09:20
+
+import django.core.serializers.json
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # the table already exists, Orders.0018_move_idempotency_keys renamed it
+
+    dependencies = [
+        ('core', '0001_initial'),
+        ('Orders', '0018_move_idempotency_keys'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='IdempotencyKey',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('scope', models.CharField(max_length=50)),
+                        ('key', models.CharField(max_length=100)),
+                        ('fingerprint', models.CharField(max_length=64)),
+                        ('status_code', models.PositiveSmallIntegerField(blank=True, null=True)),
+                        ('response', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True)),
+                        ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                        ('expires_at', models.DateTimeField(db_index=True)),
+                        ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='idempotency_keys', to=settings.AUTH_USER_MODEL)),
+                    ],
+                    options={
+                        'unique_together': {('user', 'scope', 'key')},
+                    },
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.utils import timezone
+
+
+class CacheStamp(models.Model):
+    # current version of one EMarket.cache.ProcessCache; a new value tells
+    # every worker to rebuild its copy
+    name=models.CharField(max_length=100,primary_key=True)
+    version=models.CharField(max_length=32)
+
+    def __str__(self):
+        return f"{self.name}@{self.version}"
+
+
+class IdempotencyKey(models.Model):
+    # response of a retry-safe POST, replayed for repeats of the same
+    # Idempotency-Key header; see core.idempotency
+    user=models.ForeignKey(settings.AUTH_USER_MODEL,on_delete=models.CASCADE,related_name='idempotency_keys')
+    scope=models.CharField(max_length=50)
+    key=models.CharField(max_length=100)
+    fingerprint=models.CharField(max_length=64)
+    status_code=models.PositiveSmallIntegerField(null=True,blank=True)
+    response=models.JSONField(encoder=DjangoJSONEncoder,null=True,blank=True)
+    created_at=models.DateTimeField(default=timezone.now)
+    expires_at=models.DateTimeField(db_index=True)
+    class Meta:
+        unique_together=('user','scope','key')
+
+    def __str__(self):
+        return f"{self.scope}:{self.key}"
@@ -0,0 +1,76 @@
+import time
+from unittest import mock
+
+from django.db import transaction
+from django.test import TestCase
+
+from core.models import CacheStamp
+from EMarket.batching import CommitBatch
+from EMarket.cache import ProcessCache, _mark_stale
+
+
+class ProcessCacheTest(TestCase):
+    def setUp(self):
+        self.loads = 0
+        self.cached = ProcessCache('test-cache', self.load)
+        # what every new request does
+        _mark_stale()
+
+    def load(self):
+        self.loads += 1
+        return self.loads
+
+    def test_invalidations_reach_every_worker(self):
+        self.assertEqual(self.cached.get(), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.cached.get(), 1)
+        # another worker commits a change
+        CacheStamp.objects.create(name='test-cache', version='elsewhere')
+        self.assertEqual(self.cached.get(), 1)
+        _mark_stale()
+        self.assertEqual(self.cached.get(), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cached.invalidate()
+            self.assertEqual(self.cached.get(), 3)
+        self.assertNotEqual(CacheStamp.objects.get(name='test-cache').version, 'elsewhere')
+        self.assertEqual(self.cached.get(), 4)
+        _mark_stale()
+        self.assertEqual(self.cached.get(), 4)
+
+    def test_values_expire_without_an_invalidation(self):
+        self.assertEqual(self.cached.get(), 1)
+        later = time.monotonic() + self.cached.ttl
+        with mock.patch('EMarket.cache.time.monotonic', return_value=later):
+            self.assertEqual(self.cached.get(), 2)
+
+
+class CommitBatchTest(TestCase):
+    def setUp(self):
+        self.flushed = []
+        self.batch = CommitBatch(self.flushed.append)
+
+    def test_one_callback_per_transaction(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.batch.add([1])
+            self.batch.add([2, 1])
+            self.batch.add([3])
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(self.flushed, [{1, 2, 3}])
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.batch.add([4])
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(self.flushed, [{1, 2, 3}, {4}])
+
+    def test_rolled_back_ids_are_dropped(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    self.batch.add([1])
+                    raise ValueError
+            except ValueError:
+                pass
+            self.batch.add([2])
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(self.flushed, [{2}])
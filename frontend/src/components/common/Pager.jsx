@@ -0,0 +1,29 @@
+// Previous/Next controls for a cursor paginated list. `pagination` is the
+// one the api interceptor puts on list responses; `onPage` gets the cursor
+// to fetch next, undefined for the first page.
+const Pager = ({ pagination, onPage }) => {
+    if (!pagination || (pagination.next === null && pagination.previous === null)) {
+        return null;
+    }
+
+    return (
+        <div className="pager">
+            <button
+                className="btn btn-secondary"
+                disabled={pagination.previous === null}
+                onClick={() => onPage(pagination.previous || undefined)}
+            >
+                ← Previous
+            </button>
+            <button
+                className="btn btn-secondary"
+                disabled={pagination.next === null}
+                onClick={() => onPage(pagination.next || undefined)}
+            >
+                Next →
+            </button>
+        </div>
+    );
+};
+
+export default Pager;
@@ -3,12 +3,14 @@ import { reviewAPI, orderAPI } from '../../services/api';
 import { useAuth } from '../../context/AuthContext';
 import LoadingSpinner from '../common/LoadingSpinner';
 import ErrorMessage from '../common/ErrorMessage';
+import Pager from '../common/Pager';
 import ReviewForm from './ReviewForm';
 import { toast } from 'react-toastify';
 
 const ReviewList = ({ product }) => {
     const { isAuthenticated, user } = useAuth();
     const [reviews, setReviews] = useState([]);
+    const [pagination, setPagination] = useState(null);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState(null);
     const [showForm, setShowForm] = useState(false);
@@ -26,14 +28,12 @@ const ReviewList = ({ product }) => {
         }
     }, [product, isAuthenticated]);
 
-    const fetchReviews = async () => {
+    const fetchReviews = async (cursor) => {
         try {
             setLoading(true);
-            const response = await reviewAPI.getReviews();
-            const productReviews = response.data.filter(
-                (review) => review.product === product.id
-            );
-            setReviews(productReviews);
+            const response = await reviewAPI.getReviews({ product: product.id, cursor });
+            setReviews(response.data);
+            setPagination(response.pagination || null);
             setError(null);
         } catch (err) {
             console.error('Failed to fetch reviews:', err);
@@ -49,25 +49,12 @@ const ReviewList = ({ product }) => {
     const checkReviewEligibility = async () => {
         try {
             setCheckingEligibility(true);
-            const response = await orderAPI.getOrders();
-            const orders = response.data;
-
-            const validSkuIds = product.skus ? product.skus.map(sku => sku.id) : [];
-
-            let foundOrder = null;
-            let foundSkuId = null;
-
-            const hasDeliveredProduct = orders.some(order => {
-                if (order.status !== 'delivered') return false;
-
-                const item = order.order_item.find(item => validSkuIds.includes(item.sku));
-                if (item) {
-                    foundOrder = order;
-                    foundSkuId = item.sku;
-                    return true;
-                }
-                return false;
-            });
+            // any one delivered order with this product will do
+            const response = await orderAPI.getOrders({ status: 'delivered', product: product.id, page_size: 1 });
+            const foundOrder = response.data[0] || null;
+            const foundItem = foundOrder?.order_item.find(item => item.product === product.id);
+            const foundSkuId = foundItem ? foundItem.sku : null;
+            const hasDeliveredProduct = Boolean(foundItem);
 
             if (hasDeliveredProduct) {
                 setEligibleOrder(foundOrder);
@@ -130,19 +117,19 @@ const ReviewList = ({ product }) => {
     }
 
     if (loading) return <LoadingSpinner />;
-    if (error) return <ErrorMessage message={error} onRetry={fetchReviews} />;
+    if (error) return <ErrorMessage message={error} onRetry={() => fetchReviews()} />;
 
-    const averageRating = reviews.length > 0
-        ? (reviews.reduce((acc, r) => acc + r.rating, 0) / reviews.length).toFixed(1)
-        : 0;
+    // the whole product's figures, the list below is one page of it
+    const reviewCount = product.review_count ?? reviews.length;
+    const averageRating = Number(product.avg_rating || 0).toFixed(1);
 
     const userReview = reviews.find(r => r.user === user?.user_id);
 
     return (
         <div className="reviews-section">
             <div className="reviews-header">
-                <h3>Customer Reviews ({reviews.length})</h3>
-                {reviews.length > 0 && (
+                <h3>Customer Reviews ({reviewCount})</h3>
+                {reviewCount > 0 && (
                     <div className="average-rating">
                         <span className="rating-number">{averageRating}</span>
                         <span className="rating-stars">{'★'.repeat(Math.round(averageRating))}</span>
@@ -223,6 +210,8 @@ const ReviewList = ({ product }) => {
                     ))
                 )}
             </div>
+
+            <Pager pagination={pagination} onPage={fetchReviews} />
         </div>
     );
 };
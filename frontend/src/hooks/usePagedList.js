@@ -0,0 +1,57 @@
+import { useEffect, useState } from 'react';
+
+// One page of a cursor paginated list at a time. `fetchPage` gets `params`
+// plus the cursor; changing `params` starts again from the first page, and
+// a response that arrives after the page or filters moved on is dropped.
+// `delay` debounces typing into a search box.
+const usePagedList = (fetchPage, params = {}, delay = 0) => {
+    const key = JSON.stringify(params);
+    const [page, setPage] = useState({ key, cursor: undefined });
+    const [items, setItems] = useState([]);
+    const [pagination, setPagination] = useState(null);
+    const [extra, setExtra] = useState({});
+    const [loading, setLoading] = useState(true);
+    const [error, setError] = useState(null);
+    const [reloads, setReloads] = useState(0);
+
+    const cursor = page.key === key ? page.cursor : undefined;
+
+    useEffect(() => {
+        let current = true;
+        const timer = setTimeout(async () => {
+            try {
+                const response = await fetchPage({ ...params, cursor });
+                if (current) {
+                    setItems(response.data);
+                    setPagination(response.pagination || null);
+                    setExtra(response.extra || {});
+                    setError(null);
+                }
+            } catch (err) {
+                if (current) {
+                    console.error(err);
+                    setError(err);
+                }
+            } finally {
+                if (current) setLoading(false);
+            }
+        }, delay);
+        return () => {
+            current = false;
+            clearTimeout(timer);
+        };
+    }, [key, cursor, reloads]);
+
+    return {
+        items,
+        setItems,
+        pagination,
+        extra,
+        loading,
+        error,
+        goTo: (next) => setPage({ key, cursor: next }),
+        reload: () => setReloads((n) => n + 1),
+    };
+};
+
+export default usePagedList;
@@ -1,6 +1,6 @@
 import { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
-import { userAPI, productAPI, orderAPI } from '../../services/api';
+import { analyticsAPI, orderAPI } from '../../services/api';
 
 const AdminDashboard = () => {
     const [stats, setStats] = useState({
@@ -18,20 +18,21 @@ const AdminDashboard = () => {
 
     const fetchDashboardData = async () => {
         try {
-            const [usersRes, productsRes, ordersRes] = await Promise.all([
-                userAPI.getUsers(),
-                productAPI.getProducts(),
-                orderAPI.getOrders(),
+            const [summaryRes, ordersRes] = await Promise.all([
+                analyticsAPI.getSummary(),
+                orderAPI.getOrders({ page_size: 5 }),
             ]);
+            const summary = summaryRes.data;
+            const pending = summary.by_status.find((s) => s.status === 'pending');
 
             setStats({
-                totalUsers: usersRes.data.length,
-                totalProducts: productsRes.data.length,
-                totalOrders: ordersRes.data.length,
-                pendingOrders: ordersRes.data.filter((o) => o.status === 'pending').length,
+                totalUsers: summary.catalog.users,
+                totalProducts: summary.catalog.products,
+                totalOrders: summary.totals.orders,
+                pendingOrders: pending ? pending.orders : 0,
             });
 
-            setRecentOrders(ordersRes.data.slice(0, 5));
+            setRecentOrders(ordersRes.data);
         } catch (error) {
             console.error('Error fetching dashboard data:', error);
         } finally {
@@ -65,7 +66,7 @@ const AdminDashboard = () => {
                         <div className="stat-icon">🛒</div>
                         <div className="stat-info">
                             <h3>{stats.totalOrders}</h3>
-                            <p>Total Orders</p>
+                            <p>Orders (30 days)</p>
                         </div>
                     </div>
 
@@ -73,7 +74,7 @@ const AdminDashboard = () => {
                         <div className="stat-icon">⏳</div>
                         <div className="stat-info">
                             <h3>{stats.pendingOrders}</h3>
-                            <p>Pending Orders</p>
+                            <p>Pending (30 days)</p>
                         </div>
                     </div>
                 </div>
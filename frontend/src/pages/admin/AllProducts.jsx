@@ -1,32 +1,17 @@
-import { useState, useEffect } from 'react';
+import { useState } from 'react';
 import { Link } from 'react-router-dom';
 import { productAPI } from '../../services/api';
 import LoadingSpinner from '../../components/common/LoadingSpinner';
+import Pager from '../../components/common/Pager';
+import usePagedList from '../../hooks/usePagedList';
 import { formatPrice } from '../../utils/currency';
 
 const AllProducts = () => {
-    const [products, setProducts] = useState([]);
-    const [loading, setLoading] = useState(true);
     const [searchTerm, setSearchTerm] = useState('');
-
-    useEffect(() => {
-        fetchProducts();
-    }, []);
-
-    const fetchProducts = async () => {
-        try {
-            setLoading(true);
-            const response = await productAPI.getProducts();
-            setProducts(response.data);
-        } catch (error) {
-            console.error('Error fetching products:', error);
-        } finally {
-            setLoading(false);
-        }
-    };
-
-    const filteredProducts = products.filter((product) =>
-        product.name.toLowerCase().includes(searchTerm.toLowerCase())
+    const { items: products, setItems: setProducts, pagination, loading, goTo } = usePagedList(
+        productAPI.getProducts,
+        { search: searchTerm || undefined },
+        searchTerm ? 300 : 0
     );
 
     const handleDeleteProduct = async (id) => {
@@ -58,7 +43,7 @@ const AllProducts = () => {
                     />
                 </div>
 
-                {filteredProducts.length === 0 ? (
+                {products.length === 0 ? (
                     <div className="no-results">
                         <p>No products found.</p>
                     </div>
@@ -78,7 +63,7 @@ const AllProducts = () => {
                                 </tr>
                             </thead>
                             <tbody>
-                                {filteredProducts.map((product) => (
+                                {products.map((product) => (
                                     <tr key={product.id}>
                                         <td>{product.id}</td>
                                         <td>{product.name}</td>
@@ -116,6 +101,8 @@ const AllProducts = () => {
                         </table>
                     </div>
                 )}
+
+                <Pager pagination={pagination} onPage={goTo} />
             </div>
         </div>
     );
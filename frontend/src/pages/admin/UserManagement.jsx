@@ -1,35 +1,16 @@
-import { useState, useEffect } from 'react';
+import { useState } from 'react';
 import { userAPI } from '../../services/api';
 import LoadingSpinner from '../../components/common/LoadingSpinner';
 import ErrorMessage from '../../components/common/ErrorMessage';
+import Pager from '../../components/common/Pager';
+import usePagedList from '../../hooks/usePagedList';
 
 const UserManagement = () => {
-    const [users, setUsers] = useState([]);
-    const [loading, setLoading] = useState(true);
-    const [error, setError] = useState(null);
     const [filterRole, setFilterRole] = useState('');
-
-    useEffect(() => {
-        fetchUsers();
-    }, []);
-
-    const fetchUsers = async () => {
-        try {
-            setLoading(true);
-            const response = await userAPI.getUsers();
-            setUsers(response.data);
-            setError(null);
-        } catch (err) {
-            setError('Failed to load users');
-            console.error(err);
-        } finally {
-            setLoading(false);
-        }
-    };
-
-    const filteredUsers = filterRole
-        ? users.filter((user) => user.role === filterRole)
-        : users;
+    const { items: users, setItems: setUsers, pagination, loading, error, goTo, reload } = usePagedList(
+        userAPI.getUsers,
+        { role: filterRole || undefined }
+    );
 
     const handleDeleteUser = async (id) => {
         if (window.confirm('Are you sure you want to delete this user?')) {
@@ -44,7 +25,7 @@ const UserManagement = () => {
     };
 
     if (loading) return <LoadingSpinner />;
-    if (error) return <ErrorMessage message={error} onRetry={fetchUsers} />;
+    if (error) return <ErrorMessage message="Failed to load users" onRetry={reload} />;
 
     return (
         <div className="user-management-page">
@@ -79,7 +60,7 @@ const UserManagement = () => {
                             </tr>
                         </thead>
                         <tbody>
-                            {filteredUsers.map((user) => (
+                            {users.map((user) => (
                                 <tr key={user.id}>
                                     <td>{user.id}</td>
                                     <td>{user.username}</td>
@@ -115,11 +96,13 @@ const UserManagement = () => {
                     </table>
                 </div>
 
-                {filteredUsers.length === 0 && (
+                {users.length === 0 && (
                     <div className="no-results">
                         <p>No users found.</p>
                     </div>
                 )}
+
+                <Pager pagination={pagination} onPage={goTo} />
             </div>
         </div>
     );
@@ -288,10 +288,7 @@ const Checkout = () => {
                 const transactionUuid = `${orderId}-${Date.now()}`; // Unique ID for every attempt
 
                 try {
-                    const allPayments = await paymentAPI.getPayments();
-                    const pendingPayments = allPayments.data.filter(
-                        p => p.order === orderId && p.status === 'pending'
-                    );
+                    const pendingPayments = (await paymentAPI.getPayments({ order: orderId, status: 'pending', page_size: 100 })).data;
 
                     if (pendingPayments.length > 0) {
                         console.log(`Cleaning up ${pendingPayments.length} pending payments for order ${orderId}`);
@@ -1,6 +1,6 @@
 import { useState, useEffect } from 'react';
 import { useParams, Link } from 'react-router-dom';
-import { orderAPI, productAPI } from '../../services/api';
+import { orderAPI } from '../../services/api';
 import LoadingSpinner from '../../components/common/LoadingSpinner';
 import ErrorMessage from '../../components/common/ErrorMessage';
 import ReviewForm from '../../components/reviews/ReviewForm';
@@ -12,7 +12,6 @@ const OrderDetail = () => {
     const [order, setOrder] = useState(null);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState(null);
-    const [products, setProducts] = useState([]);
 
     const [reviewModalOpen, setReviewModalOpen] = useState(false);
     const [selectedItemForReview, setSelectedItemForReview] = useState(null);
@@ -21,12 +20,8 @@ const OrderDetail = () => {
         const fetchData = async () => {
             try {
                 setLoading(true);
-                const [orderRes, productsRes] = await Promise.all([
-                    orderAPI.getOrder(id),
-                    productAPI.getProducts()
-                ]);
+                const orderRes = await orderAPI.getOrder(id);
                 setOrder(orderRes.data);
-                setProducts(productsRes.data);
                 setError(null);
             } catch (err) {
                 setError('Failed to load order details');
@@ -38,21 +33,12 @@ const OrderDetail = () => {
         fetchData();
     }, [id]);
 
-    const getProductDetails = (skuId) => {
-
-        for (const product of products) {
-            const foundSku = product.skus.find(s => s.id === skuId || s.sku_code === skuId);
-            if (foundSku) {
-                return {
-                    name: product.name,
-                    image: foundSku.image || product.image,
-                    sku_code: foundSku.sku_code,
-                    productId: product.id
-                };
-            }
-        }
-        return { name: 'Unknown Product', image: null, sku_code: skuId, productId: null };
-    };
+    const getProductDetails = (item) => ({
+        name: item.product_name,
+        image: item.sku_image || item.product_image,
+        sku_code: item.sku_code,
+        productId: item.product
+    });
 
     const getStatusSteps = () => {
         const steps = ['pending', 'processing', 'shipped', 'delivered'];
@@ -122,7 +108,7 @@ const OrderDetail = () => {
                             <h2>Order Items</h2>
                             <div className="order-items">
                                 {order.order_item && order.order_item.map((item) => {
-                                    const details = getProductDetails(item.sku);
+                                    const details = getProductDetails(item);
                                     return (
                                         <div key={item.id} className="order-item">
                                             {details.image && (
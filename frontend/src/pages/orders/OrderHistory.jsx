@@ -1,39 +1,18 @@
-import { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
 import { orderAPI } from '../../services/api';
-import { useAuth } from '../../context/AuthContext';
-import { toast } from 'react-toastify';
 import LoadingSpinner from '../../components/common/LoadingSpinner';
 import ErrorMessage from '../../components/common/ErrorMessage';
+import Pager from '../../components/common/Pager';
+import usePagedList from '../../hooks/usePagedList';
 import { formatPrice } from '../../utils/currency';
 
 const OrderHistory = () => {
-    const [orders, setOrders] = useState([]);
-    const [loading, setLoading] = useState(true);
-    const [error, setError] = useState(null);
-
-    useEffect(() => {
-        fetchData();
-    }, []);
-
-    const fetchData = async () => {
-        try {
-            setLoading(true);
-            const ordersRes = await orderAPI.getOrders();
-            setOrders(ordersRes.data);
-            setError(null);
-        } catch (err) {
-            setError('Failed to load orders');
-            console.error(err);
-        } finally {
-            setLoading(false);
-        }
-    };
+    const { items: orders, pagination, loading, error, goTo, reload } = usePagedList(orderAPI.getOrders);
 
     const getProductNames = (orderItems) => {
         if (!orderItems || orderItems.length === 0) return 'No items';
 
-        return `${orderItems.length} item${orderItems.length > 1 ? 's' : ''}`;
+        return orderItems.map((item) => item.product_name).join(', ');
     };
 
     const getStatusClass = (status) => {
@@ -48,7 +27,7 @@ const OrderHistory = () => {
     };
 
     if (loading) return <LoadingSpinner />;
-    if (error) return <ErrorMessage message={error} onRetry={fetchData} />;
+    if (error) return <ErrorMessage message="Failed to load orders" onRetry={reload} />;
 
     return (
         <div className="orders-page">
@@ -103,6 +82,8 @@ const OrderHistory = () => {
                         ))}
                     </div>
                 )}
+
+                <Pager pagination={pagination} onPage={goTo} />
             </div>
         </div>
     );
@@ -53,10 +53,7 @@ const PaymentFailure = () => {
         if (!oid) return;
         setLoading(true);
         try {
-            const allPayments = await paymentAPI.getPayments();
-            const pendingPayments = allPayments.data.filter(
-                p => p.order === parseInt(oid) && p.status === 'pending'
-            );
+            const pendingPayments = (await paymentAPI.getPayments({ order: oid, status: 'pending', page_size: 100 })).data;
 
             await Promise.all(pendingPayments.map(p => paymentAPI.deletePayment(p.id)));
 
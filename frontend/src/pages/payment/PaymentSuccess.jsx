@@ -4,6 +4,12 @@ import { paymentAPI, orderAPI } from '../../services/api';
 import LoadingSpinner from '../../components/common/LoadingSpinner';
 import { toast } from 'react-toastify';
 
+// the server settles payments in the background; ask until it has an answer
+const POLL_INTERVAL_MS = 2000;
+const POLL_ATTEMPTS = 15;
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
 const PaymentSuccess = () => {
     const [searchParams] = useSearchParams();
     const navigate = useNavigate();
@@ -39,7 +45,17 @@ const PaymentSuccess = () => {
                     transaction_code: paymentInfo.transaction_code
                 };
 
-                const response = await paymentAPI.verifyEsewa(verificationPayload);
+                let response = await paymentAPI.verifyEsewa(verificationPayload);
+                for (let attempt = 0; response.status === 202 && attempt < POLL_ATTEMPTS; attempt++) {
+                    await sleep(POLL_INTERVAL_MS);
+                    response = await paymentAPI.verifyEsewa(verificationPayload);
+                }
+
+                if (response.status === 202) {
+                    toast.info('Payment is still being confirmed. Your order will update shortly.');
+                    navigate(`/orders/${orderId}`);
+                    return;
+                }
 
                 if (response.data.status === 'Payment Failed') {
                     toast.error('Payment failed. Order has been canceled.');
@@ -74,10 +90,7 @@ const PaymentSuccess = () => {
                     try {
                         console.log('Detected potential duplicate payment crash. Attempting cleanup...');
 
-                        const allPayments = await paymentAPI.getPayments();
-                        const duplicates = allPayments.data.filter(
-                            p => p.order === parseInt(orderId) && p.status === 'pending'
-                        );
+                        const duplicates = (await paymentAPI.getPayments({ order: orderId, status: 'pending', page_size: 100 })).data;
 
                         if (duplicates.length > 1) {
                             console.log(`Found ${duplicates.length} duplicate pending payments. Cleaning up...`);
@@ -3,85 +3,53 @@ import { productAPI, categoryAPI } from '../../services/api';
 import ProductCard from '../../components/products/ProductCard';
 import LoadingSpinner from '../../components/common/LoadingSpinner';
 import ErrorMessage from '../../components/common/ErrorMessage';
+import Pager from '../../components/common/Pager';
+import usePagedList from '../../hooks/usePagedList';
+import { PRODUCT_ORDERING } from '../../utils/ordering';
 
 import './ProductFilters.css';
 
 const ProductList = () => {
-    const [products, setProducts] = useState([]);
     const [categories, setCategories] = useState([]);
-    const [loading, setLoading] = useState(true);
-    const [error, setError] = useState(null);
     const [searchTerm, setSearchTerm] = useState('');
     const [selectedCategory, setSelectedCategory] = useState('');
     const [sortBy, setSortBy] = useState('name-asc');
+    const [minPrice, setMinPrice] = useState('');
+    const [maxPrice, setMaxPrice] = useState('');
+    const [inStock, setInStock] = useState(false);
+    const [selectedAttributes, setSelectedAttributes] = useState([]);
+
+    // search, category (with its subcategories), price, stock and attribute
+    // filters all run on the server; typing is debounced
+    const { items: products, extra, pagination, loading, error, goTo, reload } = usePagedList(
+        productAPI.getFacets,
+        {
+            search: searchTerm || undefined,
+            category: selectedCategory || undefined,
+            min_price: minPrice || undefined,
+            max_price: maxPrice || undefined,
+            in_stock: inStock ? 'true' : undefined,
+            attribute: selectedAttributes.length ? selectedAttributes : undefined,
+            ordering: PRODUCT_ORDERING[sortBy],
+        },
+        searchTerm || minPrice || maxPrice ? 300 : 0
+    );
+    const facets = extra.facets;
 
     useEffect(() => {
-        fetchData();
-    }, [sortBy]); // Re-fetch when sort changes for rating-based sorts
-
-    const fetchData = async () => {
-        try {
-            setLoading(true);
-
-            const orderingParam = sortBy === 'rating-desc' ? '-avg_rating' :
-                sortBy === 'rating-asc' ? 'avg_rating' : null;
-
-            const [productsRes, categoriesRes] = await Promise.all([
-                productAPI.getProducts(orderingParam ? { ordering: orderingParam } : {}),
-                categoryAPI.getCategories(),
-            ]);
-            setProducts(productsRes.data);
-            setCategories(categoriesRes.data);
-            setError(null);
-        } catch (err) {
-            setError('Failed to load products');
-            console.error(err);
-        } finally {
-            setLoading(false);
-        }
+        categoryAPI.getCategories()
+            .then((response) => setCategories(response.data))
+            .catch((err) => console.error(err));
+    }, []);
+
+    const toggleAttribute = (pair) => {
+        setSelectedAttributes((selected) => (
+            selected.includes(pair) ? selected.filter((p) => p !== pair) : [...selected, pair]
+        ));
     };
 
-    const filteredProducts = products
-        .filter((product) => {
-            const searchLower = searchTerm.toLowerCase();
-
-            const matchesSearch = !searchTerm ||
-                product.name.toLowerCase().includes(searchLower) ||
-                product.description.toLowerCase().includes(searchLower) ||
-                (product.category && product.category.toLowerCase().includes(searchLower)) ||
-                (product.parent_category && product.parent_category.toLowerCase().includes(searchLower));
-
-            const matchesCategory = !selectedCategory ||
-                product.category === selectedCategory ||
-                product.parent_category === selectedCategory;
-
-            return matchesSearch && matchesCategory;
-        })
-        .sort((a, b) => {
-            if (sortBy === 'rating-desc' || sortBy === 'rating-asc') {
-                return 0;
-            }
-
-            switch (sortBy) {
-                case 'name-asc':
-                    return a.name.localeCompare(b.name);
-                case 'name-desc':
-                    return b.name.localeCompare(a.name);
-                case 'price-asc':
-                    return Number(a.base_price) - Number(b.base_price);
-                case 'price-desc':
-                    return Number(b.base_price) - Number(a.base_price);
-                case 'stock-asc':
-                    return a.stock - b.stock;
-                case 'stock-desc':
-                    return b.stock - a.stock;
-                default:
-                    return 0;
-            }
-        });
-
     if (loading) return <LoadingSpinner />;
-    if (error) return <ErrorMessage message={error} onRetry={fetchData} />;
+    if (error) return <ErrorMessage message="Failed to load products" onRetry={reload} />;
 
     return (
         <div className="products-page">
@@ -140,6 +108,7 @@ const ProductList = () => {
                                 className="sort-dropdown"
                                 style={{ width: '100%', padding: '0.75rem', borderRadius: '8px', border: '1px solid #ddd' }}
                             >
+                                <option value="relevance">Best Match</option>
                                 <option value="name-asc">Name (A-Z)</option>
                                 <option value="name-desc">Name (Z-A)</option>
                                 <option value="price-asc">Price (Low to High)</option>
@@ -156,23 +125,73 @@ const ProductList = () => {
                 <div className="products-layout-horizontal">
 
                     <div className="products-content">
-                        <div className="products-header">
-                            <p className="results-count">
-                                {filteredProducts.length} {filteredProducts.length === 1 ? 'product' : 'products'} found
-                            </p>
-                        </div>
+                        {facets && (
+                            <div className="facet-panel">
+                                <div className="facet-group">
+                                    <label htmlFor="min-price">Price</label>
+                                    <input
+                                        id="min-price"
+                                        type="number"
+                                        min="0"
+                                        placeholder={facets.price.min_price ?? 'Min'}
+                                        value={minPrice}
+                                        onChange={(e) => setMinPrice(e.target.value)}
+                                        className="price-input"
+                                    />
+                                    <span>–</span>
+                                    <input
+                                        type="number"
+                                        min="0"
+                                        placeholder={facets.price.max_price ?? 'Max'}
+                                        value={maxPrice}
+                                        onChange={(e) => setMaxPrice(e.target.value)}
+                                        className="price-input"
+                                    />
+                                </div>
+
+                                <label className="facet-option">
+                                    <input
+                                        type="checkbox"
+                                        checked={inStock}
+                                        onChange={(e) => setInStock(e.target.checked)}
+                                    />
+                                    In stock ({facets.in_stock})
+                                </label>
+
+                                {Object.entries(facets.attribute).map(([name, values]) => (
+                                    <div key={name} className="facet-group">
+                                        <label>{name}</label>
+                                        {Object.entries(values).map(([value, count]) => {
+                                            const pair = `${name}:${value}`;
+                                            return (
+                                                <label key={pair} className="facet-option">
+                                                    <input
+                                                        type="checkbox"
+                                                        checked={selectedAttributes.includes(pair)}
+                                                        onChange={() => toggleAttribute(pair)}
+                                                    />
+                                                    {value} ({count})
+                                                </label>
+                                            );
+                                        })}
+                                    </div>
+                                ))}
+                            </div>
+                        )}
 
-                        {filteredProducts.length === 0 ? (
+                        {products.length === 0 ? (
                             <div className="no-products">
                                 <p>No products found matching your criteria.</p>
                             </div>
                         ) : (
                             <div className="products-grid">
-                                {filteredProducts.map((product) => (
+                                {products.map((product) => (
                                     <ProductCard key={product.id} product={product} />
                                 ))}
                             </div>
                         )}
+
+                        <Pager pagination={pagination} onPage={goTo} />
                     </div>
                 </div>
             </div>
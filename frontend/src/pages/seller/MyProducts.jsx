@@ -1,41 +1,42 @@
 import { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
-import { productAPI } from '../../services/api';
-import { useAuth } from '../../context/AuthContext';
+import { productAPI, categoryAPI } from '../../services/api';
 import { toast } from 'react-toastify';
 import LoadingSpinner from '../../components/common/LoadingSpinner';
+import Pager from '../../components/common/Pager';
+import usePagedList from '../../hooks/usePagedList';
 import './MyProducts.css';
 import { formatPrice } from '../../utils/currency';
+import { PRODUCT_ORDERING } from '../../utils/ordering';
 
 const MyProducts = () => {
-    const { user } = useAuth();
-    const [products, setProducts] = useState([]);
-    const [loading, setLoading] = useState(true);
     const [searchTerm, setSearchTerm] = useState('');
     const [sortBy, setSortBy] = useState('name-asc');
     const [selectedCategory, setSelectedCategory] = useState('');
+    const [categories, setCategories] = useState([]);
+
+    // the API only lists a seller their own products
+    const {
+        items: products, setItems: setProducts, pagination, loading, error, goTo,
+    } = usePagedList(
+        productAPI.getProducts,
+        {
+            search: searchTerm || undefined,
+            category: selectedCategory || undefined,
+            ordering: PRODUCT_ORDERING[sortBy],
+        },
+        searchTerm ? 300 : 0
+    );
 
     useEffect(() => {
-        fetchProducts();
+        categoryAPI.getCategories()
+            .then((response) => setCategories(response.data.map((category) => category.name).sort()))
+            .catch((err) => console.error('Error fetching categories:', err));
     }, []);
 
-    const fetchProducts = async () => {
-        try {
-            setLoading(true);
-            const response = await productAPI.getProducts();
-            const sellerProducts = response.data.filter(
-                (p) => p.created_by && p.created_by.includes(user.username)
-            );
-            setProducts(sellerProducts);
-        } catch (error) {
-            console.error('Error fetching products:', error);
-            toast.error('Failed to load products');
-        } finally {
-            setLoading(false);
-        }
-    };
-
-    const categories = [...new Set(products.map(p => p.category))].filter(Boolean).sort();
+    useEffect(() => {
+        if (error) toast.error('Failed to load products');
+    }, [error]);
 
     const handleDelete = async (id) => {
         if (!window.confirm('Are you sure you want to delete this product?')) {
@@ -76,31 +77,6 @@ const MyProducts = () => {
         }
     };
 
-    const filteredProducts = products
-        .filter((product) => {
-            const matchesSearch = product.name.toLowerCase().includes(searchTerm.toLowerCase());
-            const matchesCategory = !selectedCategory || product.category === selectedCategory;
-            return matchesSearch && matchesCategory;
-        })
-        .sort((a, b) => {
-            switch (sortBy) {
-                case 'name-asc':
-                    return a.name.localeCompare(b.name);
-                case 'name-desc':
-                    return b.name.localeCompare(a.name);
-                case 'price-asc':
-                    return Number(a.base_price) - Number(b.base_price);
-                case 'price-desc':
-                    return Number(b.base_price) - Number(a.base_price);
-                case 'stock-asc':
-                    return a.stock - b.stock;
-                case 'stock-desc':
-                    return b.stock - a.stock;
-                default:
-                    return 0;
-            }
-        });
-
     if (loading) return <LoadingSpinner />;
 
     return (
@@ -158,7 +134,7 @@ const MyProducts = () => {
                     </div>
                 </div>
 
-                {filteredProducts.length === 0 ? (
+                {products.length === 0 ? (
                     <div className="empty-state">
                         <p>No products found.</p>
                         <Link to="/seller/products/new" className="btn btn-primary">
@@ -181,7 +157,7 @@ const MyProducts = () => {
                                 </tr>
                             </thead>
                             <tbody>
-                                {filteredProducts.map((product) => (
+                                {products.map((product) => (
                                     <tr key={product.id}>
                                         <td>
                                             <div className="product-image-cell">
@@ -245,6 +221,8 @@ const MyProducts = () => {
                         </table>
                     </div>
                 )}
+
+                <Pager pagination={pagination} onPage={goTo} />
             </div>
         </div>
     );
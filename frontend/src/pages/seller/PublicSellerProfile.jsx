@@ -1,48 +1,20 @@
-import { useState, useEffect } from 'react';
 import { useParams } from 'react-router-dom';
 import { productAPI } from '../../services/api';
 import ProductCard from '../../components/products/ProductCard';
 import LoadingSpinner from '../../components/common/LoadingSpinner';
 import ErrorMessage from '../../components/common/ErrorMessage';
+import Pager from '../../components/common/Pager';
+import usePagedList from '../../hooks/usePagedList';
 
 const PublicSellerProfile = () => {
     const { sellerName } = useParams();
-    const [products, setProducts] = useState([]);
-    const [loading, setLoading] = useState(true);
-    const [error, setError] = useState(null);
-
-    useEffect(() => {
-        const fetchSellerProducts = async () => {
-            try {
-                setLoading(true);
-                // Since we don't have a direct "get products by seller" endpoint for public use,
-                // we fetch all products and filter client-side. 
-                // Note: ideally the backend should support ?seller=username filtering.
-                const response = await productAPI.getProducts();
-
-                // The created_by field usually comes as "username (role)" or just "username"
-                // We need to match efficiently.
-                const sellerProducts = response.data.filter(product => {
-                    const createdBy = product.created_by || '';
-                    return createdBy.includes(sellerName);
-                });
-
-                setProducts(sellerProducts);
-            } catch (err) {
-                console.error("Error fetching seller products:", err);
-                setError("Failed to load seller's products");
-            } finally {
-                setLoading(false);
-            }
-        };
-
-        if (sellerName) {
-            fetchSellerProducts();
-        }
-    }, [sellerName]);
+    const { items: products, pagination, loading, error, goTo } = usePagedList(
+        productAPI.getProducts,
+        { seller: sellerName }
+    );
 
     if (loading) return <LoadingSpinner />;
-    if (error) return <ErrorMessage message={error} />;
+    if (error) return <ErrorMessage message="Failed to load seller's products" />;
 
     return (
         <div className="profile-page">
@@ -64,7 +36,7 @@ const PublicSellerProfile = () => {
                         </div>
 
                         <div className="seller-products-section" style={{ marginTop: '2rem' }}>
-                            <h3>Products by {sellerName} ({products.length})</h3>
+                            <h3>Products by {sellerName}</h3>
 
                             {products.length > 0 ? (
                                 <div className="product-grid">
@@ -77,6 +49,8 @@ const PublicSellerProfile = () => {
                                     <p>This seller has no active products listed.</p>
                                 </div>
                             )}
+
+                            <Pager pagination={pagination} onPage={goTo} />
                         </div>
                     </div>
                 </div>
@@ -1,12 +1,11 @@
 import { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
-import { productAPI } from '../../services/api';
-import { useAuth } from '../../context/AuthContext';
+import { analyticsAPI, productAPI } from '../../services/api';
 import { formatPrice } from '../../utils/currency';
 
 const SellerDashboard = () => {
-    const { user } = useAuth();
     const [products, setProducts] = useState([]);
+    const [summary, setSummary] = useState(null);
     const [loading, setLoading] = useState(true);
 
     useEffect(() => {
@@ -15,11 +14,13 @@ const SellerDashboard = () => {
 
     const fetchSellerProducts = async () => {
         try {
-            const response = await productAPI.getProducts();
-            const sellerProducts = response.data.filter(
-                (p) => p.created_by && p.created_by.includes(user.username)
-            );
-            setProducts(sellerProducts);
+            // sellers only get their own products back
+            const [summaryRes, productsRes] = await Promise.all([
+                analyticsAPI.getSummary(),
+                productAPI.getProducts({ ordering: '-created_at', page_size: 5 }),
+            ]);
+            setSummary(summaryRes.data);
+            setProducts(productsRes.data);
         } catch (error) {
             console.error('Error fetching products:', error);
         } finally {
@@ -41,7 +42,7 @@ const SellerDashboard = () => {
                     <div className="stat-card">
                         <div className="stat-icon">📦</div>
                         <div className="stat-info">
-                            <h3>{products.length}</h3>
+                            <h3>{summary ? summary.catalog.products : 0}</h3>
                             <p>Total Products</p>
                         </div>
                     </div>
@@ -49,7 +50,7 @@ const SellerDashboard = () => {
                     <div className="stat-card">
                         <div className="stat-icon">✓</div>
                         <div className="stat-info">
-                            <h3>{products.filter((p) => p.is_active).length}</h3>
+                            <h3>{summary ? summary.catalog.active_products : 0}</h3>
                             <p>Active Products</p>
                         </div>
                     </div>
@@ -57,10 +58,18 @@ const SellerDashboard = () => {
                     <div className="stat-card">
                         <div className="stat-icon">📊</div>
                         <div className="stat-info">
-                            <h3>{products.reduce((sum, p) => sum + p.stock, 0)}</h3>
+                            <h3>{summary ? summary.catalog.stock : 0}</h3>
                             <p>Total Stock</p>
                         </div>
                     </div>
+
+                    <div className="stat-card">
+                        <div className="stat-icon">💰</div>
+                        <div className="stat-info">
+                            <h3>{formatPrice(summary ? summary.totals.revenue : 0)}</h3>
+                            <p>Sales (30 days, {summary ? summary.totals.orders : 0} orders)</p>
+                        </div>
+                    </div>
                 </div>
 
                 <div className="dashboard-section">
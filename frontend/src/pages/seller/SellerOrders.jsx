@@ -1,64 +1,28 @@
 import { useState, useEffect } from 'react';
-import { orderAPI, productAPI } from '../../services/api';
+import { orderAPI } from '../../services/api';
 import { toast } from 'react-toastify';
 import LoadingSpinner from '../../components/common/LoadingSpinner';
+import Pager from '../../components/common/Pager';
+import usePagedList from '../../hooks/usePagedList';
 import { formatPrice } from '../../utils/currency';
 
 const SellerOrders = () => {
-    const [orders, setOrders] = useState([]);
-    const [products, setProducts] = useState([]);
-    const [loading, setLoading] = useState(true);
     const [filterStatus, setFilterStatus] = useState('');
     const [expandedOrder, setExpandedOrder] = useState(null);
+    const { items: orders, pagination, loading, error, goTo, reload } = usePagedList(
+        orderAPI.getOrders,
+        { status: filterStatus || undefined }
+    );
 
     useEffect(() => {
-        fetchData();
-    }, []);
-
-    const fetchData = async () => {
-        try {
-            setLoading(true);
-            const [ordersRes, productsRes] = await Promise.all([
-                orderAPI.getOrders(),
-                productAPI.getProducts()
-            ]);
-            setOrders(ordersRes.data);
-            setProducts(productsRes.data);
-        } catch (error) {
-            console.error('Error fetching data:', error);
-            toast.error('Failed to load orders');
-        } finally {
-            setLoading(false);
-        }
-    };
-
-    const fetchOrders = async () => {
-        try {
-            const response = await orderAPI.getOrders();
-            setOrders(response.data);
-        } catch (error) {
-            console.error('Error fetching orders:', error);
-        }
-    };
-
-    const getProductDetails = (skuId) => {
-        for (const product of products) {
-            const foundSku = product.skus.find(s => s.id === skuId || s.sku_code === skuId);
-            if (foundSku) {
-                return {
-                    name: product.name,
-                    sku_code: foundSku.sku_code
-                };
-            }
-        }
-        return { name: 'Unknown Product', sku_code: skuId };
-    };
+        if (error) toast.error('Failed to load orders');
+    }, [error]);
 
     const handleStatusUpdate = async (orderId, newStatus) => {
         try {
             await orderAPI.updateOrder(orderId, { status: newStatus });
             toast.success('Order status updated');
-            fetchOrders();
+            reload();
         } catch (error) {
             console.error('Update error:', error);
             const errorMessage = error.response?.data?.error || 'Failed to update order status';
@@ -66,10 +30,6 @@ const SellerOrders = () => {
         }
     };
 
-    const filteredOrders = filterStatus
-        ? orders.filter((order) => order.status === filterStatus)
-        : orders;
-
     const getNextStatus = (currentStatus) => {
         const flow = ['pending', 'processing', 'shipped'];
         const currentIndex = flow.indexOf(currentStatus);
@@ -102,13 +62,13 @@ const SellerOrders = () => {
                     </select>
                 </div>
 
-                {filteredOrders.length === 0 ? (
+                {orders.length === 0 ? (
                     <div className="no-results">
                         <p>No orders found.</p>
                     </div>
                 ) : (
                     <div className="orders-list">
-                        {filteredOrders.map((order) => (
+                        {orders.map((order) => (
                             <div key={order.id} className="order-card-admin">
                                 <div className="order-header" onClick={() => setExpandedOrder(expandedOrder === order.id ? null : order.id)}>
                                     <div className="order-info">
@@ -134,19 +94,16 @@ const SellerOrders = () => {
 
                                         <div className="order-section">
                                             <h4>Order Items</h4>
-                                            {order.order_item && order.order_item.map((item) => {
-                                                const details = getProductDetails(item.sku);
-                                                return (
-                                                    <div key={item.id} className="order-item-row">
-                                                        <div className="item-info-col">
-                                                            <span className="item-name-bold">{details.name}</span>
-                                                            <span className="item-sku-small">SKU: {details.sku_code}</span>
-                                                        </div>
-                                                        <span>Qty: {item.quantity_at_purchase}</span>
-                                                        <span>{formatPrice(item.price_at_purchase)}</span>
+                                            {order.order_item && order.order_item.map((item) => (
+                                                <div key={item.id} className="order-item-row">
+                                                    <div className="item-info-col">
+                                                        <span className="item-name-bold">{item.product_name}</span>
+                                                        <span className="item-sku-small">SKU: {item.sku_code}</span>
                                                     </div>
-                                                );
-                                            })}
+                                                    <span>Qty: {item.quantity_at_purchase}</span>
+                                                    <span>{formatPrice(item.price_at_purchase)}</span>
+                                                </div>
+                                            ))}
                                         </div>
 
                                         <div className="order-section">
@@ -195,6 +152,8 @@ const SellerOrders = () => {
                         ))}
                     </div>
                 )}
+
+                <Pager pagination={pagination} onPage={goTo} />
             </div>
         </div>
     );
@@ -5,6 +5,8 @@ const api = axios.create({
     headers: {
         'Content-Type': 'application/json',
     },
+    // repeat keys for lists (attribute=a&attribute=b), as the API expects
+    paramsSerializer: { indexes: null },
 });
 
 api.interceptors.request.use(
@@ -20,8 +22,28 @@ api.interceptors.request.use(
     }
 );
 
+// The cursor of a next/previous link: null when there is no such page,
+// '' for the first page.
+const cursorOf = (link) => {
+    if (!link) return null;
+    return new URL(link, window.location.origin).searchParams.get('cursor') || '';
+};
+
 api.interceptors.response.use(
-    (response) => response,
+    (response) => {
+        // List endpoints are cursor paginated; keep `data` as the array the
+        // pages expect and expose the cursors alongside it, to be sent back
+        // as the `cursor` param (see Pager). Anything else sent with the
+        // page, like product facets, ends up in `extra`.
+        const data = response.data;
+        if (data && Array.isArray(data.results) && 'next' in data) {
+            const { results, next, previous, ...extra } = data;
+            response.pagination = { next: cursorOf(next), previous: cursorOf(previous) };
+            response.extra = extra;
+            response.data = results;
+        }
+        return response;
+    },
     async (error) => {
         const originalRequest = error.config;
 
@@ -54,6 +76,26 @@ api.interceptors.response.use(
     }
 );
 
+// Every page of a list, for the few places that need all of it at once.
+const fetchAllPages = async (url, params = {}) => {
+    const rows = [];
+    let cursor;
+    do {
+        const response = await api.get(url, { params: { ...params, page_size: 100, cursor } });
+        rows.push(...response.data);
+        cursor = response.pagination?.next;
+    } while (cursor);
+    return { data: rows };
+};
+
+// One key per logical request; the 401 retry above resends the same config,
+// so the server recognises the repeat and replays the first response.
+const idempotent = () => ({
+    headers: {
+        'Idempotency-Key': crypto.randomUUID(),
+    },
+});
+
 export const authAPI = {
     login: (credentials) => api.post('/gettoken/', credentials),
     register: (userData) => api.post('/register/', userData),
@@ -63,7 +105,7 @@ export const authAPI = {
 };
 
 export const userAPI = {
-    getUsers: () => api.get('/user/'),
+    getUsers: (params = {}) => api.get('/user/', { params }),
     getUser: (id) => api.get(`/user/${id}/`),
     updateUser: (id, data) => {
         const formData = new FormData();
@@ -88,14 +130,9 @@ export const categoryAPI = {
 };
 
 export const productAPI = {
-    getProducts: (params = {}) => {
-        const queryParams = new URLSearchParams();
-        if (params.ordering) {
-            queryParams.append('ordering', params.ordering);
-        }
-        const queryString = queryParams.toString();
-        return api.get(`/product/${queryString ? `?${queryString}` : ''}`);
-    },
+    getProducts: (params = {}) => api.get('/product/', { params }),
+    // a page of products plus the counts for each filter, see ProductFacetFilter
+    getFacets: (params = {}) => api.get('/product/facets/', { params }),
     getProduct: (id) => api.get(`/product/${id}/`),
     createProduct: (data) => {
         const formData = new FormData();
@@ -183,14 +220,28 @@ export const productAPI = {
 };
 
 export const orderAPI = {
-    getOrders: () => api.get('/order/'),
+    getOrders: (params = {}) => api.get('/order/', { params }),
     getOrder: (id) => api.get(`/order/${id}/`),
-    createOrder: (data) => api.post('/order/', data),
+    createOrder: (data) => api.post('/order/', data, idempotent()),
     updateOrder: (id, data) => api.patch(`/order/${id}/`, data),
     deleteOrder: (id) => api.delete(`/order/${id}/`),
     applyCoupon: (data) => api.post('/order/apply_coupon/', data),
 };
 
+export const cartAPI = {
+    getCart: () => api.get('/cart/'),
+    setItem: (sku, quantity) => api.post('/cart/items/', { sku, quantity }),
+    setCoupon: (code) => api.post('/cart/coupon/', { code }),
+    setCountry: (country) => api.post('/cart/country/', { country }),
+    checkout: (data) => api.post('/cart/checkout/', data, idempotent()),
+};
+
+export const analyticsAPI = {
+    getSummary: (params = {}) => api.get('/dashboard/summary/', { params }),
+    getSeries: (params = {}) => api.get('/dashboard/series/', { params }),
+    getTopProducts: (params = {}) => api.get('/dashboard/products/', { params }),
+};
+
 export const shippingAPI = {
     getShippingZones: () => api.get('/shippingzone/'),
     getShippingZone: (id) => api.get(`/shippingzone/${id}/`),
@@ -203,21 +254,21 @@ export const shippingAPI = {
 };
 
 export const reviewAPI = {
-    getReviews: () => api.get('/review/'),
+    getReviews: (params = {}) => api.get('/review/', { params }),
     createReview: (data) => api.post('/review/', data),
     updateReview: (id, data) => api.patch(`/review/${id}/`, data),
     deleteReview: (id) => api.delete(`/review/${id}/`),
 };
 
 export const paymentAPI = {
-    getPayments: () => api.get('/payment/'),
+    getPayments: (params = {}) => api.get('/payment/', { params }),
     deletePayment: (id) => api.delete(`/payment/${id}/`),
     verifyEsewa: (data) => api.post('/payment/verify_esewa/', data),
-    createPayment: (data) => api.post('/payment/', data),
+    createPayment: (data) => api.post('/payment/', data, idempotent()),
 };
 
 export const chatAPI = {
-    getConversations: () => api.get('/chats/'),
+    getConversations: () => fetchAllPages('/chats/'),
     startConversation: (product_id) => api.post('/chats/', { product_id }),
     getMessages: (id) => api.get(`/chats/${id}/message/`),
     sendMessage: (id, content) => api.post(`/chats/${id}/send_message/`, { content }),
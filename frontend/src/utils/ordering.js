@@ -0,0 +1,11 @@
+// The sort options of the product pages as the API's `ordering` param.
+export const PRODUCT_ORDERING = {
+    'name-asc': 'name',
+    'name-desc': '-name',
+    'price-asc': 'base_price',
+    'price-desc': '-base_price',
+    'rating-desc': '-avg_rating',
+    'rating-asc': 'avg_rating',
+    'stock-asc': 'stock',
+    'stock-desc': '-stock',
+};
@@ -1,7 +1,7 @@
 from django.contrib import admin
-from shipping.models import ShippingZone,GlobalShippingrate
+from shipping.models import ShippingZone,GlobalShippingrate,ShippingRateTier
 
 # Register your models here.
 admin.site.register(ShippingZone)
 admin.site.register(GlobalShippingrate)
-
+admin.site.register(ShippingRateTier)
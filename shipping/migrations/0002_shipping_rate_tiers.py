@@ -0,0 +1,37 @@
+# Generated by Django 6.0.1 on 2026-10-18 03:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipping', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='globalshippingrate',
+            name='free_shipping_threshold',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='shippingzone',
+            name='free_shipping_threshold',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.CreateModel(
+            name='ShippingRateTier',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('min_weight', models.DecimalField(decimal_places=3, max_digits=8)),
+                ('rate', models.DecimalField(decimal_places=2, max_digits=7)),
+                ('zone', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tiers', to='shipping.shippingzone')),
+            ],
+            options={
+                'ordering': ['zone', 'min_weight'],
+                'unique_together': {('zone', 'min_weight')},
+            },
+        ),
+    ]
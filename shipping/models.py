@@ -3,6 +3,7 @@ from decimal import Decimal
 class ShippingZone(models.Model):
     country_name=models.CharField(max_length=100, unique=True)
     rate=models.DecimalField(max_digits=7,decimal_places=2)
+    free_shipping_threshold=models.DecimalField(max_digits=10,decimal_places=2,null=True,blank=True)
 
 
     def __str__(self):
@@ -10,12 +11,23 @@ class ShippingZone(models.Model):
 
 class GlobalShippingrate(models.Model):
     base_rate=models.DecimalField(max_digits=7,decimal_places=2,default=Decimal(250.00))
+    free_shipping_threshold=models.DecimalField(max_digits=10,decimal_places=2,null=True,blank=True)
 
 
     def __str__(self):
         return f"Rest of the world rate:{self.base_rate}"
-    
 
-    
 
- 
+class ShippingRateTier(models.Model):
+    # from min_weight kg upwards a parcel costs `rate`; below the first tier
+    # the zone's flat rate applies. No zone means rest of the world.
+    zone=models.ForeignKey(ShippingZone,on_delete=models.CASCADE,null=True,blank=True,related_name='tiers')
+    min_weight=models.DecimalField(max_digits=8,decimal_places=3)
+    rate=models.DecimalField(max_digits=7,decimal_places=2)
+
+    class Meta:
+        unique_together=('zone','min_weight')
+        ordering=['zone','min_weight']
+
+    def __str__(self):
+        return f"{self.zone or 'Rest of the world'} from {self.min_weight}kg:{self.rate}"
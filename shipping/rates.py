@@ -0,0 +1,85 @@
+from bisect import bisect_right
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+
+from EMarket.cache import ProcessCache
+from shipping.models import GlobalShippingrate, ShippingRateTier, ShippingZone
+
+DEFAULT_COUNTRY='Nepal'
+FALLBACK_RATE=Decimal('200.00')
+FREE=Decimal('0.00')
+# cm³ that count as one kg when a parcel is bulkier than it is heavy
+VOLUMETRIC_DIVISOR=Decimal(getattr(settings,'SHIPPING_VOLUMETRIC_DIVISOR',5000))
+
+
+def normalise_country(name):
+    return ' '.join((name or DEFAULT_COUNTRY).split()).casefold()
+
+
+class RateRule:
+    """
+    Pricing for one destination compiled into parallel lists: sorted weight
+    breakpoints and the rate from each breakpoint up. Pricing a parcel is a
+    bisect over the breakpoints, the flat rate sits at breakpoint 0.
+    """
+    __slots__=('breakpoints','rates','free_threshold')
+
+    def __init__(self, base_rate, tiers=(), free_threshold=None):
+        tiers=sorted(tiers)
+        self.breakpoints=[Decimal(0)]+[min_weight for min_weight,_ in tiers]
+        self.rates=[base_rate]+[rate for _,rate in tiers]
+        self.free_threshold=free_threshold
+
+    def price(self, weight=0, subtotal=None):
+        if self.free_threshold is not None and subtotal is not None and subtotal>=self.free_threshold:
+            return FREE
+        return self.rates[max(bisect_right(self.breakpoints,weight)-1,0)]
+
+
+def _load_rates():
+    tiers=defaultdict(list)
+    for zone_id,min_weight,rate in ShippingRateTier.objects.values_list('zone_id','min_weight','rate'):
+        tiers[zone_id].append((min_weight,rate))
+    zones={}
+    for pk,country_name,rate,free_threshold in ShippingZone.objects.order_by('pk').values_list(
+        'pk','country_name','rate','free_shipping_threshold'
+    ):
+        zones.setdefault(normalise_country(country_name),RateRule(rate,tiers[pk],free_threshold))
+    base_rate,free_threshold=(
+        GlobalShippingrate.objects.order_by('pk').values_list('base_rate','free_shipping_threshold').first()
+        or (FALLBACK_RATE,None)
+    )
+    return {'zones':zones,'default':RateRule(base_rate,tiers[None],free_threshold)}
+
+
+# normalised country name -> RateRule plus the rest of the world rule,
+# rebuilt whenever a zone, tier or the global rate changes anywhere
+rate_table=ProcessCache('shipping-rates',_load_rates)
+
+
+def chargeable_weight(lines):
+    """Billable kg for (sku, quantity) lines: actual or volumetric, whichever is more."""
+    weight=volume=Decimal(0)
+    for sku,quantity in lines:
+        weight+=sku.weight*quantity
+        volume+=sku.length*sku.width*sku.height*quantity
+    return max(weight,volume/VOLUMETRIC_DIVISOR)
+
+
+def shipping_rate(country_name, weight=0, subtotal=None):
+    rates=rate_table.get()
+    return rates['zones'].get(normalise_country(country_name),rates['default']).price(weight,subtotal)
+
+
+def quote(countries, weight=0, subtotal=None):
+    """Shipping cost of one parcel to each destination, without touching the database."""
+    rates=rate_table.get()
+    return [
+        {
+            'country':country,
+            'shipping_cost':rates['zones'].get(normalise_country(country),rates['default']).price(weight,subtotal),
+        }
+        for country in countries
+    ]
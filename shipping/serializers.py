@@ -1,5 +1,8 @@
+from rest_framework import serializers
 from rest_framework.serializers import ModelSerializer
-from shipping.models import ShippingZone,GlobalShippingrate
+from Products.models import ProductSKU
+from shipping.models import ShippingZone,GlobalShippingrate,ShippingRateTier
+from shipping.rates import chargeable_weight
 
 
 
@@ -13,3 +16,44 @@ class GlobalShippingrateSerializer(ModelSerializer):
     class Meta:
        model=GlobalShippingrate
        fields='__all__'
+
+
+class ShippingRateTierSerializer(ModelSerializer):
+    class Meta:
+       model=ShippingRateTier
+       fields='__all__'
+
+
+class ShippingQuoteItemSerializer(serializers.Serializer):
+    sku=serializers.IntegerField()
+    quantity=serializers.IntegerField(min_value=1)
+
+
+class ShippingQuoteSerializer(serializers.Serializer):
+    countries=serializers.ListField(
+        child=serializers.CharField(max_length=100),allow_empty=False,max_length=250
+    )
+    items=ShippingQuoteItemSerializer(many=True,required=False,max_length=1000)
+    weight=serializers.DecimalField(max_digits=10,decimal_places=3,min_value=0,required=False)
+    subtotal=serializers.DecimalField(max_digits=12,decimal_places=2,min_value=0,required=False)
+
+    def validate(self, data):
+        # a cart is priced from its SKUs in one query; weight and subtotal
+        # can also be sent directly for an estimate without any
+        items=data.pop('items',None)
+        if items:
+            skus=ProductSKU.objects.only('price','weight','length','width','height').in_bulk(
+                {item['sku'] for item in items}
+            )
+            missing=sorted({item['sku'] for item in items}-set(skus))
+            if missing:
+                raise serializers.ValidationError({'items':f'unknown sku {missing}'})
+            lines=[(skus[item['sku']],item['quantity']) for item in items]
+            data.setdefault('weight',chargeable_weight(lines))
+            data.setdefault('subtotal',sum(sku.price*quantity for sku,quantity in lines))
+        return data
+
+
+class ShippingQuoteLineSerializer(serializers.Serializer):
+    country=serializers.CharField()
+    shipping_cost=serializers.DecimalField(max_digits=7,decimal_places=2)
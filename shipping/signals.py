@@ -0,0 +1,14 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from shipping.models import GlobalShippingrate, ShippingRateTier, ShippingZone
+from shipping.rates import rate_table
+
+
+@receiver(post_save,sender=ShippingZone)
+@receiver(post_delete,sender=ShippingZone)
+@receiver(post_save,sender=ShippingRateTier)
+@receiver(post_delete,sender=ShippingRateTier)
+@receiver(post_save,sender=GlobalShippingrate)
+@receiver(post_delete,sender=GlobalShippingrate)
+def invalidate_rates(sender, **kwargs):
+    rate_table.invalidate()
@@ -1,3 +1,131 @@
+from decimal import Decimal
+
 from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from Products.models import Category, Product, ProductSKU
+from shipping.models import GlobalShippingrate, ShippingRateTier, ShippingZone
+from shipping.rates import chargeable_weight, rate_table, shipping_rate
+from Users.models import User
+
+
+class ShippingRateTableTest(TestCase):
+    def setUp(self):
+        rate_table.invalidate()
+
+    def test_lookup_is_normalised_and_falls_back(self):
+        ShippingZone.objects.create(country_name='United  States', rate=Decimal('900.00'))
+        self.assertEqual(shipping_rate(' united states '), Decimal('900.00'))
+        self.assertEqual(shipping_rate('Mars'), Decimal('200.00'))
+        GlobalShippingrate.objects.create(base_rate=Decimal('350.00'))
+        self.assertEqual(shipping_rate('Mars'), Decimal('350.00'))
+
+    def test_writes_invalidate_the_table(self):
+        zone = ShippingZone.objects.create(country_name='Nepal', rate=Decimal('100.00'))
+        self.assertEqual(shipping_rate(None), Decimal('100.00'))
+        with self.assertNumQueries(0):
+            shipping_rate('nepal')
+        zone.rate = Decimal('150.00')
+        zone.save()
+        self.assertEqual(shipping_rate('Nepal'), Decimal('150.00'))
+        zone.delete()
+        self.assertEqual(shipping_rate('Nepal'), Decimal('200.00'))
+
+
+class ShippingQuoteTest(APITestCase):
+    def setUp(self):
+        ShippingZone.objects.create(country_name='Nepal', rate=Decimal('100.00'))
+        ShippingZone.objects.create(country_name='India', rate=Decimal('300.00'))
+
+    def test_quote_many_destinations_from_cache(self):
+        self.client.post('/shippingzone/quote/', {'countries': ['Nepal']}, format='json')
+        # only the shared cache stamps are read
+        with self.assertNumQueries(1):
+            response = self.client.post(
+                '/shippingzone/quote/', {'countries': ['nepal', 'INDIA', 'Japan']}, format='json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['shipping_cost'] for row in response.data], ['100.00', '300.00', '200.00'])
+
+    def test_zones_are_listed_whole(self):
+        admin = User.objects.create_user(username='admin', password='password123', role='admin', is_staff=True)
+        self.client.force_authenticate(user=admin)
+        for i in range(30):
+            ShippingZone.objects.create(country_name=f'Country {i}', rate=Decimal('50.00'))
+        response = self.client.get('/shippingzone/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 32)
+
+    def test_zone_writes_stay_admin_only(self):
+        customer = User.objects.create_user(username='customer', password='password123', role='customer')
+        self.client.force_authenticate(user=customer)
+        response = self.client.post('/shippingzone/', {'country_name': 'Japan', 'rate': '500.00'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.client.post('/shippingzone/quote/', {}, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TieredShippingTest(APITestCase):
+    def setUp(self):
+        rate_table.invalidate()
+        self.nepal = ShippingZone.objects.create(
+            country_name='Nepal', rate=Decimal('100.00'), free_shipping_threshold=Decimal('5000.00')
+        )
+        for min_weight, rate in (('5', '400.00'), ('1', '150.00'), ('20', '1200.00')):
+            ShippingRateTier.objects.create(zone=self.nepal, min_weight=Decimal(min_weight), rate=Decimal(rate))
+        ShippingRateTier.objects.create(zone=None, min_weight=Decimal('2'), rate=Decimal('900.00'))
+        seller = User.objects.create_user(username='seller', password='password123', role='seller')
+        product = Product.objects.create(
+            name='Kettle', category=Category.objects.create(name='Kitchen'), created_by=seller, base_price=100, stock=0
+        )
+        self.heavy = ProductSKU.objects.create(
+            product=product, sku_code='HEAVY', price=Decimal('1000.00'), stock=10, weight=Decimal('3.000')
+        )
+        # 50x40x30 cm and light, bills as 12 kg
+        self.bulky = ProductSKU.objects.create(
+            product=product, sku_code='BULKY', price=Decimal('100.00'), stock=10,
+            weight=Decimal('0.500'), length=50, width=40, height=30,
+        )
+
+    def test_breakpoints(self):
+        for weight, rate in (('0', '100.00'), ('0.999', '100.00'), ('1', '150.00'), ('4.5', '150.00'),
+                             ('5', '400.00'), ('19.99', '400.00'), ('250', '1200.00')):
+            self.assertEqual(shipping_rate('Nepal', Decimal(weight)), Decimal(rate))
+        self.assertEqual(shipping_rate('Japan', Decimal('1')), Decimal('200.00'))
+        self.assertEqual(shipping_rate('Japan', Decimal('2')), Decimal('900.00'))
+        self.assertEqual(shipping_rate('Nepal', Decimal('50'), Decimal('5000.00')), Decimal('0.00'))
+
+    def test_volumetric_weight(self):
+        self.assertEqual(chargeable_weight([(self.heavy, 2)]), Decimal('6.000'))
+        self.assertEqual(chargeable_weight([(self.bulky, 1), (self.heavy, 1)]), Decimal('12'))
+
+    def test_quote_prices_a_cart(self):
+        response = self.client.post('/shippingzone/quote/', {
+            'countries': ['Nepal', 'Japan'],
+            'items': [{'sku': self.bulky.id, 'quantity': 1}],
+        }, format='json')
+        self.assertEqual([row['shipping_cost'] for row in response.data], ['400.00', '900.00'])
+        response = self.client.post('/shippingzone/quote/', {
+            'countries': ['Nepal'], 'items': [{'sku': self.heavy.id, 'quantity': 5}],
+        }, format='json')
+        self.assertEqual(response.data[0]['shipping_cost'], '0.00')
+        response = self.client.post('/shippingzone/quote/', {
+            'countries': ['Nepal'], 'items': [{'sku': 0, 'quantity': 1}],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        with self.assertNumQueries(0):
+            response = self.client.post('/shippingzone/quote/', {
+                'countries': ['Nepal'], 'items': [{'sku': self.heavy.id, 'quantity': 1}] * 1001,
+            }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
-# Create your tests here.
+    def test_checkout_pays_by_weight(self):
+        customer = User.objects.create_user(username='customer', password='password123', role='customer')
+        self.client.force_authenticate(user=customer)
+        response = self.client.post('/order/', {
+            'full_name': 'Test Customer', 'email': 'customer@example.com',
+            'address': 'Street 1', 'city': 'Kathmandu', 'postal_code': '44600', 'country': 'Nepal',
+            'order_item': [{'sku': self.heavy.id, 'quantity_at_purchase': 2}],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['shipping_cost'], '400.00')
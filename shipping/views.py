@@ -1,21 +1,42 @@
 from django.shortcuts import render
 from rest_framework import viewsets
-from shipping.models import ShippingZone,GlobalShippingrate
-from shipping.serializers import ShippingZoneSerializer,GlobalShippingrateSerializer
+from shipping.models import ShippingZone,GlobalShippingrate,ShippingRateTier
+from shipping.serializers import ShippingZoneSerializer,GlobalShippingrateSerializer,ShippingRateTierSerializer,ShippingQuoteSerializer,ShippingQuoteLineSerializer
 from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework.permissions import IsAdminUser 
+from rest_framework.permissions import AllowAny,IsAdminUser 
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from shipping.rates import quote
 
 # Create your views here.
 class ShippingZoneViewset(viewsets.ModelViewSet):
     queryset=ShippingZone.objects.all()
     serializer_class=ShippingZoneSerializer
+    # a short admin table, listed whole
+    pagination_class=None
     authentication_classes=[JWTAuthentication]
     permission_classes=[IsAdminUser]
 
+    def get_permissions(self):
+        if self.action=='quote':
+            return [AllowAny()]
+        return super().get_permissions()
+
+    @action(detail=False,methods=['post'])
+    def quote(self,request):
+        # priced from the in-memory rate table, no queries per destination
+        serializer=ShippingQuoteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data=serializer.validated_data
+        lines=quote(data['countries'],data.get('weight',0),data.get('subtotal'))
+        return Response(ShippingQuoteLineSerializer(lines,many=True).data)
+
 
 class GlobalShippingSerializerViewset(viewsets.ModelViewSet):
     queryset=GlobalShippingrate.objects.all()
     serializer_class=GlobalShippingrateSerializer 
+    # a short admin table, listed whole
+    pagination_class=None
     authentication_classes=[JWTAuthentication]
     permission_classes=[IsAdminUser]   
 
@@ -25,3 +46,11 @@ class GlobalShippingSerializerViewset(viewsets.ModelViewSet):
         obj, created = GlobalShippingrate.objects.get_or_create(id=1)
         return obj
 
+
+class ShippingRateTierViewset(viewsets.ModelViewSet):
+    queryset=ShippingRateTier.objects.all()
+    serializer_class=ShippingRateTierSerializer
+    # a short admin table, listed whole
+    pagination_class=None
+    authentication_classes=[JWTAuthentication]
+    permission_classes=[IsAdminUser]
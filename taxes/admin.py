@@ -0,0 +1,5 @@
+from django.contrib import admin
+from taxes.models import TaxRate
+
+# Register your models here.
+admin.site.register(TaxRate)
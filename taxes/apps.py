@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+
+class TaxesConfig(AppConfig):
+    name = 'taxes'
+
+    def ready(self):
+        from taxes import signals  # noqa: F401
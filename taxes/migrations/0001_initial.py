@@ -0,0 +1,28 @@
+# Generated by Django 6.0.1 on 2026-10-18 03:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('Products', '0018_sku_shipping_dimensions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaxRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('country_name', models.CharField(blank=True, max_length=100)),
+                ('rate', models.DecimalField(decimal_places=4, max_digits=5)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tax_rates', to='Products.category')),
+            ],
+            options={
+                'unique_together': {('country_name', 'category')},
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 6.0.1 on 2026-10-18 04:48
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+def drop_duplicate_catch_alls(apps, schema_editor):
+    # the old unique_together let NULL categories repeat; keep the first
+    # rule, the one the rate table was using
+    TaxRate = apps.get_model('taxes', 'TaxRate')
+    earlier = TaxRate.objects.filter(
+        country_name=OuterRef('country_name'), category__isnull=True, pk__lt=OuterRef('pk')
+    )
+    TaxRate.objects.filter(Exists(earlier), category__isnull=True).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Products', '0018_sku_shipping_dimensions'),
+        ('taxes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_catch_alls, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='taxrate',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='taxrate',
+            constraint=models.UniqueConstraint(fields=('country_name', 'category'), name='taxrate_country_category_unique', nulls_distinct=False),
+        ),
+    ]
@@ -0,0 +1,21 @@
+from django.db import models
+from Products.models import Category
+
+
+class TaxRate(models.Model):
+    # a blank country applies everywhere and no category applies to every
+    # category; the most specific rule wins, see taxes.rates
+    country_name=models.CharField(max_length=100,blank=True)
+    category=models.ForeignKey(Category,on_delete=models.CASCADE,null=True,blank=True,related_name='tax_rates')
+    rate=models.DecimalField(max_digits=5,decimal_places=4)
+
+    class Meta:
+        constraints=[
+            # one catch-all rule per country too, NULL categories included
+            models.UniqueConstraint(
+                fields=['country_name','category'],nulls_distinct=False,name='taxrate_country_category_unique'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.country_name or 'Everywhere'}/{self.category or 'all'}:{self.rate}"
@@ -0,0 +1,96 @@
+from collections import defaultdict
+from decimal import ROUND_HALF_UP, Decimal
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from EMarket.cache import ProcessCache
+from Products.models import Category
+from shipping.rates import normalise_country
+from taxes.models import TaxRate
+
+DEFAULT_RATE=Decimal(str(getattr(settings,'DEFAULT_TAX_RATE','0.13')))
+ZERO=Decimal('0.00')
+CENT=Decimal('0.01')
+EVERYWHERE=''
+
+
+class RateTable:
+    """
+    Tax rules keyed on (normalised country, category id). A lookup tries the
+    country first, then the rules that apply everywhere; within each it walks
+    from the category up through its parents to the catch-all rule. Answers
+    are memoised, so after warm up a line costs one dict hit; countries
+    without rules of their own share the EVERYWHERE answers, so the memo
+    stays as small as the table whatever countries clients send.
+    """
+
+    def __init__(self, rules, parents):
+        self.rules=rules
+        self.parents=parents
+        self.countries={scope for scope,_ in rules}
+        self._resolved={}
+
+    def _resolve(self, country, category_id):
+        for scope in (country,EVERYWHERE):
+            current=category_id
+            seen=set()
+            while current is not None and current not in seen:
+                seen.add(current)
+                if (scope,current) in self.rules:
+                    return self.rules[scope,current]
+                current=self.parents.get(current)
+            if (scope,None) in self.rules:
+                return self.rules[scope,None]
+        return DEFAULT_RATE
+
+    def rate(self, country_name, category_id=None):
+        country=normalise_country(country_name)
+        key=(country if country in self.countries else EVERYWHERE,category_id)
+        rate=self._resolved.get(key)
+        if rate is None:
+            rate=self._resolved[key]=self._resolve(*key)
+        return rate
+
+
+def _load_rates():
+    rules={}
+    for country_name,category_id,rate in TaxRate.objects.order_by('pk').values_list('country_name','category_id','rate'):
+        scope=normalise_country(country_name) if country_name.strip() else EVERYWHERE
+        rules.setdefault((scope,category_id),rate)
+    parents=dict(Category.objects.filter(parent__isnull=False).values_list('id','parent_id'))
+    return RateTable(rules,parents)
+
+
+# rebuilt whenever a tax rate or the category tree changes anywhere
+tax_table=ProcessCache('tax-rates',_load_rates)
+
+
+class RateTableTaxEngine:
+    """
+    Default engine. Lines are bucketed by the rate that applies to them and
+    each bucket is taxed and rounded (half up, to the cent) once, so a large
+    cart costs one multiplication per distinct rate and the same lines give
+    the same tax in whatever order they come.
+    """
+
+    def quote(self, country_name, lines):
+        table=tax_table.get()
+        buckets=defaultdict(Decimal)
+        for category_id,amount in lines:
+            buckets[table.rate(country_name,category_id)]+=amount
+        return sum(
+            ((amount*rate).quantize(CENT,rounding=ROUND_HALF_UP) for rate,amount in buckets.items()),
+            ZERO
+        )
+
+
+@lru_cache(maxsize=None)
+def tax_engine():
+    return import_string(getattr(settings,'TAX_ENGINE','taxes.rates.RateTableTaxEngine'))()
+
+
+def quote_tax(country_name, lines):
+    """Tax on (category_id, amount) `lines` shipped to `country_name`."""
+    return tax_engine().quote(country_name,lines)
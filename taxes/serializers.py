@@ -0,0 +1,47 @@
+from decimal import Decimal
+
+from rest_framework import serializers
+from rest_framework.serializers import ModelSerializer
+from Products.models import ProductSKU
+from taxes.models import TaxRate
+
+
+class TaxRateSerializer(ModelSerializer):
+    class Meta:
+        model=TaxRate
+        fields='__all__'
+
+    def validate_rate(self, value):
+        if not Decimal(0)<=value<Decimal(1):
+            raise serializers.ValidationError('rate is a fraction, e.g. 0.13 for 13%')
+        return value
+
+
+class TaxQuoteItemSerializer(serializers.Serializer):
+    sku=serializers.IntegerField()
+    quantity=serializers.IntegerField(min_value=1)
+
+
+class TaxQuoteSerializer(serializers.Serializer):
+    countries=serializers.ListField(
+        child=serializers.CharField(max_length=100),allow_empty=False,max_length=250
+    )
+    items=TaxQuoteItemSerializer(many=True,allow_empty=False,max_length=1000)
+
+    def validate(self, data):
+        # every SKU of the cart in one query, priced with its category
+        wanted={item['sku'] for item in data['items']}
+        skus=ProductSKU.objects.select_related('product').only('price','product__category').in_bulk(wanted)
+        missing=sorted(wanted-set(skus))
+        if missing:
+            raise serializers.ValidationError({'items':f'unknown sku {missing}'})
+        data['lines']=[
+            (skus[item['sku']].product.category_id,skus[item['sku']].price*item['quantity'])
+            for item in data['items']
+        ]
+        return data
+
+
+class TaxQuoteLineSerializer(serializers.Serializer):
+    country=serializers.CharField()
+    tax=serializers.DecimalField(max_digits=12,decimal_places=2)
@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from Products.models import Category
+from taxes.models import TaxRate
+from taxes.rates import tax_table
+
+
+@receiver(post_save,sender=TaxRate)
+@receiver(post_delete,sender=TaxRate)
+@receiver(post_save,sender=Category)
+@receiver(post_delete,sender=Category)
+def invalidate_rates(sender, **kwargs):
+    tax_table.invalidate()
@@ -0,0 +1,115 @@
+from decimal import Decimal
+
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from Products.models import Category, Product, ProductSKU
+from taxes.models import TaxRate
+from taxes.rates import quote_tax, tax_table
+from Users.models import User
+
+
+class TaxRateTableTest(TestCase):
+    def setUp(self):
+        tax_table.invalidate()
+        self.food = Category.objects.create(name='Food')
+        self.fruit = Category.objects.create(name='Fruit', parent=self.food)
+
+    def test_default_rate(self):
+        self.assertEqual(quote_tax('Nepal', [(None, Decimal('100.00'))]), Decimal('13.00'))
+
+    def test_country_and_category_precedence(self):
+        TaxRate.objects.create(category=self.food, rate=Decimal('0.05'))
+        TaxRate.objects.create(country_name='India', rate=Decimal('0.18'))
+        TaxRate.objects.create(country_name='India', category=self.food, rate=Decimal('0.0'))
+        # fruit inherits the food rule from its parent
+        self.assertEqual(quote_tax('Nepal', [(self.fruit.pk, Decimal('100.00'))]), Decimal('5.00'))
+        self.assertEqual(quote_tax(' india ', [(self.fruit.pk, Decimal('100.00'))]), Decimal('0.00'))
+        self.assertEqual(quote_tax('India', [(None, Decimal('100.00'))]), Decimal('18.00'))
+        self.assertEqual(quote_tax('Nepal', [(None, Decimal('100.00'))]), Decimal('13.00'))
+
+    def test_countries_without_rules_share_one_memo_entry(self):
+        TaxRate.objects.create(country_name='India', rate=Decimal('0.18'))
+        for i in range(50):
+            self.assertEqual(quote_tax(f'Country {i}', [(self.fruit.pk, Decimal('100.00'))]), Decimal('13.00'))
+        self.assertEqual(quote_tax('India', [(self.fruit.pk, Decimal('100.00'))]), Decimal('18.00'))
+        self.assertEqual(len(tax_table.get()._resolved), 2)
+
+    def test_rounds_once_per_rate(self):
+        lines = [(None, Decimal('0.10'))] * 3
+        # 0.013 three times would round to 0.03, the bucket rounds to 0.04
+        self.assertEqual(quote_tax('Nepal', lines), Decimal('0.04'))
+        self.assertEqual(quote_tax('Nepal', list(reversed(lines))), Decimal('0.04'))
+
+    def test_writes_invalidate_the_table(self):
+        rule = TaxRate.objects.create(category=self.food, rate=Decimal('0.05'))
+        self.assertEqual(quote_tax('Nepal', [(self.fruit.pk, Decimal('100.00'))]), Decimal('5.00'))
+        with self.assertNumQueries(0):
+            quote_tax('Nepal', [(self.fruit.pk, Decimal('100.00'))])
+        rule.rate = Decimal('0.07')
+        rule.save()
+        self.assertEqual(quote_tax('Nepal', [(self.fruit.pk, Decimal('100.00'))]), Decimal('7.00'))
+        self.fruit.parent = None
+        self.fruit.save()
+        self.assertEqual(quote_tax('Nepal', [(self.fruit.pk, Decimal('100.00'))]), Decimal('13.00'))
+
+
+class TaxQuoteTest(APITestCase):
+    def setUp(self):
+        tax_table.invalidate()
+        self.seller = User.objects.create_user(username='seller', password='password123', role='seller')
+        self.books = Category.objects.create(name='Books')
+        TaxRate.objects.create(category=self.books, rate=Decimal('0.0'))
+        TaxRate.objects.create(country_name='India', rate=Decimal('0.18'))
+        book = Product.objects.create(name='Novel', category=self.books, created_by=self.seller, base_price=100, stock=0)
+        lamp = Product.objects.create(
+            name='Lamp', category=Category.objects.create(name='Home'), created_by=self.seller, base_price=100, stock=0
+        )
+        self.book = ProductSKU.objects.create(product=book, sku_code='BOOK', price=Decimal('500.00'), stock=10)
+        self.lamp = ProductSKU.objects.create(product=lamp, sku_code='LAMP', price=Decimal('1000.00'), stock=10)
+
+    def test_quote_many_destinations(self):
+        items = [{'sku': self.book.pk, 'quantity': 2}, {'sku': self.lamp.pk, 'quantity': 1}]
+        response = self.client.post('/taxrate/quote/', {'countries': ['Nepal', 'India'], 'items': items}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['tax'] for row in response.data], ['130.00', '360.00'])
+        response = self.client.post(
+            '/taxrate/quote/', {'countries': ['Nepal'], 'items': [{'sku': 0, 'quantity': 1}]}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_rates_stay_admin_only(self):
+        self.client.force_authenticate(user=self.seller)
+        response = self.client.post('/taxrate/', {'rate': '0.01'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_one_catch_all_rule_per_country(self):
+        admin = User.objects.create_user(username='admin', password='password123', role='admin', is_staff=True)
+        self.client.force_authenticate(user=admin)
+        response = self.client.post('/taxrate/', {'country_name': 'India', 'rate': '0.12'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_database_refuses_a_second_catch_all_rule(self):
+        if not connection.features.supports_nulls_distinct_unique_constraints:
+            self.skipTest('the database treats every NULL category as distinct')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            TaxRate.objects.create(country_name='India', rate=Decimal('0.12'))
+        self.assertEqual(TaxRate.objects.filter(country_name='India').count(), 1)
+
+    def test_checkout_and_cart_use_category_rates(self):
+        customer = User.objects.create_user(username='customer', password='password123', role='customer')
+        self.client.force_authenticate(user=customer)
+        self.client.post('/cart/items/', {'sku': self.book.pk, 'quantity': 2}, format='json')
+        response = self.client.post('/cart/items/', {'sku': self.lamp.pk, 'quantity': 1}, format='json')
+        self.assertEqual(response.data['tax'], '130.00')
+        TaxRate.objects.create(category=self.books, country_name='Nepal', rate=Decimal('0.10'))
+        self.assertEqual(self.client.get('/cart/').data['tax'], '230.00')
+        response = self.client.post('/order/', {
+            'full_name': 'Test Customer', 'email': 'customer@example.com', 'address': 'Street 1',
+            'city': 'Kathmandu', 'postal_code': '44600', 'country': 'Nepal',
+            'order_item': [{'sku': self.book.pk, 'quantity_at_purchase': 1}],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['tax'], '50.00')
@@ -0,0 +1,32 @@
+from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import AllowAny,IsAdminUser
+from rest_framework.response import Response
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from taxes.models import TaxRate
+from taxes.rates import quote_tax
+from taxes.serializers import TaxQuoteLineSerializer,TaxQuoteSerializer,TaxRateSerializer
+
+
+# Create your views here.
+class TaxRateViewset(viewsets.ModelViewSet):
+    queryset=TaxRate.objects.all()
+    serializer_class=TaxRateSerializer
+    # a short admin table, listed whole
+    pagination_class=None
+    authentication_classes=[JWTAuthentication]
+    permission_classes=[IsAdminUser]
+
+    def get_permissions(self):
+        if self.action=='quote':
+            return [AllowAny()]
+        return super().get_permissions()
+
+    @action(detail=False,methods=['post'])
+    def quote(self,request):
+        # re-quote a cart for many destinations from the in-memory rate table
+        serializer=TaxQuoteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data=serializer.validated_data
+        rows=[{'country':country,'tax':quote_tax(country,data['lines'])} for country in data['countries']]
+        return Response(TaxQuoteLineSerializer(rows,many=True).data)